@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.gis",
+    "django.contrib.postgres",
     # Third-party
     "django_distill",
     "leaflet",
@@ -117,6 +118,48 @@ LEAFLET_CONFIG = {
 # Static export options
 # If True, embed simplified GeoJSON into the simplified map template.
 SIMPLIFIED_INLINE_DATA = os.environ.get("SIMPLIFIED_INLINE_DATA", "0") == "1"
+# The GeoJSON layers stream; distill-local needs their bodies drained first.
+DISTILL_RENDERER = "listings.distill.StreamingDistillRender"
+
+# Nearby amenities API
+# If True, point layers are served from an in-process spatial index per worker
+# (rebuilt when a layer's data changes); PostGIS is used while it is cold.
+NEARBY_POI_INDEX = os.environ.get("NEARBY_POI_INDEX", "1") == "1"
+
+# Closest stores cache
+# If True, stale cache rows are served immediately (last known IDs) and
+# recomputed by background threads; missing rows are always computed in the request.
+CLOSEST_STORES_SWR = os.environ.get("CLOSEST_STORES_SWR", "1") == "1"
+CLOSEST_STORES_REFRESH_WORKERS = int(os.environ.get("CLOSEST_STORES_REFRESH_WORKERS", "2"))
+# Bulk store imports changing more store locations than this recompute every
+# cache in batches instead of looking up the affected listings.
+CLOSEST_STORES_TARGETED_MAX_POINTS = int(os.environ.get("CLOSEST_STORES_TARGETED_MAX_POINTS", "1000"))
+
+# Geocoding (listings.geocoding)
+# Results are cached in the database (negative results for a shorter time) and
+# in a per-worker LRU. Upstream calls are spaced GEOCODE_MIN_INTERVAL_S apart
+# across all workers; after GEOCODE_BREAKER_THRESHOLD consecutive failures the
+# provider is not called for GEOCODE_BREAKER_COOLDOWN_S seconds.
+GEOCODER_USER_AGENT = os.environ.get("GEOCODER_USER_AGENT", "proptech-geocoder")
+GEOCODE_CACHE_TTL_S = int(os.environ.get("GEOCODE_CACHE_TTL_S", str(90 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL_S = int(os.environ.get("GEOCODE_NEGATIVE_TTL_S", str(24 * 3600)))
+GEOCODE_LRU_SIZE = int(os.environ.get("GEOCODE_LRU_SIZE", "2048"))
+GEOCODE_MIN_INTERVAL_S = float(os.environ.get("GEOCODE_MIN_INTERVAL_S", "1.0"))
+GEOCODE_BREAKER_THRESHOLD = int(os.environ.get("GEOCODE_BREAKER_THRESHOLD", "3"))
+GEOCODE_BREAKER_COOLDOWN_S = int(os.environ.get("GEOCODE_BREAKER_COOLDOWN_S", "60"))
+# Budget for geocoding inside a web request (upstream timeout / rate-limit wait)
+GEOCODE_REQUEST_TIMEOUT_S = float(os.environ.get("GEOCODE_REQUEST_TIMEOUT_S", "4"))
+GEOCODE_REQUEST_MAX_WAIT_S = float(os.environ.get("GEOCODE_REQUEST_MAX_WAIT_S", "2"))
+
+# Listing enrichment commands (--shard / --workers)
+# Per-shard checkpoints of finished chunks, so an interrupted run resumes.
+ENRICHMENT_CHECKPOINT_DIR = Path(os.environ.get("ENRICHMENT_CHECKPOINT_DIR", str(BASE_DIR / "var" / "checkpoints")))
+
+# Vector tiles (/tiles/<layer>/<z>/<x>/<y>.mvt)
+# Rendered tiles are cached per layer data version; the version itself is
+# re-checked at most every TILE_VERSION_TTL_S seconds.
+TILE_CACHE_TIMEOUT = int(os.environ.get("TILE_CACHE_TIMEOUT", "86400"))
+TILE_VERSION_TTL_S = int(os.environ.get("TILE_VERSION_TTL_S", "30"))
 
 # Logging Configuration for Debug Statements
 LOGGING = {
@@ -3,7 +3,7 @@ from django.urls import path
 from django_distill import distill_path
 from django.conf import settings
 from django.conf.urls.static import static
-from listings.views import map_view, listings_geojson, simplified_map_view, simplified_geojson, nearby_amenities, nearby_amenities_map
+from listings.views import map_view, listings_geojson, simplified_map_view, simplified_geojson, nearby_amenities, nearby_amenities_map, vector_tile, clusters, place_autocomplete, external_listing_nearby
 from transit_layer.views import metro_stations_geojson, transit_geojson
 from stores_layer.views import stores_geojson
 
@@ -18,6 +18,14 @@ urlpatterns = [
     distill_path("api/stores.geojson", stores_geojson, name="stores_geojson", distill_file="api/stores.geojson"),
     path("api/amenities/nearby/", nearby_amenities, name="nearby_amenities"),
     path("map/amenities/", nearby_amenities_map, name="nearby_amenities_map"),
+    path("api/clusters", clusters, name="clusters"),
+    path("api/places/autocomplete", place_autocomplete, name="place_autocomplete"),
+    path(
+        "api/external-listings/<str:source>/<str:external_id>/nearby",
+        external_listing_nearby,
+        name="external_listing_nearby",
+    ),
+    path("tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt", vector_tile, name="vector_tile"),
 ]
 
 # Serve media files in development
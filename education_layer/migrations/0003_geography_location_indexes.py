@@ -0,0 +1,22 @@
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education_layer', '0002_internationalschool_preschool'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='internationalschool',
+            index=django.contrib.postgres.indexes.GistIndex(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(geography=True, srid=4326)), name='intlschool_location_geog_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='preschool',
+            index=django.contrib.postgres.indexes.GistIndex(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(geography=True, srid=4326)), name='preschool_location_geog_gist'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:20
+
+import django.contrib.gis.db.models.fields
+import django.contrib.gis.db.models.functions
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education_layer', '0003_geography_location_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='internationalschool',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform('location', 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='preschool',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform('location', 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddIndex(
+            model_name='school',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='school_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='internationalschool',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='intlschool_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='preschool',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='preschool_location_tm_gist'),
+        ),
+    ]
@@ -1,15 +1,29 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GistIndex
+from django.db.models.functions import Cast
+
+from listings.fields import metric_field, metric_index
+
+
+def geography_location_index(name: str) -> GistIndex:
+    """
+    GiST index on `location::geography` for geometry (4326) point fields, so
+    metre-based ST_DWithin / `<->` lookups on the cast can use an index.
+    """
+    return GistIndex(Cast("location", output_field=models.PointField(srid=4326, geography=True)), name=name)
 
 
 class School(models.Model):
     name = models.CharField(max_length=255)
     location = models.PointField(srid=4326, geography=True)
+    location_tm = metric_field()
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [metric_index("school_location_tm_gist")]
 
     def __str__(self):  # pragma: no cover
         return self.name
@@ -21,6 +35,7 @@ class InternationalSchool(models.Model):
     name = models.CharField(max_length=255)
     address_text = models.CharField(max_length=255)
     location = models.PointField(srid=4326)
+    location_tm = metric_field(geography=False)
     curriculum = models.CharField(max_length=50, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -28,6 +43,10 @@ class InternationalSchool(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            geography_location_index("intlschool_location_geog_gist"),
+            metric_index("intlschool_location_tm_gist"),
+        ]
 
     def __str__(self):  # pragma: no cover
         return self.name
@@ -38,6 +57,7 @@ class Preschool(models.Model):
 
     name = models.CharField(max_length=255)
     location = models.PointField(srid=4326)
+    location_tm = metric_field(geography=False)
     district = models.CharField(max_length=50)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -45,6 +65,10 @@ class Preschool(models.Model):
 
     class Meta:
         ordering = ["district", "name"]
+        indexes = [
+            geography_location_index("preschool_location_geog_gist"),
+            metric_index("preschool_location_tm_gist"),
+        ]
 
     def __str__(self):  # pragma: no cover
         return f"{self.name} ({self.district})"
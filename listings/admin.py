@@ -7,6 +7,10 @@ from .models import (
     ExternalListing,
     MapGenerationConfig,
     NearbyAmenityConfig,
+    GeocodeCacheEntry,
+    GeocoderState,
+    GazetteerEntry,
+    ListingProximity,
 )
 from django import forms
 from django.contrib.gis.geos import Point
@@ -185,12 +189,13 @@ class ExternalListingAdmin(admin.ModelAdmin):
     list_display = ("source", "external_id", "title", "price", "city", "state", "fetched_at")
     list_filter = ("source", "city", "state", "fetched_at")
     search_fields = ("external_id", "title", "city", "state")
-    readonly_fields = ("fetched_at", "updated_at")
+    readonly_fields = ("fetched_at", "updated_at", "proximity_version")
     fieldsets = (
         (None, {"fields": ("source", "external_id", "title", "price", "deal_type")}),
         ("Location", {"fields": ("lat", "lng", "location", "city", "state")}),
         ("Links", {"fields": ("url", "original_url")}),
         ("Payload", {"fields": ("payload",)}),
+        ("Proximity", {"fields": ("nearest_distances_m", "proximity_version"), "classes": ("collapse",)}),
         ("Timestamps", {"fields": ("fetched_at", "updated_at"), "classes": ("collapse",)}),
     )
 
@@ -226,3 +231,40 @@ class NearbyAmenityConfigAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ("query_key", "found", "provider", "expires_at", "updated_at")
+    list_filter = ("provider", "expires_at")
+    search_fields = ("query_key", "query", "display_name")
+    readonly_fields = ("created_at", "updated_at")
+
+    @admin.display(boolean=True)
+    def found(self, obj):
+        return obj.location is not None
+
+
+@admin.register(GeocoderState)
+class GeocoderStateAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "consecutive_failures", "open_until", "next_request_at", "updated_at")
+    readonly_fields = ("updated_at",)
+
+    def has_add_permission(self, request):
+        return not GeocoderState.objects.exists()
+
+
+@admin.register(GazetteerEntry)
+class GazetteerEntryAdmin(admin.ModelAdmin):
+    list_display = ("name", "kind", "weight", "updated_at")
+    list_filter = ("kind",)
+    search_fields = ("name", "name_normalized")
+    readonly_fields = ("name_normalized", "source_id", "updated_at")
+
+
+@admin.register(ListingProximity)
+class ListingProximityAdmin(admin.ModelAdmin):
+    list_display = ("listing", "layer", "rank", "name", "distance_m")
+    list_filter = ("layer",)
+    search_fields = ("listing__external_id", "name")
+    raw_id_fields = ("listing",)
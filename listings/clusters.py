@@ -0,0 +1,136 @@
+"""
+Server-side grid clustering for zoomed-out map views.
+
+A request (layer, bbox, zoom) is answered tile by tile: each covering XYZ
+tile is split into CLUSTER_GRID x CLUSTER_GRID Web Mercator cells and PostGIS
+returns one row per non-empty cell (count + centroid). Cell assignment uses
+half-open tile bounds, so a point is counted in exactly one tile.
+
+Tiles are cached per (layer, data version, z, x, y); panning at a fixed zoom
+reuses the neighbouring tiles already computed.
+"""
+import logging
+import math
+import time
+from typing import Any, Dict, List, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .tiles import MAX_ZOOM, TILE_LAYERS, WEB_MERCATOR_WIDTH_M, TileSource, layer_version
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_GRID = 8  # cells per tile side (256 px tiles -> 32 px cells)
+MAX_CLUSTER_TILES = 64  # tiles a single request may cover
+# Below this zoom tile envelopes are too large for a geography bbox filter; scan instead
+MIN_INDEXED_ZOOM = 6
+MAX_MERCATOR_LAT = 85.0511287798
+
+# Layer name -> point tables clustered together
+CLUSTER_LAYERS: Dict[str, Tuple[TileSource, ...]] = {
+    "listings": (TileSource("listings.Listing", "listing"),),
+    **{name: layer.sources for name, layer in TILE_LAYERS.items()},
+}
+
+
+class ClusterRequestError(ValueError):
+    """Bad layer/zoom/bbox combination (rendered as HTTP 400)."""
+
+
+def tiles_for_bbox(bbox: Tuple[float, float, float, float], z: int) -> List[Tuple[int, int]]:
+    """XYZ tiles (x, y) covering a lon/lat bbox at zoom `z`."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    n = 2 ** z
+
+    def tile_x(lon: float) -> int:
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def tile_y(lat: float) -> int:
+        lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+        rad = math.radians(lat)
+        return min(n - 1, max(0, int((1.0 - math.asinh(math.tan(rad)) / math.pi) / 2.0 * n)))
+
+    return [
+        (x, y)
+        for x in range(tile_x(min_lon), tile_x(max_lon) + 1)
+        for y in range(tile_y(max_lat), tile_y(min_lat) + 1)
+    ]
+
+
+def _cluster_sql(sources: Tuple[TileSource, ...], indexed: bool) -> str:
+    quote = connection.ops.quote_name
+    selects = []
+    for i, source in enumerate(sources):
+        table = quote(apps.get_model(source.model)._meta.db_table)
+        selects.append(
+            f"""
+            SELECT s.id, %(kind_{i})s::text AS kind, ST_Transform(s.location::geometry, 3857) AS g
+            FROM {table} AS s, bounds AS b
+            {"WHERE s.location && b.search" if indexed else ""}
+            """
+        )
+    return f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env,
+                   ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326)::geography AS search
+        ),
+        points AS ({" UNION ALL ".join(selects)})
+        SELECT COUNT(*),
+               ST_X(ST_Transform(ST_Centroid(ST_Collect(p.g)), 4326)),
+               ST_Y(ST_Transform(ST_Centroid(ST_Collect(p.g)), 4326)),
+               MIN(p.id), MIN(p.kind)
+        FROM points AS p, bounds AS b
+        WHERE ST_X(p.g) >= ST_XMin(b.env) AND ST_X(p.g) < ST_XMax(b.env)
+          AND ST_Y(p.g) >= ST_YMin(b.env) AND ST_Y(p.g) < ST_YMax(b.env)
+        GROUP BY floor((ST_X(p.g) - ST_XMin(b.env)) / %(cell)s),
+                 floor((ST_Y(p.g) - ST_YMin(b.env)) / %(cell)s)
+    """
+
+
+def tile_clusters(layer: str, z: int, x: int, y: int) -> List[Dict[str, Any]]:
+    """Clusters of one tile: `{count, lng, lat}`, plus `id`/`kind` for single points."""
+    sources = CLUSTER_LAYERS[layer]
+    cache_key = f"clusters:{layer}:{layer_version(sources)}:{z}/{x}/{y}"
+    clusters = cache.get(cache_key)
+    if clusters is not None:
+        return clusters
+
+    params: Dict[str, Any] = {"z": z, "x": x, "y": y, "cell": WEB_MERCATOR_WIDTH_M / 2 ** z / CLUSTER_GRID}
+    params.update({f"kind_{i}": s.kind for i, s in enumerate(sources)})
+    with connection.cursor() as cursor:
+        cursor.execute(_cluster_sql(sources, indexed=z >= MIN_INDEXED_ZOOM), params)
+        rows = cursor.fetchall()
+
+    clusters = []
+    for count, lng, lat, first_id, kind in rows:
+        cluster: Dict[str, Any] = {"count": count, "lng": lng, "lat": lat}
+        if count == 1:
+            cluster.update({"id": first_id, "kind": kind})
+        clusters.append(cluster)
+
+    cache.set(cache_key, clusters, settings.TILE_CACHE_TIMEOUT)
+    return clusters
+
+
+def clusters_for_bbox(layer: str, bbox: Tuple[float, float, float, float], z: int) -> List[Dict[str, Any]]:
+    """All clusters of `layer` in the tiles covering `bbox` at zoom `z`."""
+    if layer not in CLUSTER_LAYERS:
+        raise ClusterRequestError(f"unknown layer '{layer}'")
+    if not 0 <= z <= MAX_ZOOM:
+        raise ClusterRequestError(f"zoom must be between 0 and {MAX_ZOOM}")
+    tiles = tiles_for_bbox(bbox, z)
+    if len(tiles) > MAX_CLUSTER_TILES:
+        raise ClusterRequestError("bbox covers too many tiles at this zoom")
+
+    start = time.time()
+    clusters: List[Dict[str, Any]] = []
+    for x, y in tiles:
+        clusters.extend(tile_clusters(layer, z, x, y))
+    logger.debug(
+        f"[CLUSTERS] {layer} z{z}: {len(clusters)} clusters from {len(tiles)} tiles | "
+        f"Time: {time.time() - start:.4f}s"
+    )
+    return clusters
@@ -0,0 +1,22 @@
+"""
+django-distill renderer that accepts streamed responses.
+
+The GeoJSON layers are StreamingHttpResponses (see listings.geojson), but
+django-distill writes `response.content`, which streamed responses do not
+have. This renderer drains the stream into a plain HttpResponse for the
+export only; live requests keep streaming.
+"""
+from django.http import HttpResponse
+from django_distill.renderer import DistillRender
+
+
+class StreamingDistillRender(DistillRender):
+    def render_view(self, *args, **kwargs):
+        response = super().render_view(*args, **kwargs)
+        if not response.streaming:
+            return response
+        return HttpResponse(
+            b"".join(response.streaming_content),
+            status=response.status_code,
+            headers=dict(response.items()),
+        )
@@ -0,0 +1,153 @@
+"""
+Offline gazetteer over our own place names.
+
+Metro/metrobus stations, malls, parks, schools and Istanbul districts are
+copied into GazetteerEntry with a Turkish-folded name ("Kadıköy" -> "kadikoy",
+"Şişli" -> "sisli"), indexed for prefix (varchar_pattern_ops) and fuzzy
+(pg_trgm) matching. It backs the autocomplete endpoint and resolves
+free-text locations that name a known place without calling a geocoder.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.contrib.gis.geos import Point
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import GazetteerEntry
+from .text import fold_turkish
+
+logger = logging.getLogger(__name__)
+
+# (model label, kind, weight): higher weight wins among equally good matches
+GAZETTEER_SOURCES: Tuple[Tuple[str, str, int], ...] = (
+    ("transit_layer.MetroStation", "metro", 50),
+    ("transit_layer.MetrobusStation", "metrobus", 45),
+    ("stores_layer.Mall", "mall", 30),
+    ("stores_layer.Park", "park", 20),
+    ("education_layer.School", "school", 10),
+    ("education_layer.InternationalSchool", "international_school", 10),
+    ("education_layer.Preschool", "preschool", 5),
+)
+DISTRICT_WEIGHT = 40
+
+ISTANBUL_DISTRICTS: Tuple[str, ...] = (
+    "Adalar", "Arnavutköy", "Ataşehir", "Avcılar", "Bağcılar", "Bahçelievler", "Bakırköy",
+    "Başakşehir", "Bayrampaşa", "Beşiktaş", "Beykoz", "Beylikdüzü", "Beyoğlu", "Büyükçekmece",
+    "Çatalca", "Çekmeköy", "Esenler", "Esenyurt", "Eyüpsultan", "Fatih", "Gaziosmanpaşa",
+    "Güngören", "Kadıköy", "Kağıthane", "Kartal", "Küçükçekmece", "Maltepe", "Pendik",
+    "Sancaktepe", "Sarıyer", "Silivri", "Sultanbeyli", "Sultangazi", "Şile", "Şişli", "Tuzla",
+    "Ümraniye", "Üsküdar", "Zeytinburnu",
+)
+
+# Trailing tokens that do not help to pick a place ("Kadıköy, İstanbul, Türkiye")
+_NOISE_TOKENS = {"istanbul", "turkiye", "turkey"}
+
+# Least trigram similarity for a fuzzy match to count as a resolved location
+RESOLVE_MIN_SIMILARITY = 0.6
+MIN_QUERY_LENGTH = 2
+
+
+def _place_key(query: str) -> str:
+    tokens = fold_turkish(query).split()
+    while len(tokens) > 1 and tokens[-1] in _NOISE_TOKENS:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def search(query: str, limit: int = 10) -> List[GazetteerEntry]:
+    """
+    Autocomplete: exact matches first, then prefix matches, then fuzzy
+    (trigram) matches, each group ordered by similarity and weight.
+    """
+    key = _place_key(query)
+    if len(key) < MIN_QUERY_LENGTH:
+        return []
+    return list(
+        GazetteerEntry.objects.filter(Q(name_normalized__startswith=key) | Q(name_normalized__trigram_similar=key))
+        .annotate(
+            similarity=TrigramSimilarity("name_normalized", key),
+            match_rank=Case(
+                When(name_normalized=key, then=Value(2)),
+                When(name_normalized__startswith=key, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+        .order_by("-match_rank", "-similarity", "-weight", "name")[:limit]
+    )
+
+
+def resolve(query: str) -> Optional[GazetteerEntry]:
+    """The place a free-text query names, or None if nothing matches confidently."""
+    key = _place_key(query)
+    if len(key) < MIN_QUERY_LENGTH:
+        return None
+    exact = GazetteerEntry.objects.filter(name_normalized=key).order_by("-weight", "id").first()
+    if exact is not None:
+        return exact
+    return (
+        GazetteerEntry.objects.filter(name_normalized__trigram_similar=key)
+        .annotate(similarity=TrigramSimilarity("name_normalized", key))
+        .filter(similarity__gte=RESOLVE_MIN_SIMILARITY)
+        .order_by("-similarity", "-weight", "id")
+        .first()
+    )
+
+
+def serialize(entry: GazetteerEntry) -> Dict[str, Any]:
+    return {
+        "name": entry.name,
+        "kind": entry.kind,
+        "lat": entry.location.y,
+        "lng": entry.location.x,
+    }
+
+
+def _entries_from_tables() -> List[GazetteerEntry]:
+    entries: List[GazetteerEntry] = []
+    for label, kind, weight in GAZETTEER_SOURCES:
+        model = apps.get_model(label)
+        for pk, name, location in model.objects.values_list("id", "name", "location").iterator(chunk_size=2000):
+            normalized = fold_turkish(name or "")
+            if not normalized or location is None:
+                continue
+            entries.append(
+                GazetteerEntry(
+                    name=name[:255],
+                    name_normalized=normalized[:255],
+                    kind=kind,
+                    source_id=pk,
+                    location=Point(location.x, location.y, srid=4326),
+                    weight=weight,
+                )
+            )
+    return entries
+
+
+def district_entries(points: Dict[str, Tuple[float, float]]) -> List[GazetteerEntry]:
+    """Entries for districts given as {name: (lon, lat)}."""
+    return [
+        GazetteerEntry(
+            name=name,
+            name_normalized=fold_turkish(name),
+            kind="district",
+            location=Point(lon, lat, srid=4326),
+            weight=DISTRICT_WEIGHT,
+        )
+        for name, (lon, lat) in points.items()
+    ]
+
+
+def rebuild(districts: Optional[Dict[str, Tuple[float, float]]] = None) -> int:
+    """Replace the gazetteer with the current table contents (+ districts). Returns the entry count."""
+    start = time.time()
+    entries = _entries_from_tables() + district_entries(districts or {})
+    with transaction.atomic():
+        GazetteerEntry.objects.all().delete()
+        GazetteerEntry.objects.bulk_create(entries, batch_size=1000)
+    logger.info(f"[GAZETTEER] Rebuilt with {len(entries)} entries | Time: {time.time() - start:.4f}s")
+    return len(entries)
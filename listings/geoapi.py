@@ -0,0 +1,199 @@
+"""
+Viewport filtering and keyset pagination shared by the GeoJSON endpoints.
+
+Query parameters understood by every layer endpoint:
+
+    bbox=minLon,minLat,maxLon,maxLat   only features inside the box (GiST-indexed)
+    limit=N                            at most N features per response
+    cursor=<token>                     continue after the last feature of the previous page
+
+Pages are cut with keyset conditions on a stable ordering instead of OFFSET, so
+page N costs the same as page 1. The cursor is an opaque URL-safe token; the
+FeatureCollection carries the next one as a `next_cursor` member (null on the
+last page).
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from django.contrib.gis.geos import Polygon
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest
+
+# Upper bound for `limit`, whatever the client asks for
+MAX_PAGE_SIZE = 5000
+
+# Rows fetched per round trip when streaming a layer
+ITERATOR_CHUNK_SIZE = 2000
+
+
+class PageRequestError(ValueError):
+    """Malformed bbox/limit/cursor parameter (rendered as HTTP 400)."""
+
+
+@dataclass
+class PageRequest:
+    bbox: Optional[Polygon] = None
+    limit: Optional[int] = None
+    cursor: Optional[List[Any]] = None
+
+
+def parse_bbox(value: str) -> Polygon:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(","))
+    except ValueError:
+        raise PageRequestError("bbox must be minLon,minLat,maxLon,maxLat")
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise PageRequestError("bbox is out of range or empty")
+    bbox = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+    bbox.srid = 4326
+    return bbox
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        raise PageRequestError("invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise PageRequestError("invalid cursor")
+    return values
+
+
+def parse_page_request(request: HttpRequest, default_limit: Optional[int] = None) -> PageRequest:
+    """Read bbox/limit/cursor from the query string. Raises PageRequestError."""
+    page = PageRequest(limit=default_limit)
+    if request.GET.get("bbox"):
+        page.bbox = parse_bbox(request.GET["bbox"])
+    if request.GET.get("limit"):
+        try:
+            page.limit = int(request.GET["limit"])
+        except ValueError:
+            raise PageRequestError("limit must be an integer")
+        if page.limit <= 0:
+            raise PageRequestError("limit must be positive")
+    if page.limit is not None:
+        page.limit = min(page.limit, MAX_PAGE_SIZE)
+    if request.GET.get("cursor"):
+        page.cursor = decode_cursor(request.GET["cursor"])
+    return page
+
+
+def _keyset_condition(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    """Rows strictly after `values` in `ordering` ("-field" = descending)."""
+    condition = Q()
+    for i in reversed(range(len(ordering))):
+        field = ordering[i].lstrip("-")
+        op = "lt" if ordering[i].startswith("-") else "gt"
+        after = Q(**{f"{field}__{op}": values[i]})
+        ties = Q(**{ordering[j].lstrip("-"): values[j] for j in range(i)})
+        condition = (ties & after) | condition if i else after | condition
+    return condition
+
+
+def _cursor_values(queryset: QuerySet, ordering: Sequence[str], cursor: Sequence[Any]) -> List[Any]:
+    """Cursor values converted to the types of the ordering fields. Raises PageRequestError."""
+    if len(cursor) != len(ordering):
+        raise PageRequestError("cursor does not match this endpoint")
+    values = []
+    for name, value in zip(ordering, cursor):
+        if value is None or isinstance(value, (list, dict)):
+            raise PageRequestError("invalid cursor")
+        try:
+            values.append(queryset.model._meta.get_field(name.lstrip("-")).to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            raise PageRequestError("invalid cursor")
+    return values
+
+
+def keyset_page(
+    queryset: QuerySet, ordering: Sequence[str], page: PageRequest
+) -> Tuple[QuerySet, Optional[int]]:
+    """
+    Apply bbox, ordering and cursor to `queryset`.
+
+    `ordering` must end in a unique field. Returns the sliced queryset
+    (limit + 1 rows, the extra one only signals another page) and the limit.
+    Pass the evaluated rows to `next_cursor`.
+    """
+    if page.bbox is not None:
+        queryset = queryset.filter(location__intersects=page.bbox)
+    if page.cursor is not None:
+        queryset = queryset.filter(_keyset_condition(ordering, _cursor_values(queryset, ordering, page.cursor)))
+    queryset = queryset.order_by(*ordering)
+    if page.limit is not None:
+        queryset = queryset[: page.limit + 1]
+    return queryset, page.limit
+
+
+def next_cursor(rows: List[Any], ordering: Sequence[str], limit: Optional[int]) -> Tuple[List[Any], Optional[str]]:
+    """Trim the look-ahead row and build the cursor for the following page."""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, f.lstrip("-")) for f in ordering])
+
+
+def _row_id(row: Any) -> Any:
+    return row[0] if isinstance(row, tuple) else row.id
+
+
+class LayerPage:
+    """
+    One page of several point tables served as a single layer, table by table
+    in id order. The cursor is `[table_index, last_id]`.
+
+    Iterating yields `(table_index, row)` pairs straight from server-side
+    cursors (`.iterator()`), so an unpaged layer is never held in memory;
+    `next_cursor` is set once iteration finishes. Rows are model instances or
+    `values_list` tuples whose first column is the id.
+    """
+
+    def __init__(self, querysets: Sequence[QuerySet], page: PageRequest):
+        self.querysets = list(querysets)
+        self.page = page
+        self.next_cursor: Optional[str] = None
+        # Validate eagerly: once streaming has started an error can no longer become a 400
+        self.start, self.after_id = 0, None
+        if page.cursor is not None:
+            if len(page.cursor) != 2:
+                raise PageRequestError("cursor does not match this endpoint")
+            try:
+                self.start = int(page.cursor[0])
+                self.after_id = None if page.cursor[1] is None else int(page.cursor[1])
+            except (TypeError, ValueError):
+                raise PageRequestError("invalid cursor")
+            if not 0 <= self.start < len(self.querysets):
+                raise PageRequestError("invalid cursor")
+
+    def __iter__(self) -> Iterator[Tuple[int, Any]]:
+        limit = self.page.limit
+        emitted = 0
+        for index in range(self.start, len(self.querysets)):
+            remaining = None if limit is None else limit - emitted
+            cursor = [self.after_id] if index == self.start and self.after_id is not None else None
+            qs, _ = keyset_page(self.querysets[index], ["id"], PageRequest(self.page.bbox, remaining, cursor))
+            last = None
+            for obj in qs.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+                if limit is not None and emitted == limit:
+                    # Look-ahead row: this table has more
+                    self.next_cursor = encode_cursor([index, _row_id(last)])
+                    return
+                emitted += 1
+                last = obj
+                yield index, obj
+            if limit is not None and emitted >= limit:
+                # Exactly full: the next page starts with the following table
+                if index + 1 < len(self.querysets):
+                    self.next_cursor = encode_cursor([index + 1, None])
+                return
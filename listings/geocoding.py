@@ -0,0 +1,218 @@
+"""
+Geocoding with a persistent cache, a shared rate limit and a circuit breaker.
+
+Lookup order for a free-text query:
+  1. in-process LRU (per worker, sub-millisecond)
+  2. GeocodeCacheEntry table (shared by every worker and management command)
+  3. the upstream provider (Nominatim via geopy)
+
+Queries are cached under a normalized key, so "Kadıköy,  İstanbul" and
+"kadikoy istanbul" hit the same row. Queries the provider cannot resolve are
+cached too (negative entries, shorter TTL).
+
+Upstream calls go through the GeocoderState singleton row:
+  - rate limit: each call reserves the next free slot (GEOCODE_MIN_INTERVAL_S
+    apart across all workers) and sleeps until it; callers that would have to
+    wait longer than `max_wait_s` get GeocoderUnavailable instead.
+  - circuit breaker: after GEOCODE_BREAKER_THRESHOLD consecutive failures no
+    upstream call is made for GEOCODE_BREAKER_COOLDOWN_S; the first call after
+    the cooldown probes the provider again.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GeocodeCacheEntry, GeocoderState
+from .text import fold_turkish
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = "nominatim"
+MAX_KEY_LENGTH = 512
+
+
+class GeocoderUnavailable(Exception):
+    """The provider cannot be asked right now (circuit open, rate limit wait too long, upstream error)."""
+
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    lon: float
+    lat: float
+    display_name: str = ""
+
+    @property
+    def point(self) -> Point:
+        return Point(self.lon, self.lat, srid=4326)
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: the Turkish-folded text (see listings.text), bounded in length."""
+    return fold_turkish(query)[:MAX_KEY_LENGTH]
+
+
+class _LRU:
+    """Small thread-safe LRU of (result or None, expires_at epoch)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[str, Tuple[Optional[GeocodeResult], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Optional[GeocodeResult]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            if item[1] <= time.time():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, item[0]
+
+    def put(self, key: str, result: Optional[GeocodeResult], expires_at: float) -> None:
+        with self._lock:
+            self._data[key] = (result, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+
+_lru = _LRU(settings.GEOCODE_LRU_SIZE)
+
+
+@lru_cache(maxsize=None)
+def _geolocator():
+    try:
+        from geopy.geocoders import Nominatim  # type: ignore
+    except ImportError as exc:  # pragma: no cover - defensive
+        raise ImportError("geopy is required for geocoding. Install via `pip install geopy`.") from exc
+    return Nominatim(user_agent=settings.GEOCODER_USER_AGENT)
+
+
+def _reserve_slot(max_wait_s: Optional[float]) -> float:
+    """
+    Reserve the next upstream request slot; returns how long to sleep before using it.
+    Raises GeocoderUnavailable if the circuit is open or the wait exceeds `max_wait_s`.
+    """
+    GeocoderState.objects.get_or_create(pk=1)
+    with transaction.atomic():
+        state = GeocoderState.objects.select_for_update().get(pk=1)
+        now = timezone.now()
+        if state.open_until and state.open_until > now:
+            raise GeocoderUnavailable("Geocoding is temporarily unavailable, try again later.")
+        slot = max(now, state.next_request_at or now)
+        wait = (slot - now).total_seconds()
+        if max_wait_s is not None and wait > max_wait_s:
+            raise GeocoderUnavailable("Geocoding is busy, try again in a moment.")
+        state.next_request_at = slot + timedelta(seconds=settings.GEOCODE_MIN_INTERVAL_S)
+        state.save(update_fields=["next_request_at", "updated_at"])
+    return wait
+
+
+def _record_outcome(success: bool) -> None:
+    with transaction.atomic():
+        state = GeocoderState.objects.select_for_update().get(pk=1)
+        if success:
+            if not state.consecutive_failures and state.open_until is None:
+                return
+            state.consecutive_failures = 0
+            state.open_until = None
+        else:
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= settings.GEOCODE_BREAKER_THRESHOLD:
+                state.open_until = timezone.now() + timedelta(seconds=settings.GEOCODE_BREAKER_COOLDOWN_S)
+                logger.warning(
+                    f"[GEOCODE] Circuit open for {settings.GEOCODE_BREAKER_COOLDOWN_S}s "
+                    f"after {state.consecutive_failures} consecutive failures"
+                )
+        state.save(update_fields=["consecutive_failures", "open_until", "updated_at"])
+
+
+def _store(key: str, query: str, result: Optional[GeocodeResult]) -> None:
+    ttl_s = settings.GEOCODE_CACHE_TTL_S if result else settings.GEOCODE_NEGATIVE_TTL_S
+    GeocodeCacheEntry.objects.update_or_create(
+        query_key=key,
+        defaults={
+            "query": query,
+            "location": result.point if result else None,
+            "display_name": result.display_name if result else "",
+            "provider": PROVIDER,
+            "expires_at": timezone.now() + timedelta(seconds=ttl_s),
+        },
+    )
+    _lru.put(key, result, time.time() + ttl_s)
+
+
+def cached_geocode(query: str) -> Tuple[bool, Optional[GeocodeResult]]:
+    """`(hit, result)` from the LRU or the cache table, without calling the provider."""
+    key = normalize_query(query)
+    hit, result = _lru.get(key)
+    if hit:
+        return True, result
+
+    entry = (
+        GeocodeCacheEntry.objects.filter(query_key=key, expires_at__gt=timezone.now())
+        .only("location", "display_name", "expires_at")
+        .first()
+    )
+    if entry is None:
+        return False, None
+    result = None
+    if entry.location is not None:
+        result = GeocodeResult(entry.location.x, entry.location.y, entry.display_name)
+    _lru.put(key, result, entry.expires_at.timestamp())
+    return True, result
+
+
+def geocode(query: str, *, timeout: float = 10, max_wait_s: Optional[float] = None) -> Optional[GeocodeResult]:
+    """
+    Resolve a free-text query, or None if the provider has no result for it.
+
+    Args:
+        timeout: upstream request timeout in seconds
+        max_wait_s: longest acceptable wait for a rate-limit slot (None waits as long as needed)
+
+    Raises:
+        GeocoderUnavailable: circuit open, rate-limit wait too long, or the upstream call failed
+    """
+    key = normalize_query(query)
+    if not key:
+        return None
+    hit, result = cached_geocode(query)
+    if hit:
+        return result
+
+    geolocator = _geolocator()
+    wait = _reserve_slot(max_wait_s)
+    if wait > 0:
+        time.sleep(wait)
+
+    start = time.time()
+    try:
+        location = geolocator.geocode(query, timeout=timeout)
+    except Exception as exc:
+        _record_outcome(success=False)
+        logger.warning(f"[GEOCODE] Upstream failed for '{key}' after {time.time() - start:.2f}s: {exc}")
+        raise GeocoderUnavailable("Geocoding failed, try again later.") from exc
+    _record_outcome(success=True)
+
+    result = None
+    if location:
+        result = GeocodeResult(float(location.longitude), float(location.latitude), getattr(location, "address", "") or "")
+    _store(key, query, result)
+    logger.info(
+        f"[GEOCODE] '{key}' -> {'not found' if result is None else (result.lat, result.lon)} | "
+        f"Upstream time: {time.time() - start:.4f}s"
+    )
+    return result
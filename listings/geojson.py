@@ -0,0 +1,122 @@
+"""
+GeoJSON serialization for the layer endpoints.
+
+Point layers are serialized by PostGIS: `feature_json` builds each Feature with
+json_build_object / ST_AsGeoJSON and returns it as text, so rows go from the
+cursor to the response without model instances or Python JSON encoding.
+
+Responses are streamed: features are written one at a time and flushed in
+~64 KB chunks, so the response starts as soon as the first rows arrive and
+memory stays flat no matter how many features a layer has. Members that are
+only known once every feature has been written (e.g. `next_cursor`) are
+produced by a callable and appended after the features array.
+"""
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Expression, F, Func, JSONField, QuerySet, TextField, Value
+from django.db.models.functions import Cast
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+
+from .geoapi import LayerPage, PageRequestError, parse_page_request
+
+logger = logging.getLogger(__name__)
+
+# Flush the buffer to the client once it holds this many bytes
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Decimal places kept in coordinates (6 ~ 0.1 m)
+GEOJSON_PRECISION = 6
+
+_encoder = DjangoJSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+# A feature as a dict, or as JSON text already produced by the database
+Feature = Union[Dict[str, Any], str]
+
+
+def text(value: str) -> Expression:
+    """Typed SQL text literal (bare parameters have no type inside json_build_object)."""
+    return Cast(Value(value), output_field=TextField())
+
+
+class JSONBuildObject(Func):
+    function = "json_build_object"
+    output_field = JSONField()
+
+    def __init__(self, **pairs: Expression):
+        args = []
+        for key, value in pairs.items():
+            args += [text(key), value]
+        super().__init__(*args)
+
+
+def feature_json(geometry: str = "location", *, precision: int = GEOJSON_PRECISION, **properties: Expression) -> Expression:
+    """
+    SQL expression for a whole GeoJSON Feature, as text.
+
+        Grocery.objects.values_list("id", feature_json(id=F("id"), name=F("name")))
+    """
+    feature = JSONBuildObject(
+        type=text("Feature"),
+        geometry=Cast(AsGeoJSON(geometry, precision=precision), output_field=JSONField()),
+        properties=JSONBuildObject(**properties),
+    )
+    return Cast(feature, output_field=TextField())
+
+
+def point_feature_rows(queryset, **properties: Expression):
+    """`(id, feature_text)` rows for a point layer; `id` is always a property."""
+    return queryset.values_list("id", feature_json(id=F("id"), **properties))
+
+
+def feature_collection_chunks(
+    features: Iterable[Feature],
+    trailer: Optional[Callable[[], Dict[str, Any]]] = None,
+) -> Iterator[bytes]:
+    """Encode a FeatureCollection piece by piece (pre-encoded features pass through)."""
+    buffer = ['{"type":"FeatureCollection","features":[']
+    size = 0
+    count = 0
+    for feature in features:
+        encoded = feature if isinstance(feature, str) else _encoder.encode(feature)
+        buffer.append("," + encoded if count else encoded)
+        size += len(encoded)
+        count += 1
+        if size >= STREAM_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+
+    buffer.append("]")
+    for key, value in (trailer() if trailer else {}).items():
+        buffer.append(f",{_encoder.encode(key)}:{_encoder.encode(value)}")
+    buffer.append("}")
+    yield "".join(buffer).encode("utf-8")
+    logger.debug(f"[GEOJSON_STREAM] Streamed {count} features")
+
+
+def streaming_feature_collection(
+    features: Iterable[Feature],
+    trailer: Optional[Callable[[], Dict[str, Any]]] = None,
+) -> StreamingHttpResponse:
+    """StreamingHttpResponse counterpart of JsonResponse({"type": "FeatureCollection", ...})."""
+    return StreamingHttpResponse(
+        feature_collection_chunks(features, trailer),
+        content_type="application/json",
+    )
+
+
+def stream_point_layer(request: HttpRequest, sources: Sequence[QuerySet]) -> HttpResponse:
+    """
+    Stream `point_feature_rows` querysets as one layer, honouring bbox / limit /
+    cursor (see listings.geoapi). Bad parameters return 400 before streaming starts.
+    """
+    try:
+        page = LayerPage(sources, parse_page_request(request))
+    except PageRequestError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return streaming_feature_collection(
+        (feature for _, (_, feature) in page), lambda: {"next_cursor": page.next_cursor}
+    )
@@ -0,0 +1,212 @@
+"""
+Sharded, parallel and resumable runs for the listing enrichment commands.
+
+    --shard i/n   process only the rows with pk % n == i (0 <= i < n), so n
+                  hosts can split one run without coordinating
+    --workers N   process chunks in a pool of N processes (each with its own
+                  DB connection)
+    --restart     ignore the shard's checkpoint and start over
+
+Work is split into chunks of primary keys. The parent process records the pks
+of each finished chunk in a per-shard checkpoint file under
+ENRICHMENT_CHECKPOINT_DIR; a rerun of the same command with the same
+selection skips them. The selection includes the version of the config the
+rows are computed from, so a config edit starts the run over. The checkpoint
+is removed once the shard completes.
+
+A chunk function takes `(pks, options)` and returns the number of rows it
+handled. It must be a module-level function (it is pickled by reference for
+the pool) and `options` must be picklable.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, QuerySet
+
+logger = logging.getLogger(__name__)
+
+ChunkFunc = Callable[[List[int], Dict[str, Any]], int]
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int = 0
+    count: int = 1
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def filter(self, queryset: QuerySet) -> QuerySet:
+        """Rows of this shard (deterministic: pk modulo shard count)."""
+        if self.count == 1:
+            return queryset
+        return queryset.alias(_shard=F("pk") % self.count).filter(_shard=self.index)
+
+    def pks(self, queryset: QuerySet) -> List[int]:
+        """Primary keys of this shard's rows; a sliced queryset (--limit) is split after the slice."""
+        if queryset.query.is_sliced:
+            return [pk for pk in queryset.values_list("pk", flat=True) if pk % self.count == self.index]
+        return list(self.filter(queryset).values_list("pk", flat=True))
+
+
+def parse_shard(value: str) -> Shard:
+    """argparse type for `i/n`."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard must look like i/n, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard i/n needs n >= 1 and 0 <= i < n")
+    return Shard(index, count)
+
+
+def add_sharding_arguments(parser) -> None:
+    parser.add_argument("--shard", type=parse_shard, default=Shard(), help="Process only shard i of n (pk % n == i)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1, in-process)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the shard checkpoint and start over")
+
+
+class Checkpoint:
+    """
+    Finished pks of one shard of one command run, kept in an append-only file:
+    a `{"key": ...}` header line, then one JSON list of pks per finished chunk.
+    Exact pks (not ranges) are recorded, so rows created after the interrupted
+    run are still processed on resume.
+    """
+
+    def __init__(self, name: str, shard: Shard, selection: Dict[str, Any]):
+        self.key = hashlib.md5(json.dumps(selection, sort_keys=True, default=str).encode()).hexdigest()
+        directory = Path(settings.ENRICHMENT_CHECKPOINT_DIR)
+        self.path = directory / f"{name}.{shard.index}-of-{shard.count}.jsonl"
+        self.pks: Set[int] = set()
+        self._started = False
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("key") != self.key:
+                    return
+                for line in f:
+                    try:
+                        self.pks.update(json.loads(line))
+                    except ValueError:
+                        # Torn last line of a killed run
+                        break
+        except (OSError, ValueError):
+            return
+        self._started = True
+
+    def done(self, pk: int) -> bool:
+        return pk in self.pks
+
+    def add(self, pks: Sequence[int]) -> None:
+        if not self._started:
+            # New run (or a different selection): start the file over
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({"key": self.key}) + "\n", encoding="utf-8")
+            self._started = True
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(list(pks)) + "\n")
+        self.pks.update(pks)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self.pks.clear()
+        self._started = False
+
+
+@dataclass
+class ShardedRunStats:
+    total: int = 0
+    skipped: int = 0  # finished by an earlier, interrupted run
+    successful: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+def _init_worker() -> None:
+    django.setup()
+
+
+def run_sharded(
+    name: str,
+    pks: Sequence[int],
+    func: ChunkFunc,
+    options: Dict[str, Any],
+    *,
+    chunk_size: int,
+    workers: int = 1,
+    shard: Shard = Shard(),
+    restart: bool = False,
+    selection: Optional[Dict[str, Any]] = None,
+    progress: Optional[Callable[[ShardedRunStats], None]] = None,
+) -> ShardedRunStats:
+    """
+    Run `func` over `pks` (already restricted to `shard`) in chunks, skipping
+    chunks a previous run of the same `name`/`selection` finished.
+    A failing chunk is reported and left out of the checkpoint, so a rerun retries it.
+    """
+    start = time.time()
+    checkpoint = Checkpoint(name, shard, {"selection": selection or {}, "chunk_size": chunk_size})
+    if restart:
+        checkpoint.clear()
+    else:
+        checkpoint.load()
+
+    ordered = sorted(pks)
+    todo = [pk for pk in ordered if not checkpoint.done(pk)]
+    stats = ShardedRunStats(total=len(ordered), skipped=len(ordered) - len(todo))
+    if stats.skipped:
+        logger.info(f"[SHARD {name} {shard}] Resuming: {stats.skipped} row(s) already done")
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+
+    def finished(chunk: List[int], count: Optional[int], error: Optional[BaseException]) -> None:
+        if error is None:
+            stats.successful += count or 0
+            checkpoint.add(chunk)
+        else:
+            stats.failed += len(chunk)
+            message = f"pk {chunk[0]}-{chunk[-1]}: {error}"
+            stats.errors.append(message)
+            logger.error(f"[SHARD {name} {shard}] Chunk failed, {message}")
+        if progress:
+            progress(stats)
+
+    if workers <= 1:
+        for chunk in chunks:
+            try:
+                finished(chunk, func(chunk, options), None)
+            except Exception as e:
+                finished(chunk, None, e)
+    else:
+        # Children must not share the parent's sockets
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(func, chunk, options): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    finished(chunk, future.result(), None)
+                except Exception as e:
+                    finished(chunk, None, e)
+
+    if not stats.failed:
+        checkpoint.clear()
+    stats.elapsed_seconds = time.time() - start
+    logger.info(
+        f"[SHARD {name} {shard}] {stats.successful} done, {stats.failed} failed, {stats.skipped} skipped | "
+        f"Workers: {workers} | Time: {stats.elapsed_seconds:.4f}s"
+    )
+    return stats
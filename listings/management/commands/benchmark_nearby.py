@@ -0,0 +1,75 @@
+import json
+import statistics
+from typing import Any, Dict, Iterator, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+
+from education_layer.models import InternationalSchool, Preschool
+from listings.models import Listing
+from listings.queries import NEARBY_LAYERS, NEARBY_ORIGIN_SQL, nearby_layer_sql
+
+# Geometry-typed layers that are not toggled in NearbyAmenityConfig but go through the same builder
+EXTRA_LAYERS = (("international_schools", InternationalSchool), ("preschools", Preschool))
+
+
+def _plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN ANALYZE the nearby-amenity KNN query per point layer around sample listing locations.\n"
+        "Reports the table size, the index the plan used (or 'SEQ SCAN') and the median execution time,\n"
+        "so regressions to full scans show up as the tables grow."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--samples", type=int, default=20, help="Listing locations to query around")
+        parser.add_argument("--radius", type=float, default=1000.0, help="Search radius in meters")
+        parser.add_argument("--limit", type=int, default=10, help="Rows per layer")
+
+    def handle(self, *args, **opts):
+        points: List[Tuple[float, float]] = [
+            (loc.x, loc.y)
+            for loc in Listing.objects.exclude(location=None).order_by("?").values_list("location", flat=True)[
+                : opts["samples"]
+            ]
+        ]
+        if not points:
+            self.stderr.write("No listings with a location to sample from.")
+            return
+
+        layers = [(key, model) for key, _, model in NEARBY_LAYERS if model is not None] + list(EXTRA_LAYERS)
+        self.stdout.write(f"{'layer':<22}{'rows':>10}  {'index':<40}{'median ms':>10}")
+        for key, model in layers:
+            rows, index, timings = self._explain(model, points, opts["radius"], opts["limit"])
+            line = f"{key:<22}{rows:>10}  {index:<40}{statistics.median(timings):>10.3f}"
+            self.stdout.write(self.style.ERROR(line) if index == "SEQ SCAN" else line)
+
+    def _explain(
+        self, model, points: List[Tuple[float, float]], radius_m: float, limit: int
+    ) -> Tuple[int, str, List[float]]:
+        sql = "EXPLAIN (ANALYZE, FORMAT JSON) " + NEARBY_ORIGIN_SQL + nearby_layer_sql(model)
+        table = model._meta.db_table
+        indexes = set()
+        seq_scan = False
+        timings: List[float] = []
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            rows = cursor.fetchone()[0]
+            for lon, lat in points:
+                cursor.execute(sql, [lon, lat, "benchmark", radius_m, limit])
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                timings.append(plan[0]["Execution Time"])
+                # The statement reads a single table, so every index in the plan is one of its own
+                for node in _plan_nodes(plan[0]["Plan"]):
+                    if "Index Name" in node:
+                        indexes.add(node["Index Name"])
+                    elif node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == table:
+                        seq_scan = True
+        index = "SEQ SCAN" if seq_scan or not indexes else ", ".join(sorted(indexes))
+        return rows, index, timings
@@ -0,0 +1,59 @@
+import csv
+from pathlib import Path
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from listings import gazetteer
+from listings.geocoding import GeocoderUnavailable, geocode
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the offline gazetteer (listings.GazetteerEntry) from station, mall, park and school names.\n"
+        "District points come from <BASE_DIR>/data/districts.csv (name,lat,lon) if present, otherwise\n"
+        "they are geocoded once through the shared geocoding cache."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--skip-districts", action="store_true", help="Do not add district entries")
+        parser.add_argument("--districts-csv", type=str, default="", help="CSV with name,lat,lon per district")
+
+    def handle(self, *args, **options):
+        districts: Dict[str, Tuple[float, float]] = {}
+        if not options["skip_districts"]:
+            csv_path = Path(options["districts_csv"] or Path(settings.BASE_DIR) / "data" / "districts.csv")
+            districts = self._read_csv(csv_path) if csv_path.exists() else self._geocode_districts()
+
+        count = gazetteer.rebuild(districts)
+        self.stdout.write(self.style.SUCCESS(f"Gazetteer rebuilt: {count} entries ({len(districts)} districts)"))
+
+    def _read_csv(self, path: Path) -> Dict[str, Tuple[float, float]]:
+        points: Dict[str, Tuple[float, float]] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    points[row["name"].strip()] = (float(row["lon"]), float(row["lat"]))
+                except (KeyError, TypeError, ValueError):
+                    self.stderr.write(f"  Skipping malformed row: {row}")
+        return points
+
+    def _geocode_districts(self) -> Dict[str, Tuple[float, float]]:
+        points: Dict[str, Tuple[float, float]] = {}
+        for i, name in enumerate(gazetteer.ISTANBUL_DISTRICTS, start=1):
+            query = f"{name}, İstanbul, Türkiye"
+            self.stdout.write(f"[{i}/{len(gazetteer.ISTANBUL_DISTRICTS)}] District: {query}")
+            try:
+                result = geocode(query, timeout=10)
+            except ImportError as exc:
+                self.stderr.write(f"  {exc}; districts skipped")
+                return points
+            except GeocoderUnavailable as exc:
+                self.stderr.write(f"  Geocoding failed: {exc}")
+                continue
+            if result is None:
+                self.stderr.write("  No result")
+                continue
+            points[name] = (result.lon, result.lat)
+        return points
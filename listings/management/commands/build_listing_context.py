@@ -1,15 +1,17 @@
 from __future__ import annotations
 
 import json
+import os
 from pathlib import Path
 from typing import Any, Dict, List
 
 from django.core.management.base import BaseCommand, CommandParser
 
+from listings import proximity
 from listings.models import ExternalListing, MapGenerationConfig
-from tools.nearby_enrichment import db_providers as dbp
-from tools.nearby_enrichment.minibus import nearby_minibus_segments, nearest_minibus_distance_m
-from tools.nearby_enrichment.bicycle import nearby_bicycle_segments, nearest_bicycle_distance_m
+from tools.nearby_enrichment.context_pack import ContextPack
+
+from ._sharding import add_sharding_arguments, run_sharded
 
 
 def _serialize_listing(ext: ExternalListing) -> Dict[str, Any]:
@@ -21,8 +23,47 @@ def _serialize_listing(ext: ExternalListing) -> Dict[str, Any]:
     }
 
 
+def _context_path(out_dir: Path, external_id: str) -> Path:
+    return out_dir / f"listing_{external_id}_context.json"
+
+
+def _build_context(ext: ExternalListing, cfg: MapGenerationConfig) -> Dict[str, Any]:
+    layers: Dict[str, Any] = {"listing": _serialize_listing(ext)}
+    # Pharmacy placeholder: integrate when a model/provider exists
+    nearby = proximity.layers_for(ext)
+    for key, _, _ in proximity.enabled_layers(cfg):
+        layers[key] = nearby.get(key, [])
+    layers["nearest_distances_m"] = ext.nearest_distances_m
+    return layers
+
+
+def _write_chunk(pks: List[int], options: Dict[str, Any]) -> int:
+    out_dir = Path(options["out_dir"])
+    cfg = MapGenerationConfig.get_config()
+    listings = list(ExternalListing.objects.filter(id__in=pks))
+    proximity.materialize(listings, cfg)
+
+    if options["format"] == "pack":
+        contexts = [(ext.external_id, _build_context(ext, cfg)) for ext in listings]
+        # Built first, so the pack lock is only held for the appends
+        with ContextPack(out_dir).writer() as writer:
+            for external_id, context in contexts:
+                writer.append(external_id, context)
+        return len(contexts)
+
+    for ext in listings:
+        context = _build_context(ext, cfg)
+        _context_path(out_dir, ext.external_id).write_text(json.dumps(context, ensure_ascii=False), encoding="utf-8")
+    return len(listings)
+
+
 class Command(BaseCommand):
-    help = "Build minimal JSON context (name + point + distance) per listing, based on MapGenerationConfig."
+    help = (
+        "Build minimal JSON context (name + point + distance) per listing, based on MapGenerationConfig.\n"
+        "Reads the materialised proximity table, rebuilding stale listings first.\n"
+        "--format pack appends the contexts to one JSON Lines pack with an offset index\n"
+        "(tools.nearby_enrichment.context_pack) instead of writing one file per listing."
+    )
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument("--source", default="coralcity", help="External source key")
@@ -30,12 +71,14 @@ class Command(BaseCommand):
         parser.add_argument("--all", action="store_true", help="Build for all listings of the source")
         parser.add_argument("--limit", type=int, default=24, help="When not using --listing-id, cap number of listings")
         parser.add_argument("--out-dir", default="distill_out/simplified/contexts", help="Output directory for JSON files")
-        parser.add_argument("--combined", action="store_true", help="Also write a combined contexts.json aggregating all")
+        parser.add_argument("--format", choices=("files", "pack"), default="files", help="One file per listing, or one pack")
+        parser.add_argument("--combined", action="store_true", help="Also write a combined contexts.json aggregating all (files format)")
+        parser.add_argument("--chunk-size", type=int, default=proximity.BATCH_SIZE, help="Listings per work unit")
+        add_sharding_arguments(parser)
 
     def handle(self, *args, **opts):
         source = opts["source"]
         out_dir = Path(opts["out_dir"]) ; out_dir.mkdir(parents=True, exist_ok=True)
-        cfg = MapGenerationConfig.get_config()
 
         if opts.get("listing_id"):
             qs = ExternalListing.objects.filter(source=source, external_id=str(opts["listing_id"]))
@@ -44,95 +87,57 @@ class Command(BaseCommand):
         else:
             qs = ExternalListing.objects.filter(source=source).order_by("-fetched_at")[: opts["limit"]]
 
+        cfg = MapGenerationConfig.get_config()
+        shard = opts["shard"]
+        pks = shard.pks(qs)
+        stats = run_sharded(
+            "build_listing_context",
+            pks,
+            _write_chunk,
+            {"out_dir": str(out_dir), "format": opts["format"]},
+            chunk_size=opts["chunk_size"],
+            workers=opts["workers"],
+            shard=shard,
+            restart=opts["restart"],
+            selection={
+                **{k: opts.get(k) for k in ("source", "listing_id", "all", "limit", "out_dir", "format")},
+                # Contexts built under another config or layer data must be redone
+                "config": cfg.updated_at,
+                "proximity": proximity.proximity_version(cfg),
+            },
+        )
+        for error in stats.errors:
+            self.stderr.write(self.style.ERROR(error))
+
+        if opts["format"] == "pack":
+            if shard.count == 1 and not stats.failed:
+                reclaimed = ContextPack(out_dir).compact()
+                if reclaimed:
+                    self.stdout.write(f"Compacted pack, {reclaimed} byte(s) of superseded contexts reclaimed")
+        elif opts.get("combined"):
+            self._write_combined(out_dir, pks, shard)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {stats.successful} context(s) to {out_dir} ({opts['format']}) [shard {shard}]")
+        )
+
+    def _write_combined(self, out_dir: Path, pks: List[int], shard) -> None:
+        """Stream the per-listing files into one JSON array, in selection order (resumed chunks included)."""
+        ids = dict(ExternalListing.objects.filter(id__in=pks).values_list("id", "external_id"))
+        name = "contexts.json" if shard.count == 1 else f"contexts.{shard.index}-of-{shard.count}.json"
+        tmp = out_dir / f"{name}.tmp"
         written = 0
-        combined: List[Dict[str, Any]] = []
-
-        for ext in qs:
-            layers: Dict[str, Any] = {"listing": _serialize_listing(ext)}
-
-            if cfg.enable_metro:
-                layers["metro"] = dbp.nearby_metro_stations(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_metro, limit=cfg.max_metro
-                )
-            if cfg.enable_metrobus:
-                layers["metrobus"] = dbp.nearby_metrobus_stations(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_metrobus, limit=cfg.max_metrobus
-                )
-            if cfg.enable_bus:
-                layers["bus"] = dbp.nearby_bus_stops(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_bus, limit=cfg.max_bus
-                )
-            if cfg.enable_grocery:
-                layers["grocery"] = dbp.nearby_groceries(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_grocery, limit=cfg.max_grocery
-                )
-            if cfg.enable_clothing:
-                layers["clothing"] = dbp.nearby_clothing(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_clothing, limit=cfg.max_clothing
-                )
-            if cfg.enable_malls:
-                layers["malls"] = dbp.nearby_malls(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_malls, limit=cfg.max_malls
-                )
-            if cfg.enable_parks:
-                layers["parks"] = dbp.nearby_parks(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_parks, limit=cfg.max_parks
-                )
-            # Pharmacy placeholder: integrate when a model/provider exists
-            if cfg.enable_minibus:
-                layers["minibus"] = nearby_minibus_segments(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_minibus, limit=cfg.max_minibus
-                )
-            if cfg.enable_taxi:
-                layers["taxi"] = dbp.nearby_taxi_stands(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_taxi, limit=cfg.max_taxi
-                )
-            if cfg.enable_bicycle:
-                layers["bicycle"] = nearby_bicycle_segments(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_bicycle, limit=cfg.max_bicycle
-                )
-
-            # Summarize nearest distances (meters) per enabled layer
-            def _min_dist(arr):
-                try:
-                    return min(x.get("distance_m") for x in arr if x.get("distance_m") is not None)
-                except (ValueError, TypeError):
-                    return None
-
-            nearest: Dict[str, Any] = {}
-            if cfg.enable_metro:
-                nearest["metro_m"] = _min_dist(layers.get("metro", []))
-            if cfg.enable_metrobus:
-                nearest["metrobus_m"] = _min_dist(layers.get("metrobus", []))
-            if cfg.enable_bus:
-                nearest["bus_m"] = _min_dist(layers.get("bus", []))
-            if cfg.enable_grocery:
-                nearest["grocery_m"] = _min_dist(layers.get("grocery", []))
-            if cfg.enable_clothing:
-                nearest["clothing_m"] = _min_dist(layers.get("clothing", []))
-            if cfg.enable_malls:
-                nearest["malls_m"] = _min_dist(layers.get("malls", []))
-            if cfg.enable_parks:
-                nearest["parks_m"] = _min_dist(layers.get("parks", []))
-            if cfg.enable_taxi:
-                nearest["taxi_m"] = _min_dist(layers.get("taxi", []))
-            if cfg.enable_minibus:
-                # Use geometry-based distance for higher fidelity
-                d = nearest_minibus_distance_m(lon=ext.lng, lat=ext.lat, max_radius_m=cfg.radius_minibus)
-                nearest["minibus_m"] = d
-            if cfg.enable_bicycle:
-                d = nearest_bicycle_distance_m(lon=ext.lng, lat=ext.lat, max_radius_m=cfg.radius_bicycle)
-                nearest["bicycle_m"] = d
-
-            layers["nearest_distances_m"] = nearest
-
-            out_path = out_dir / f"listing_{ext.external_id}_context.json"
-            out_path.write_text(json.dumps(layers, ensure_ascii=False), encoding="utf-8")
-            written += 1
-            if opts.get("combined"):
-                combined.append(layers)
-
-        if opts.get("combined") and combined:
-            (out_dir / "contexts.json").write_text(json.dumps(combined, ensure_ascii=False), encoding="utf-8")
-
-        self.stdout.write(self.style.SUCCESS(f"Wrote {written} context file(s) to {out_dir}"))
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("[")
+            for pk in pks:
+                path = _context_path(out_dir, ids[pk])
+                if not path.exists():
+                    continue
+                f.write("," if written else "")
+                f.write(path.read_text(encoding="utf-8"))
+                written += 1
+            f.write("]")
+        if written:
+            os.replace(tmp, out_dir / name)
+        else:
+            tmp.unlink()
@@ -3,13 +3,28 @@ Management command to pre-compute and cache closest stores for all listings.
 This should be run after adding new listings or when configuration changes.
 """
 import logging
+from typing import Any, Dict, List
+
 from django.core.management.base import BaseCommand
-from listings.models import DisplayConfig
+from django.db import transaction
+from listings.models import ClosestStoresCache, DisplayConfig, Listing
 from listings.services import ClosestStoresService
 
+from ._sharding import add_sharding_arguments, run_sharded
+
 logger = logging.getLogger(__name__)
 
 
+def _compute_chunk(pks: List[int], options: Dict[str, Any]) -> int:
+    config = DisplayConfig.get_config()
+    if options["per_listing"]:
+        for listing in Listing.objects.filter(pk__in=pks):
+            ClosestStoresService.compute_closest_stores_for_listing(listing, config)
+        return len(pks)
+    with transaction.atomic():
+        return ClosestStoresService.compute_batch(pks, config)
+
+
 class Command(BaseCommand):
     help = "Pre-compute and cache the closest stores for all listings"
     
@@ -24,6 +39,18 @@ class Command(BaseCommand):
             action="store_true",
             help="Only invalidate cache, don't recompute",
         )
+        parser.add_argument(
+            "--per-listing",
+            action="store_true",
+            help="Compute listing by listing instead of the set-based batch mode",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Listings per batch statement (default: 500)",
+        )
+        add_sharding_arguments(parser)
     
     def handle(self, *args, **options):
         self.stdout.write(self.style.HTTP_INFO("=" * 80))
@@ -44,26 +71,47 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS("✓ Cache invalidated!"))
             return
         
+        shard = options["shard"]
+        pks = shard.pks(Listing.objects.all())
+
         if options["invalidate"]:
             self.stdout.write(self.style.WARNING("\n⚠ Invalidating all cache..."))
-            ClosestStoresService.invalidate_all_cache()
+            if shard.count == 1:
+                ClosestStoresService.invalidate_all_cache()
+            else:
+                # Other shards may already be done; only drop this shard's rows
+                ClosestStoresCache.objects.filter(listing_id__in=pks).delete()
             self.stdout.write(self.style.SUCCESS("✓ Cache invalidated!"))
         
-        self.stdout.write(self.style.HTTP_INFO("\n⏳ Computing cache for all listings..."))
-        stats = ClosestStoresService.compute_all_listings()
+        self.stdout.write(self.style.HTTP_INFO(
+            f"\n⏳ Computing cache for all listings (shard {shard}, {options['workers']} worker(s))..."
+        ))
+        stats = run_sharded(
+            "cache_closest_stores",
+            pks,
+            _compute_chunk,
+            {"per_listing": options["per_listing"]},
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            shard=shard,
+            restart=options["restart"] or options["invalidate"],
+            # Rows cached under another DisplayConfig must be redone
+            selection={"per_listing": options["per_listing"], "config": config.updated_at},
+        )
         
         self.stdout.write(self.style.SUCCESS(
             f"\n✓ Cache computation complete!\n"
-            f"  - Total listings: {stats['total']}\n"
-            f"  - Successful: {stats['successful']}\n"
-            f"  - Failed: {stats['failed']}\n"
-            f"  - Elapsed time: {stats['elapsed_seconds']:.2f}s"
+            f"  - Total listings: {stats.total}\n"
+            f"  - Successful: {stats.successful}\n"
+            f"  - Failed: {stats.failed}\n"
+            f"  - Resumed (already done): {stats.skipped}\n"
+            f"  - Elapsed time: {stats.elapsed_seconds:.2f}s"
         ))
         
-        if stats["errors"]:
+        if stats.errors:
             self.stdout.write(self.style.ERROR(
                 f"\n⚠ Errors encountered:\n"
-                f"{chr(10).join('  - ' + e for e in stats['errors'])}"
+                f"{chr(10).join('  - ' + e for e in stats.errors)}"
             ))
         
         self.stdout.write(self.style.HTTP_INFO("=" * 80))
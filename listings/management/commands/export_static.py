@@ -0,0 +1,264 @@
+"""
+Incremental, parallel export of the django_distill pages into distill_out/.
+
+The outputs are the distill_path registrations, enumerated like distill-local
+does. Every output has a key: a hash of the data version (row count + latest
+updated_at) of the tables it reads, the code of the apps rendering it (every
+module except migrations and management commands), its template source and
+the settings that change it; what an output reads is declared per URL name in
+OUTPUT_INPUTS, and an output without an entry there is rendered on every run.
+Keys are kept in a manifest next to the output; an output whose key matches
+and whose file still exists is skipped. Outputs that are
+due are rendered concurrently with RequestFactory (streamed responses are
+drained), written to a temp file in the target directory and moved into place
+with os.replace, so a reader never sees a half-written file. STATIC_ROOT and
+MEDIA_ROOT are then copied like distill-local does, skipping unchanged files.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import resolve
+from django_distill.distill import urls_to_distill
+from django_distill.renderer import filter_dirs, get_filepath, get_renderer, load_urls
+
+from tools.nearby_enrichment.poi_index import fetch_layer_versions
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".export-manifest.json"
+
+
+@dataclass(frozen=True)
+class OutputInputs:
+    tables: Tuple[str, ...] = ()
+    template: str = ""
+    setting_names: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class Export:
+    uri: str
+    distill_file: str
+    url_name: str
+    inputs: Optional[OutputInputs] = None
+
+
+# Apps whose code renders the outputs (with tools/); any change re-renders every output
+CODE_APPS = ("listings", "transit_layer", "stores_layer")
+
+# What each distill_path view reads besides code, by URL name (see IstanbulPropTech/urls.py)
+LISTING_TABLES = (
+    "listings.Listing",
+    "listings.ListingImage",
+    "listings.ClosestStoresCache",
+    "transit_layer.MetroStation",
+    "stores_layer.Grocery",
+    "stores_layer.Clothing",
+)
+OUTPUT_INPUTS: Dict[str, OutputInputs] = {
+    "map": OutputInputs(template="listings/map_view_mob.html"),
+    "simplified_map": OutputInputs(
+        tables=LISTING_TABLES,
+        template="listings/map_view_simplified.html",
+        setting_names=("SIMPLIFIED_INLINE_DATA",),
+    ),
+    "listings_geojson": OutputInputs(tables=LISTING_TABLES + ("listings.DisplayConfig",)),
+    "simplified_geojson": OutputInputs(tables=LISTING_TABLES),
+    "metro_stations_geojson": OutputInputs(tables=("transit_layer.MetroStation",)),
+    "transit_geojson": OutputInputs(tables=("transit_layer.MetroStation", "transit_layer.BusStop")),
+    "stores_geojson": OutputInputs(tables=("stores_layer.Clothing", "stores_layer.Grocery")),
+}
+
+
+def distill_exports() -> List[Export]:
+    """Every distill_path output (one per URI and language), as distill-local renders them."""
+    load_urls()
+    exports = []
+    for uri, file_name in get_renderer(urls_to_distill).urls():
+        distill_file, _ = get_filepath("", file_name, uri)
+        url_name = resolve(uri).url_name
+        exports.append(Export(uri, distill_file, url_name, OUTPUT_INPUTS.get(url_name)))
+    return exports
+
+
+def _template_hash(name: str) -> str:
+    if not name:
+        return ""
+    origin = get_template(name).origin.name
+    return hashlib.md5(Path(origin).read_bytes()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _code_hash() -> str:
+    """Hash of the Python sources of CODE_APPS and tools/ (views and the helpers they use)."""
+    digest = hashlib.md5()
+    roots = [Path(apps.get_app_config(label).path) for label in CODE_APPS] + [Path(settings.BASE_DIR) / "tools"]
+    for root in roots:
+        for path in sorted(root.rglob("*.py")):
+            if {"migrations", "management"} & set(path.relative_to(root).parts):
+                continue
+            digest.update(f"{root.name}/{path.relative_to(root)}".encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _export_key(export: Export, versions: Dict[str, Tuple[Any, ...]]) -> Optional[str]:
+    """None when the output's inputs are not declared (it cannot be skipped safely)."""
+    inputs = export.inputs
+    if inputs is None:
+        return None
+    payload = repr((
+        export.uri,
+        [(label, versions[label]) for label in inputs.tables],
+        _code_hash(),
+        _template_hash(inputs.template),
+        [(name, getattr(settings, name, None)) for name in inputs.setting_names],
+    ))
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def _render(export: Export) -> bytes:
+    path = export.uri
+    match = resolve(path)
+    try:
+        response = match.func(RequestFactory().get(path), *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        # The GeoJSON layers are StreamingHttpResponses
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+    finally:
+        # Each render thread has its own connection
+        connection.close()
+    if response.status_code != 200:
+        raise CommandError(f"{path} returned HTTP {response.status_code}")
+    return body
+
+
+def _copy_changed(src: Path, dst: Path) -> int:
+    """Copy `src` into `dst` (the directories distill-local skips excluded), only files whose size or mtime differ."""
+    copied = 0
+    for root, dirs, files in os.walk(src):
+        dirs[:] = filter_dirs(dirs)
+        for name in files:
+            source = Path(root) / name
+            target = dst / source.relative_to(src)
+            stat = source.stat()
+            try:
+                current = target.stat()
+                if current.st_size == stat.st_size and current.st_mtime >= stat.st_mtime:
+                    continue
+            except FileNotFoundError:
+                pass
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, target)
+            copied += 1
+    return copied
+
+
+def _write_atomic(path: Path, body: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every django_distill page (as distill-local enumerates them) into distill_out/.\n"
+        "Only outputs whose tables, code, template or settings changed since the last export\n"
+        "are re-rendered, concurrently, and each file is replaced atomically. Static and media files\n"
+        "are copied as by distill-local (run collectstatic first). Code outside the project apps\n"
+        "(e.g. an upgraded dependency) is not tracked: use --force after upgrades."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--out-dir", default="distill_out", help="Export directory (default: distill_out)")
+        parser.add_argument("--workers", type=int, default=4, help="Outputs rendered concurrently (default: 4)")
+        parser.add_argument("--force", action="store_true", help="Re-render every output")
+        parser.add_argument("--only", nargs="+", metavar="FILE", help="Export only these distill files")
+        parser.add_argument("--exclude-staticfiles", action="store_true", help="Do not copy static and media files")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        out_dir = Path(options["out_dir"])
+        manifest_path = out_dir / MANIFEST_NAME
+        try:
+            manifest: Dict[str, str] = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+
+        all_exports = distill_exports()
+        unknown = set(options["only"] or ()) - {e.distill_file for e in all_exports}
+        if unknown:
+            raise CommandError(f"Unknown distill file(s): {', '.join(sorted(unknown))}")
+        exports = [e for e in all_exports if not options["only"] or e.distill_file in options["only"]]
+        for export in exports:
+            if export.inputs is None:
+                self.stdout.write(self.style.WARNING(
+                    f"  {export.distill_file}: no OUTPUT_INPUTS entry for '{export.url_name}', always rendered"
+                ))
+        labels = sorted({label for e in exports if e.inputs for label in e.inputs.tables})
+        versions = fetch_layer_versions(labels) if labels else {}
+
+        due: Dict[Export, Optional[str]] = {}
+        for export in exports:
+            key = _export_key(export, versions)
+            if (
+                key is None
+                or options["force"]
+                or manifest.get(export.distill_file) != key
+                or not (out_dir / export.distill_file).exists()
+            ):
+                due[export] = key
+        self.stdout.write(f"{len(due)} of {len(exports)} output(s) to render")
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            futures = {pool.submit(_render, export): export for export in due}
+            for future in as_completed(futures):
+                export = futures[future]
+                try:
+                    body = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"[EXPORT_FAILED] {export.distill_file}: {e}", exc_info=True)
+                    self.stderr.write(self.style.ERROR(f"  ✗ {export.distill_file}: {e}"))
+                    continue
+                _write_atomic(out_dir / export.distill_file, body)
+                if due[export] is None:
+                    manifest.pop(export.distill_file, None)
+                else:
+                    manifest[export.distill_file] = due[export]
+                self.stdout.write(f"  ✓ {export.distill_file} ({len(body)} bytes)")
+
+        _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+        if not options["exclude_staticfiles"]:
+            for url, root in ((settings.STATIC_URL, settings.STATIC_ROOT), (settings.MEDIA_URL, settings.MEDIA_ROOT)):
+                if root and Path(root).is_dir():
+                    copied = _copy_changed(Path(root), out_dir / str(url).strip("/"))
+                    self.stdout.write(f"  {copied} changed file(s) copied from {root}")
+
+        elapsed = time.time() - start
+        message = (
+            f"Exported {len(due) - failed} output(s), {len(exports) - len(due)} unchanged, "
+            f"{failed} failed in {elapsed:.2f}s"
+        )
+        if failed:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -2,15 +2,18 @@ from __future__ import annotations
 
 import json
 import base64
+import hashlib
+import os
+import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from django.core.management.base import BaseCommand, CommandParser
 
+from listings import proximity
 from listings.models import ExternalListing, MapGenerationConfig
-from tools.nearby_enrichment import db_providers as dbp
-from tools.nearby_enrichment.minibus import nearby_minibus_segments, nearest_minibus_distance_m
-from tools.nearby_enrichment.bicycle import nearby_bicycle_segments, nearest_bicycle_distance_m
+
+from ._sharding import add_sharding_arguments, run_sharded
 
 
 HTML_SKELETON = """<!DOCTYPE html>
@@ -18,6 +21,7 @@ HTML_SKELETON = """<!DOCTYPE html>
 <head>
   <meta charset=\"UTF-8\" />
   <meta name=\"viewport\" content=\"width=device-width,initial-scale=1\" />
+  <meta name=\"ipt-inputs\" content=\"{inputs_hash}\" />
   <title>Listing Map #{listing_id}</title>
   <link rel=\"stylesheet\" href=\"https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.min.css\" />
   <style>
@@ -35,9 +39,10 @@ HTML_SKELETON = """<!DOCTYPE html>
   <div id=\"map\"></div>
   <div class=\"badge\">{title} • {price}</div>
   <script src=\"https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.min.js\"></script>
+  <script src=\"{icons_src}\"></script>
   <script>
     const DATA = {data_json};
-    const ICONS = {icons_json};
+    const ICONS = window.IPT_ICONS || {{}};
     const PRESERVE_ASPECT = {preserve_aspect};
     // Force exact sizes for selected layers regardless of aspect mode
     const FIXED_SIZES = {{ metrobus: [24, 24], taxi: [24, 24], grocery: [24, 24] }};
@@ -117,8 +122,159 @@ HTML_SKELETON = """<!DOCTYPE html>
 """
 
 
+# Part of every map's input hash, so a template change regenerates all maps
+TEMPLATE_HASH = hashlib.md5(HTML_SKELETON.encode("utf-8")).hexdigest()
+
+_INPUTS_RE = re.compile(rb'<meta name="ipt-inputs" content="([0-9a-f]+)"')
+
+
+def _load_icons() -> Dict[str, Optional[str]]:
+    """Inlined icons from distill_out/static/store_icons, as data: URIs."""
+    icons_dir = Path('distill_out/static/store_icons')
+
+    def _read_b64(path: Path) -> Optional[str]:
+        if not path.exists():
+            return None
+        data = path.read_bytes()
+        ext = path.suffix.lower()
+        mime = 'image/png'
+        if ext == '.webp':
+            mime = 'image/webp'
+        elif ext == '.svg':
+            mime = 'image/svg+xml'
+        elif ext == '.ico':
+            mime = 'image/x-icon'
+        b64 = base64.b64encode(data).decode('ascii')
+        return f"data:{mime};base64,{b64}"
+
+    def _first_existing(names: List[str]) -> Optional[str]:
+        for n in names:
+            uri = _read_b64(icons_dir / n)
+            if uri:
+                return uri
+        return None
+
+    return {
+        # transit
+        'metro': _first_existing(['metro.png', 'Metro.png', 'metro.ico', 'Metro.ico']),
+        'metrobus': _first_existing(['Metrobus.png', 'metrobus.png', 'Metrobus.ico', 'metrobus.ico']),
+        'bus': _first_existing(['IETT.png', 'bus.png', 'IETT.ico', 'bus.ico']),
+        'taxi': _first_existing(['taxi.png', 'taxi.ico']),
+        # amenities
+        'grocery': _first_existing(['grocery.png', 'grocery.ico', 'bim.png', 'bim.ico', 'migros.png', 'migros.ico', 'a101.png', 'a101.ico', 'sok.png', 'sok.ico']),
+        'clothing': _first_existing(['clothing.png', 'clothing.ico', 'mavi.png', 'mavi.ico']),
+        'malls': _first_existing(['mall.png', 'mall.ico', 'malls.png', 'malls.ico']),
+        'parks': _first_existing(['park.png', 'park.webp', 'parks.png', 'park.ico', 'parks.ico']),
+        # extras
+        'minibus': _first_existing(['minibus.png', 'minibus.ico', 'van.png', 'van.ico']),
+        'bicycle': _first_existing(['bicycle.png', 'bicycle.ico']),
+        'listing': _first_existing(['listing.png', 'listing.ico']),
+    }
+
+
+def _write_icons_asset(out_dir: Path) -> str:
+    """
+    Write the icon set once as `icons.<content hash>.js` next to the maps and
+    return its file name. The name changes with the icons, so it can be cached forever.
+    """
+    payload = f"window.IPT_ICONS = {json.dumps(_load_icons(), ensure_ascii=False)};\n".encode("utf-8")
+    name = f"icons.{hashlib.md5(payload).hexdigest()[:12]}.js"
+    path = out_dir / name
+    if not path.exists():
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+    return name
+
+
+def _inputs_hash(ext: ExternalListing, cfg: MapGenerationConfig, options: Dict[str, Any]) -> str:
+    """
+    Hash of everything a map is rendered from. The proximity version covers the
+    layer settings and every layer's data, so no layer is queried to compute it.
+    """
+    payload = repr((
+        TEMPLATE_HASH,
+        options["icons_src"],
+        options["preserve_icon_aspect"],
+        ext.proximity_version,
+        [getattr(cfg, f"enable_{key}") for key in ("minibus", "bicycle", "taxi")],
+        ext.external_id,
+        ext.title,
+        ext.price,
+        ext.lat,
+        ext.lng,
+        ext.nearest_distances_m,
+    ))
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def _written_hash(path: Path) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            match = _INPUTS_RE.search(f.read(1024))
+    except FileNotFoundError:
+        return None
+    return match.group(1).decode("ascii") if match else None
+
+
+def _write_chunk(pks: List[int], options: Dict[str, Any]) -> int:
+    out_dir = Path(options["out_dir"])
+    cfg = MapGenerationConfig.get_config()
+    listings = list(ExternalListing.objects.filter(id__in=pks))
+    proximity.materialize(listings, cfg)
+
+    written = 0
+    for ext in listings:
+        out_path = out_dir / f"listing_{ext.external_id}.html"
+        inputs_hash = _inputs_hash(ext, cfg, options)
+        if not options["force"] and _written_hash(out_path) == inputs_hash:
+            continue
+
+        layers = proximity.layers_for(ext)
+        data = {
+            "listing": {
+                "id": ext.external_id,
+                "title": ext.title,
+                "price": ext.price,
+                "lat": ext.lat,
+                "lng": ext.lng,
+            },
+            "closest_stations": layers.get("metro", []),
+            "closest_metrobus": layers.get("metrobus", []),
+            "closest_bus_stops": layers.get("bus", []),
+            "closest_grocery_stores": layers.get("grocery", []),
+            "closest_clothing_stores": layers.get("clothing", []),
+        }
+        for key in ("minibus", "bicycle", "taxi"):
+            if getattr(cfg, f"enable_{key}"):
+                data[key] = layers.get(key, [])
+        if ext.nearest_distances_m:
+            data["nearest_distances_m"] = ext.nearest_distances_m
+        html = HTML_SKELETON.format(
+            listing_id=ext.external_id,
+            title=(ext.title or f"Listing #{ext.external_id}"),
+            price=(f"{ext.price:,} TL" if ext.price else ""),
+            inputs_hash=inputs_hash,
+            icons_src=options["icons_src"],
+            data_json=json.dumps(data, ensure_ascii=False),
+            preserve_aspect=json.dumps(options["preserve_icon_aspect"]),
+            icon_max=24,
+            listing_max=28,
+            metrobus_max=18,
+            taxi_max=18,
+            grocery_max=18,
+        )
+        out_path.write_text(html, encoding="utf-8")
+        written += 1
+    return written
+
+
 class Command(BaseCommand):
-    help = "Generate one static HTML Leaflet map per ExternalListing with inline nearby metro stations."
+    help = (
+        "Generate one static HTML Leaflet map per ExternalListing with inline nearby metro stations.\n"
+        "Maps whose inputs (listing, proximity version, config, icons, template) are unchanged are\n"
+        "skipped; icons are shared through one content-hashed icons.<hash>.js."
+    )
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument("--source", default="coralcity", help="External source key to include")
@@ -127,6 +283,9 @@ class Command(BaseCommand):
         parser.add_argument("--radius-m", type=int, default=2000, help="Search radius for metro stations (meters)")
         parser.add_argument("--out-dir", default="distill_out/simplified/maps", help="Directory to write maps into")
         parser.add_argument("--preserve-icon-aspect", action="store_true", help="Render icons at natural aspect ratio with CSS max size")
+        parser.add_argument("--force", action="store_true", help="Rewrite maps even when their inputs are unchanged")
+        parser.add_argument("--chunk-size", type=int, default=proximity.BATCH_SIZE, help="Listings per work unit")
+        add_sharding_arguments(parser)
 
     def handle(self, *args, **opts):
         out_dir = Path(opts["out_dir"]) ; out_dir.mkdir(parents=True, exist_ok=True)
@@ -134,121 +293,37 @@ class Command(BaseCommand):
             qs = ExternalListing.objects.filter(source=opts["source"], external_id=str(opts["listing_id"]))
         else:
             qs = ExternalListing.objects.filter(source=opts["source"]).order_by("-fetched_at")[: opts["limit"]]
-        cfg = MapGenerationConfig.get_config()
-
-        # Prepare inlined icons from distill_out/static/store_icons
-        icons_dir = Path('distill_out/static/store_icons')
-
-        def _read_b64(path: Path) -> Optional[str]:
-            if not path.exists():
-                return None
-            data = path.read_bytes()
-            ext = path.suffix.lower()
-            mime = 'image/png'
-            if ext == '.webp':
-                mime = 'image/webp'
-            elif ext == '.svg':
-                mime = 'image/svg+xml'
-            elif ext == '.ico':
-                mime = 'image/x-icon'
-            b64 = base64.b64encode(data).decode('ascii')
-            return f"data:{mime};base64,{b64}"
-
-        def _first_existing(names: List[str]) -> Optional[str]:
-            for n in names:
-                uri = _read_b64(icons_dir / n)
-                if uri:
-                    return uri
-            return None
 
-        icons: Dict[str, Optional[str]] = {
-            # transit
-            'metro': _first_existing(['metro.png', 'Metro.png', 'metro.ico', 'Metro.ico']),
-            'metrobus': _first_existing(['Metrobus.png', 'metrobus.png', 'Metrobus.ico', 'metrobus.ico']),
-            'bus': _first_existing(['IETT.png', 'bus.png', 'IETT.ico', 'bus.ico']),
-            'taxi': _first_existing(['taxi.png', 'taxi.ico']),
-            # amenities
-            'grocery': _first_existing(['grocery.png', 'grocery.ico', 'bim.png', 'bim.ico', 'migros.png', 'migros.ico', 'a101.png', 'a101.ico', 'sok.png', 'sok.ico']),
-            'clothing': _first_existing(['clothing.png', 'clothing.ico', 'mavi.png', 'mavi.ico']),
-            'malls': _first_existing(['mall.png', 'mall.ico', 'malls.png', 'malls.ico']),
-            'parks': _first_existing(['park.png', 'park.webp', 'parks.png', 'park.ico', 'parks.ico']),
-            # extras
-            'minibus': _first_existing(['minibus.png', 'minibus.ico', 'van.png', 'van.ico']),
-            'bicycle': _first_existing(['bicycle.png', 'bicycle.ico']),
-            'listing': _first_existing(['listing.png', 'listing.ico']),
-        }
+        cfg = MapGenerationConfig.get_config()
+        shard = opts["shard"]
+        pks = shard.pks(qs)
+        stats = run_sharded(
+            "generate_listing_maps",
+            pks,
+            _write_chunk,
+            {
+                "out_dir": str(out_dir),
+                "icons_src": _write_icons_asset(out_dir),
+                "preserve_icon_aspect": bool(opts.get("preserve_icon_aspect")),
+                "force": opts["force"],
+            },
+            chunk_size=opts["chunk_size"],
+            workers=opts["workers"],
+            shard=shard,
+            restart=opts["restart"],
+            selection={
+                **{k: opts.get(k) for k in ("source", "listing_id", "limit", "out_dir", "preserve_icon_aspect", "force")},
+                # Maps rendered under another config or layer data must be redone
+                "config": cfg.updated_at,
+                "proximity": proximity.proximity_version(cfg),
+            },
+        )
+        for error in stats.errors:
+            self.stderr.write(self.style.ERROR(error))
 
-        written = 0
-        for ext in qs:
-            # Build nearby layers per config
-            stations = dbp.nearby_metro_stations(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_metro, limit=cfg.max_metro) if cfg.enable_metro else []
-            metrobus = dbp.nearby_metrobus_stations(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_metrobus, limit=cfg.max_metrobus) if cfg.enable_metrobus else []
-            bus = dbp.nearby_bus_stops(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_bus, limit=cfg.max_bus) if cfg.enable_bus else []
-            groceries = dbp.nearby_groceries(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_grocery, limit=cfg.max_grocery) if cfg.enable_grocery else []
-            clothing = dbp.nearby_clothing(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_clothing, limit=cfg.max_clothing) if cfg.enable_clothing else []
-            data = {
-                "listing": {
-                    "id": ext.external_id,
-                    "title": ext.title,
-                    "price": ext.price,
-                    "lat": ext.lat,
-                    "lng": ext.lng,
-                },
-                "closest_stations": stations,
-                "closest_metrobus": metrobus,
-                "closest_bus_stops": bus,
-                "closest_grocery_stores": groceries,
-                "closest_clothing_stores": clothing,
-            }
-            # Summarize nearest distances in meters
-            def _min_dist(arr):
-                try:
-                    return min(x.get("distance_m") for x in arr if x.get("distance_m") is not None)
-                except (ValueError, TypeError):
-                    return None
-            nearest = {}
-            if cfg.enable_metro:
-                nearest["metro_m"] = _min_dist(stations)
-            if cfg.enable_metrobus:
-                nearest["metrobus_m"] = _min_dist(metrobus)
-            if cfg.enable_bus:
-                nearest["bus_m"] = _min_dist(bus)
-            if cfg.enable_grocery:
-                nearest["grocery_m"] = _min_dist(groceries)
-            if cfg.enable_clothing:
-                nearest["clothing_m"] = _min_dist(clothing)
-            if cfg.enable_minibus:
-                data["minibus"] = nearby_minibus_segments(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_minibus, limit=cfg.max_minibus
-                )
-                nearest["minibus_m"] = nearest_minibus_distance_m(lon=ext.lng, lat=ext.lat, max_radius_m=cfg.radius_minibus)
-            if cfg.enable_bicycle:
-                data["bicycle"] = nearby_bicycle_segments(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_bicycle, limit=cfg.max_bicycle
-                )
-                nearest["bicycle_m"] = nearest_bicycle_distance_m(lon=ext.lng, lat=ext.lat, max_radius_m=cfg.radius_bicycle)
-            if cfg.enable_taxi:
-                data["taxi"] = dbp.nearby_taxi_stands(
-                    lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_taxi, limit=cfg.max_taxi
-                )
-                nearest["taxi_m"] = _min_dist(data["taxi"]) if data.get("taxi") else None
-            if nearest:
-                data["nearest_distances_m"] = nearest
-            html = HTML_SKELETON.format(
-                listing_id=ext.external_id,
-                title=(ext.title or f"Listing #{ext.external_id}"),
-                price=(f"{ext.price:,} TL" if ext.price else ""),
-                data_json=json.dumps(data, ensure_ascii=False),
-                icons_json=json.dumps(icons, ensure_ascii=False),
-                preserve_aspect=json.dumps(bool(opts.get("preserve_icon_aspect"))),
-                icon_max=24,
-                listing_max=28,
-                metrobus_max=18,
-                taxi_max=18,
-                grocery_max=18,
+        unchanged = len(pks) - stats.skipped - stats.failed - stats.successful
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {stats.successful} map file(s) to {out_dir}, {unchanged} unchanged [shard {shard}]"
             )
-            out_path = out_dir / f"listing_{ext.external_id}.html"
-            out_path.write_text(html, encoding="utf-8")
-            written += 1
-
-        self.stdout.write(self.style.SUCCESS(f"Wrote {written} map file(s) to {out_dir}"))
+        )
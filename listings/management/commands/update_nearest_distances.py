@@ -1,38 +1,64 @@
 from __future__ import annotations
 
-import json
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Tuple
 
-from django.core.management.base import BaseCommand, CommandParser
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
 
+from listings import proximity
 from listings.models import ExternalListing, MapGenerationConfig
-from tools.nearby_enrichment import db_providers as dbp
-from tools.nearby_enrichment.minibus import nearest_minibus_distance_m
-from tools.nearby_enrichment.bicycle import nearest_bicycle_distance_m
 
+from ._sharding import add_sharding_arguments, run_sharded
 
-def _min_dist(arr: Optional[List[Dict[str, Any]]]) -> Optional[float]:
-    if not arr:
-        return None
-    try:
-        return min(x.get("distance_m") for x in arr if x.get("distance_m") is not None)
-    except (ValueError, TypeError):
-        return None
+# Per-process k-d trees, keyed by the enabled layer settings
+_TREES: Dict[Tuple, Dict[str, Any]] = {}
+
+
+def _materialize_chunk(pks: List[int], options: Dict[str, Any]) -> int:
+    return proximity.materialize(ExternalListing.objects.filter(id__in=pks), force=options["force"])
+
+
+def _batch_chunk(pks: List[int], options: Dict[str, Any]) -> int:
+    cfg = MapGenerationConfig.get_config()
+    key = tuple(proximity.enabled_layers(cfg))
+    if key not in _TREES:
+        _TREES.clear()
+        _TREES[key] = proximity.layer_trees(cfg)
+
+    rows = list(ExternalListing.objects.filter(id__in=pks).values_list("id", "lng", "lat"))
+    distances = proximity.nearest_distances_batch([(lng, lat) for _, lng, lat in rows], cfg, _TREES[key])
+    now = timezone.now()
+    ExternalListing.objects.bulk_update(
+        [ExternalListing(id=pk, nearest_distances_m=nearest, updated_at=now) for (pk, _, _), nearest in zip(rows, distances)],
+        ["nearest_distances_m", "updated_at"],
+        batch_size=1000,
+    )
+    return len(rows)
 
 
 class Command(BaseCommand):
-    help = "Compute and persist nearest distances (meters) for ExternalListing per enabled layer."
+    help = (
+        "Compute and persist nearest distances (meters) for ExternalListing per enabled layer.\n"
+        "Distances come from the materialised proximity table (listings.proximity); only listings\n"
+        "whose rows are stale for the current MapGenerationConfig / layer data are recomputed.\n"
+        "--batch computes the distances only, vectorised over --batch-size listings per call\n"
+        "(requires numpy and scipy), and leaves the proximity rows untouched.\n"
+        "--shard i/n and --workers N split the run across hosts and processes; an interrupted\n"
+        "run resumes from its checkpoint."
+    )
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument("--source", default="coralcity", help="External source key")
         parser.add_argument("--listing-id", help="External listing id to process. If omitted, use --all or --limit")
         parser.add_argument("--all", action="store_true", help="Process all listings of the source")
         parser.add_argument("--limit", type=int, default=200, help="When not using --listing-id, cap number of listings")
+        parser.add_argument("--force", action="store_true", help="Recompute even listings that are up to date")
+        parser.add_argument("--batch", action="store_true", help="Vectorised nearest distances only (numpy/scipy)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Listings per vectorised call with --batch")
+        add_sharding_arguments(parser)
 
     def handle(self, *args, **opts):
         source = opts["source"]
-        cfg = MapGenerationConfig.get_config()
 
         if opts.get("listing_id"):
             qs = ExternalListing.objects.filter(source=source, external_id=str(opts["listing_id"]))
@@ -41,51 +67,43 @@ class Command(BaseCommand):
         else:
             qs = ExternalListing.objects.filter(source=source).order_by("-fetched_at")[: opts["limit"]]
 
-        updated = 0
-        for ext in qs:
-            nearest: Dict[str, Any] = {}
-            # DB-backed layers use provider distance_m
-            if cfg.enable_metro:
-                nearest["metro_m"] = _min_dist(
-                    dbp.nearby_metro_stations(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_metro, limit=cfg.max_metro)
-                )
-            if cfg.enable_metrobus:
-                nearest["metrobus_m"] = _min_dist(
-                    dbp.nearby_metrobus_stations(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_metrobus, limit=cfg.max_metrobus)
-                )
-            if cfg.enable_bus:
-                nearest["bus_m"] = _min_dist(
-                    dbp.nearby_bus_stops(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_bus, limit=cfg.max_bus)
-                )
-            if cfg.enable_grocery:
-                nearest["grocery_m"] = _min_dist(
-                    dbp.nearby_groceries(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_grocery, limit=cfg.max_grocery)
-                )
-            if cfg.enable_clothing:
-                nearest["clothing_m"] = _min_dist(
-                    dbp.nearby_clothing(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_clothing, limit=cfg.max_clothing)
-                )
-            if cfg.enable_malls:
-                nearest["malls_m"] = _min_dist(
-                    dbp.nearby_malls(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_malls, limit=cfg.max_malls)
-                )
-            if cfg.enable_parks:
-                nearest["parks_m"] = _min_dist(
-                    dbp.nearby_parks(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_parks, limit=cfg.max_parks)
-                )
-            if cfg.enable_taxi:
-                nearest["taxi_m"] = _min_dist(
-                    dbp.nearby_taxi_stands(lon=ext.lng, lat=ext.lat, radius_m=cfg.radius_taxi, limit=cfg.max_taxi)
-                )
-            # File-backed layers compute geometry distance
-            if cfg.enable_minibus:
-                nearest["minibus_m"] = nearest_minibus_distance_m(lon=ext.lng, lat=ext.lat, max_radius_m=cfg.radius_minibus)
-            if cfg.enable_bicycle:
-                nearest["bicycle_m"] = nearest_bicycle_distance_m(lon=ext.lng, lat=ext.lat, max_radius_m=cfg.radius_bicycle)
-
-            ext.nearest_distances_m = {k: (float(v) if v is not None else None) for k, v in nearest.items()}
-            ext.save(update_fields=["nearest_distances_m", "updated_at"])
-            updated += 1
-
-        self.stdout.write(self.style.SUCCESS(f"Updated nearest distances for {updated} listing(s)."))
+        cfg = MapGenerationConfig.get_config()
+        if opts["batch"]:
+            try:
+                # Built once here; forked workers inherit them
+                _TREES[tuple(proximity.enabled_layers(cfg))] = proximity.layer_trees(cfg)
+            except ImportError as exc:
+                raise CommandError(str(exc))
+            func, chunk_size = _batch_chunk, opts["batch_size"]
+        else:
+            func, chunk_size = _materialize_chunk, proximity.BATCH_SIZE
+
+        shard = opts["shard"]
+        pks = shard.pks(qs)
+        stats = run_sharded(
+            "update_nearest_distances",
+            pks,
+            func,
+            {"force": opts["force"]},
+            chunk_size=chunk_size,
+            workers=opts["workers"],
+            shard=shard,
+            restart=opts["restart"],
+            selection={
+                **{k: opts.get(k) for k in ("source", "listing_id", "all", "limit", "force", "batch")},
+                # Rows computed under another config or layer data must be redone
+                "config": cfg.updated_at,
+                "proximity": proximity.proximity_version(cfg),
+            },
+            progress=self._progress if opts["batch"] else None,
+        )
+        for error in stats.errors:
+            self.stderr.write(self.style.ERROR(error))
+
+        mode = "in batch mode" if opts["batch"] else f"({len(pks) - stats.successful} already current)"
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated nearest distances for {stats.successful} listing(s) {mode} [shard {shard}].")
+        )
 
+    def _progress(self, stats) -> None:
+        self.stdout.write(f"  {stats.skipped + stats.successful + stats.failed}/{stats.total} listings")
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_nearbyamenityconfig_enable_minibus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='closeststorescache',
+            name='clothing_max_distance_m',
+            field=models.FloatField(blank=True, help_text='Distance in meters to the K-th closest cached clothing store', null=True),
+        ),
+        migrations.AddField(
+            model_name='closeststorescache',
+            name='grocery_max_distance_m',
+            field=models.FloatField(blank=True, help_text='Distance in meters to the K-th closest cached grocery store', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_closeststorescache_max_distances'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='closeststorescache',
+            name='is_stale',
+            field=models.BooleanField(default=False, help_text='Cached IDs are outdated and a refresh has been requested'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:20
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_closeststorescache_is_stale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query_key', models.CharField(help_text='Normalized query text', max_length=512, unique=True)),
+                ('query', models.TextField(help_text='Query text as first received')),
+                ('location', django.contrib.gis.db.models.fields.PointField(blank=True, geography=True, null=True, srid=4326)),
+                ('display_name', models.TextField(blank=True)),
+                ('provider', models.CharField(default='nominatim', max_length=32)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Geocode Cache Entry',
+                'verbose_name_plural': 'Geocode Cache Entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='GeocoderState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_request_at', models.DateTimeField(blank=True, null=True)),
+                ('consecutive_failures', models.PositiveIntegerField(default=0)),
+                ('open_until', models.DateTimeField(blank=True, help_text='Circuit open (no upstream calls) until', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Geocoder State',
+                'verbose_name_plural': 'Geocoder State',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:05
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_geocodecacheentry_geocoderstate'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='GazetteerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('name_normalized', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('metro', 'Metro station'), ('metrobus', 'Metrobus station'), ('district', 'District'), ('mall', 'Mall'), ('park', 'Park'), ('school', 'School'), ('international_school', 'International school'), ('preschool', 'Preschool')], max_length=32)),
+                ('source_id', models.BigIntegerField(blank=True, help_text='Primary key in the source table', null=True)),
+                ('location', django.contrib.gis.db.models.fields.PointField(geography=True, srid=4326)),
+                ('weight', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Gazetteer Entry',
+                'verbose_name_plural': 'Gazetteer Entries',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['name_normalized'], name='gazetteer_name_trgm_idx', opclasses=['gin_trgm_ops']), models.Index(fields=['name_normalized'], name='gazetteer_name_prefix_idx', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:20
+
+import django.contrib.gis.db.models.fields
+import django.contrib.gis.db.models.functions
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0016_gazetteerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='externallisting',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='listing_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='externallisting',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='extlisting_location_tm_gist'),
+        ),
+    ]
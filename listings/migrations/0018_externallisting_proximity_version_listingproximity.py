@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0017_metric_location_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='externallisting',
+            name='proximity_version',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.CreateModel(
+            name='ListingProximity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('layer', models.CharField(max_length=16)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('poi_id', models.CharField(blank=True, max_length=64)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('distance_m', models.FloatField(blank=True, null=True)),
+                ('geometry', models.JSONField(default=dict)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proximity', to='listings.externallisting')),
+            ],
+            options={
+                'verbose_name': 'Listing Proximity',
+                'verbose_name_plural': 'Listing Proximity',
+                'constraints': [models.UniqueConstraint(fields=('listing', 'layer', 'rank'), name='listingproximity_unique_rank')],
+            },
+        ),
+    ]
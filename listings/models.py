@@ -1,4 +1,7 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
+
+from .fields import metric_field, metric_index
 import logging
 
 logger = logging.getLogger(__name__)
@@ -87,6 +90,7 @@ class Listing(models.Model):
     size_sqm = models.PositiveIntegerField()
     # Use geography=True to get meter-based distances directly
     location = models.PointField(srid=4326, geography=True)
+    location_tm = metric_field()
     
     # Building image/photo - exterior building photo (primary image)
     image = models.ImageField(upload_to='listings/', null=True, blank=True, help_text="Primary exterior building photo")
@@ -96,6 +100,7 @@ class Listing(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [metric_index("listing_location_tm_gist")]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.title} - {self.price} TL"
@@ -207,7 +212,23 @@ class ClosestStoresCache(models.Model):
         default=list,
         help_text="List of closest clothing store IDs ordered by distance"
     )
-    
+    # Radius covered by the cached top-K: a store change farther away cannot alter it
+    grocery_max_distance_m = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Distance in meters to the K-th closest cached grocery store"
+    )
+    clothing_max_distance_m = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Distance in meters to the K-th closest cached clothing store"
+    )
+    # Set by invalidation: the IDs are still served until the queued refresh rewrites the row
+    is_stale = models.BooleanField(
+        default=False,
+        help_text="Cached IDs are outdated and a refresh has been requested"
+    )
+
     # Track when this was last computed
     computed_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -258,6 +279,7 @@ class ExternalListing(models.Model):
     lat = models.FloatField()
     lng = models.FloatField()
     location = models.PointField(srid=4326, geography=True)
+    location_tm = metric_field()
 
     # Raw payload for traceability/audits and future reprocessing
     payload = models.JSONField(default=dict, blank=True)
@@ -269,6 +291,8 @@ class ExternalListing(models.Model):
     #   "parks_m": 600.0, "taxi_m": 480.0, "minibus_m": 150.0, "bicycle_m": 90.0
     # }
     nearest_distances_m = models.JSONField(default=dict, blank=True)
+    # listings.proximity.proximity_version() the ListingProximity rows were built for ("" = not built / stale)
+    proximity_version = models.CharField(max_length=32, blank=True, default="")
 
     fetched_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -283,18 +307,67 @@ class ExternalListing(models.Model):
             models.Index(fields=["source", "external_id"]),
             models.Index(fields=["fetched_at"]),
             models.Index(fields=["updated_at"]),
+            metric_index("extlisting_location_tm_gist"),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.source}:{self.external_id} - {self.title[:40] if self.title else ''}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_coords = (instance.__dict__.get("lat"), instance.__dict__.get("lng"))
+        return instance
+
     def save(self, *args, **kwargs):
         # Ensure location is synced from lat/lng
         if self.lat is not None and self.lng is not None:
             from django.contrib.gis.geos import Point
 
             self.location = Point(float(self.lng), float(self.lat), srid=4326)
+        # A moved listing needs its proximity rows rebuilt
+        loaded_coords = getattr(self, "_loaded_coords", None)
+        moved = loaded_coords != (self.lat, self.lng)
+        if moved:
+            self.proximity_version = ""
+            # update_or_create saves only its defaults (+ auto_now fields)
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "location", "proximity_version"}
         super().save(*args, **kwargs)
+        if moved and loaded_coords is not None:
+            # Rows for the old position must not be served until the rebuild
+            self.proximity.all().delete()
+        self._loaded_coords = (self.lat, self.lng)
+
+
+class ListingProximity(models.Model):
+    """
+    Materialised nearby POIs of an ExternalListing: one row per (layer, rank),
+    nearest first, within the MapGenerationConfig radius and max count.
+
+    Rows are rebuilt in batch by listings.proximity.materialize; they are
+    current when the listing's `proximity_version` matches the config/data version.
+    """
+
+    listing = models.ForeignKey(ExternalListing, on_delete=models.CASCADE, related_name="proximity")
+    layer = models.CharField(max_length=16)
+    rank = models.PositiveSmallIntegerField()
+    # POI primary key, or the route line id for line layers
+    poi_id = models.CharField(max_length=64, blank=True)
+    name = models.CharField(max_length=255, blank=True)
+    distance_m = models.FloatField(null=True, blank=True)
+    # GeoJSON: the POI point, or the line clipped to the search radius
+    geometry = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name = "Listing Proximity"
+        verbose_name_plural = "Listing Proximity"
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "layer", "rank"], name="listingproximity_unique_rank"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.listing_id} {self.layer}#{self.rank}: {self.name}"
 
 
 class MapGenerationConfig(models.Model):
@@ -411,3 +484,97 @@ class NearbyAmenityConfig(models.Model):
     def get_config(cls):
         obj, _ = cls.objects.get_or_create(pk=1)
         return obj
+
+
+class GeocodeCacheEntry(models.Model):
+    """
+    Persistent geocoding result for a normalized query (see listings.geocoding).
+    `location` is NULL for negative entries, i.e. the provider found nothing.
+    """
+
+    query_key = models.CharField(max_length=512, unique=True, help_text="Normalized query text")
+    query = models.TextField(help_text="Query text as first received")
+    location = models.PointField(srid=4326, geography=True, null=True, blank=True)
+    display_name = models.TextField(blank=True)
+    provider = models.CharField(max_length=32, default="nominatim")
+    expires_at = models.DateTimeField(db_index=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Geocode Cache Entry"
+        verbose_name_plural = "Geocode Cache Entries"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.query_key} -> {'not found' if self.location is None else self.location.coords}"
+
+
+class GeocoderState(models.Model):
+    """
+    Singleton row shared by every worker: the next free upstream request slot
+    (rate limit) and the circuit-breaker state. Updated under SELECT ... FOR UPDATE.
+    """
+
+    next_request_at = models.DateTimeField(null=True, blank=True)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    open_until = models.DateTimeField(null=True, blank=True, help_text="Circuit open (no upstream calls) until")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Geocoder State"
+        verbose_name_plural = "Geocoder State"
+
+    def __str__(self):  # pragma: no cover
+        return "Geocoder State"
+
+    def save(self, *args, **kwargs):
+        self.pk = 1
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):  # pragma: no cover
+        pass
+
+
+class GazetteerEntry(models.Model):
+    """
+    Local place name (station, mall, park, school, district) for autocomplete
+    and for resolving free-text locations without an external geocoder.
+    Rebuilt by the `build_gazetteer` command (see listings.gazetteer).
+    """
+
+    KIND_CHOICES = [
+        ("metro", "Metro station"),
+        ("metrobus", "Metrobus station"),
+        ("district", "District"),
+        ("mall", "Mall"),
+        ("park", "Park"),
+        ("school", "School"),
+        ("international_school", "International school"),
+        ("preschool", "Preschool"),
+    ]
+
+    name = models.CharField(max_length=255)
+    # Turkish-folded, lowercase form used for matching (see listings.text.fold_turkish)
+    name_normalized = models.CharField(max_length=255)
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    source_id = models.BigIntegerField(null=True, blank=True, help_text="Primary key in the source table")
+    location = models.PointField(srid=4326, geography=True)
+    # Ranking among equally good matches (higher first)
+    weight = models.PositiveSmallIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Gazetteer Entry"
+        verbose_name_plural = "Gazetteer Entries"
+        indexes = [
+            # Fuzzy / substring matches (pg_trgm)
+            GinIndex(fields=["name_normalized"], opclasses=["gin_trgm_ops"], name="gazetteer_name_trgm_idx"),
+            # Prefix matches (LIKE 'abc%') for autocomplete
+            models.Index(fields=["name_normalized"], opclasses=["varchar_pattern_ops"], name="gazetteer_name_prefix_idx"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.name} ({self.kind})"
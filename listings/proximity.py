@@ -0,0 +1,230 @@
+"""
+Materialised proximity of external listings to every map layer.
+
+`materialize` fills ListingProximity (listing x layer x rank -> POI, distance)
+in batches: one KNN statement per point layer per batch (see listings.knn),
+the clipped lines of the line layers (minibus, bicycle) per listing and their
+nearest distances in one bulk call per line layer. The nearest distance per
+layer is written to `ExternalListing.nearest_distances_m` at the same time.
+
+Rows are versioned by a hash of the MapGenerationConfig layer settings and
+the data version of every layer table. A listing is current when its
+`proximity_version` equals `proximity_version(config)`. A config edit, a POI
+change or a moved listing therefore marks listings stale, and the next
+`materialize` rebuilds only those.
+
+update_nearest_distances, build_listing_context, generate_listing_maps and
+the external listing nearby endpoint all read from this table.
+
+`nearest_distances_batch` is the table-less fast path for nearest distances
+only: NumPy k-d trees per point layer (tools.nearby_enrichment.vectorized)
+and bulk line lookups, thousands of listings per call.
+"""
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import QuerySet
+
+from .knn import nearest_k_for_listings
+from .models import ExternalListing, ListingProximity, MapGenerationConfig
+from tools.nearby_enrichment.bicycle import (
+    nearby_bicycle_segments,
+    nearest_bicycle_distances_m,
+)
+from tools.nearby_enrichment.minibus import (
+    nearby_minibus_segments,
+    nearest_minibus_distances_m,
+)
+from tools.nearby_enrichment.poi_index import fetch_layer_versions
+from tools.nearby_enrichment.vectorized import LayerTree, load_layer_coords
+
+logger = logging.getLogger(__name__)
+
+# Layer key -> point model. Radius/max/toggle come from MapGenerationConfig `<field>_<key>`.
+POINT_LAYERS: Dict[str, str] = {
+    "metro": "transit_layer.MetroStation",
+    "metrobus": "transit_layer.MetrobusStation",
+    "bus": "transit_layer.BusStop",
+    "grocery": "stores_layer.Grocery",
+    "clothing": "stores_layer.Clothing",
+    "malls": "stores_layer.Mall",
+    "parks": "stores_layer.Park",
+    "taxi": "transit_layer.TaxiStand",
+}
+
+# Layer key -> clipped lines within radius of one point
+LINE_LAYERS: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+    "minibus": nearby_minibus_segments,
+    "bicycle": nearby_bicycle_segments,
+}
+
+# Layer key -> nearest line distance for many points at once
+LINE_BULK_DISTANCES: Dict[str, Callable[..., List[Optional[float]]]] = {
+    "minibus": nearest_minibus_distances_m,
+    "bicycle": nearest_bicycle_distances_m,
+}
+
+# Tables whose data version is part of the proximity version
+VERSIONED_TABLES: Tuple[str, ...] = tuple(POINT_LAYERS.values()) + ("transit_layer.RouteLine",)
+
+BATCH_SIZE = 200
+
+
+def enabled_layers(cfg: MapGenerationConfig) -> List[Tuple[str, int, int]]:
+    """`(layer, radius_m, max_count)` for every enabled layer, in POINT_LAYERS then LINE_LAYERS order."""
+    return [
+        (key, getattr(cfg, f"radius_{key}"), getattr(cfg, f"max_{key}"))
+        for key in (*POINT_LAYERS, *LINE_LAYERS)
+        if getattr(cfg, f"enable_{key}")
+    ]
+
+
+def proximity_version(cfg: MapGenerationConfig) -> str:
+    """Hash of the enabled layer settings and the data version of the layer tables."""
+    versions = fetch_layer_versions(VERSIONED_TABLES)
+    payload = repr((enabled_layers(cfg), sorted(versions.items())))
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def _point_rows(listings: List[ExternalListing], key: str, radius_m: int, limit: int) -> List[ListingProximity]:
+    model = apps.get_model(POINT_LAYERS[key])
+    hits_by_listing = nearest_k_for_listings(
+        model, [l.id for l in listings], limit, columns=("name",), radius_m=radius_m, listing_model=ExternalListing
+    )
+    return [
+        ListingProximity(
+            listing_id=listing_id,
+            layer=key,
+            rank=rank,
+            poi_id=str(hit["id"]),
+            name=hit["name"] or "",
+            distance_m=hit["distance_m"],
+            geometry={"type": "Point", "coordinates": [hit["lng"], hit["lat"]]},
+        )
+        for listing_id, hits in hits_by_listing.items()
+        for rank, hit in enumerate(hits)
+    ]
+
+
+def _line_rows(listing: ExternalListing, key: str, radius_m: int, limit: int) -> List[ListingProximity]:
+    segments = LINE_LAYERS[key]
+    return [
+        ListingProximity(
+            listing_id=listing.id,
+            layer=key,
+            rank=rank,
+            poi_id=str(item.get("id") or "")[:64],
+            name=(item.get("name") or "")[:255],
+            distance_m=item.get("distance_m"),
+            geometry=item["geometry"],
+        )
+        for rank, item in enumerate(segments(lon=listing.lng, lat=listing.lat, radius_m=radius_m, limit=limit))
+    ]
+
+
+def _materialize_batch(listings: List[ExternalListing], cfg: MapGenerationConfig, version: str) -> None:
+    rows: List[ListingProximity] = []
+    nearest: Dict[int, Dict[str, Optional[float]]] = {l.id: {} for l in listings}
+    for key, radius_m, limit in enabled_layers(cfg):
+        if key in POINT_LAYERS:
+            layer_rows = _point_rows(listings, key, radius_m, limit)
+            for listing in listings:
+                nearest[listing.id][f"{key}_m"] = None
+            for row in layer_rows:
+                if row.rank == 0:
+                    nearest[row.listing_id][f"{key}_m"] = row.distance_m
+            rows += layer_rows
+        else:
+            distances = LINE_BULK_DISTANCES[key]([(l.lng, l.lat) for l in listings], max_radius_m=radius_m)
+            for listing, distance in zip(listings, distances):
+                nearest[listing.id][f"{key}_m"] = distance
+                rows += _line_rows(listing, key, radius_m, limit)
+
+    for listing in listings:
+        listing.nearest_distances_m = nearest[listing.id]
+        listing.proximity_version = version
+    with transaction.atomic():
+        ListingProximity.objects.filter(listing__in=listings).delete()
+        ListingProximity.objects.bulk_create(rows, batch_size=1000)
+        ExternalListing.objects.bulk_update(listings, ["nearest_distances_m", "proximity_version"])
+
+
+def materialize(
+    listings: Iterable[ExternalListing],
+    cfg: Optional[MapGenerationConfig] = None,
+    *,
+    force: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """
+    Rebuild the proximity rows of the stale listings among `listings` (all of them with `force`).
+    Returns the number of listings rebuilt.
+    """
+    cfg = cfg or MapGenerationConfig.get_config()
+    version = proximity_version(cfg)
+    if isinstance(listings, QuerySet):
+        listings = listings.only("id", "lat", "lng", "location", "proximity_version", "nearest_distances_m")
+    stale = [l for l in listings if force or l.proximity_version != version]
+
+    start = time.time()
+    for i in range(0, len(stale), batch_size):
+        _materialize_batch(stale[i:i + batch_size], cfg, version)
+    if stale:
+        logger.info(
+            f"[PROXIMITY] Materialized {len(stale)} listing(s) | version {version[:8]} | "
+            f"Time: {time.time() - start:.4f}s"
+        )
+    return len(stale)
+
+
+def layer_trees(cfg: MapGenerationConfig) -> Dict[str, Any]:
+    """
+    Vectorised k-d tree per enabled point layer, each loaded with one query.
+    Raises ImportError without numpy/scipy.
+    """
+    return {
+        key: LayerTree(load_layer_coords(POINT_LAYERS[key]))
+        for key, _, _ in enabled_layers(cfg)
+        if key in POINT_LAYERS
+    }
+
+
+def nearest_distances_batch(
+    points: Sequence[Tuple[float, float]], cfg: MapGenerationConfig, trees: Dict[str, Any]
+) -> List[Dict[str, Optional[float]]]:
+    """
+    `nearest_distances_m` dicts for many (lon, lat) points: one vectorised
+    call per point layer (`layer_trees`) and one bulk call per line layer.
+    """
+    out: List[Dict[str, Optional[float]]] = [{} for _ in points]
+    for key, radius_m, _ in enabled_layers(cfg):
+        if key in POINT_LAYERS:
+            distances = trees[key].nearest_distances_m(points, max_radius_m=radius_m)
+        else:
+            distances = LINE_BULK_DISTANCES[key](points, max_radius_m=radius_m)
+        for item, distance in zip(out, distances):
+            item[f"{key}_m"] = distance
+    return out
+
+
+def layers_for(listing: ExternalListing) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Materialised nearby items of one listing by layer (one indexed lookup).
+    Point items carry `location`, line items `geometry`, as the db_providers did.
+    """
+    layers: Dict[str, List[Dict[str, Any]]] = {}
+    rows = ListingProximity.objects.filter(listing=listing).order_by("layer", "rank")
+    for row in rows.values_list("layer", "poi_id", "name", "distance_m", "geometry"):
+        layer, poi_id, name, distance_m, geometry = row
+        if layer in POINT_LAYERS:
+            item = {"id": int(poi_id), "name": name, "distance_m": distance_m, "location": geometry}
+        else:
+            item = {"id": poi_id, "name": name, "geometry": geometry}
+            if distance_m is not None:
+                item["distance_m"] = distance_m
+        layers.setdefault(layer, []).append(item)
+    return {key: layers[key] for key in (*POINT_LAYERS, *LINE_LAYERS) if key in layers}
@@ -0,0 +1,297 @@
+"""
+Set-based spatial queries used by the listing endpoints.
+
+Instead of issuing one nearest-neighbour query per listing, the helpers here
+resolve a whole page of listings at once with LATERAL KNN joins, so the number
+of SQL statements stays constant no matter how many listings are rendered.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Prefetch
+
+from .geoapi import PageRequest, decode_cursor, keyset_page, next_cursor
+from .knn import geography_sql, nearest_k_for_listings
+from .models import Listing, ListingImage
+from .services import ClosestStoresService
+from education_layer.models import School
+from stores_layer.models import Clothing, Grocery, Mall, Park
+from transit_layer.models import BusStop, MetroStation, MetrobusStation, TaxiStand
+from tools.nearby_enrichment.poi_index import get_poi_index
+
+logger = logging.getLogger(__name__)
+
+# Number of carousel images rendered per listing
+LISTING_IMAGE_LIMIT = 3
+
+# Stable keyset ordering for listing pages (newest first, id breaks ties)
+LISTING_ORDERING = ("-created_at", "-id")
+
+# Listings loaded per chunk when a page is streamed (see ListingPageStream)
+LISTING_CHUNK_SIZE = 200
+
+
+def _table(model) -> str:
+    """Quoted database table name for a model."""
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+@dataclass
+class NearestStation:
+    name: str
+    distance_m: Optional[float]
+
+
+@dataclass
+class ListingPageContext:
+    """
+    Everything needed to render a page of listing features.
+
+    `listings` keeps the queryset order; each listing carries the prefetched
+    `carousel_images` list and the select_related `closest_stores_cache`.
+    """
+    listings: List[Listing]
+    nearest_stations: Dict[int, NearestStation] = field(default_factory=dict)
+    # listing id -> (closest_grocery_ids, closest_clothing_ids)
+    closest_stores: Dict[int, Tuple[List[int], List[int]]] = field(default_factory=dict)
+    # Opaque cursor for the following page, None on the last one
+    next_cursor: Optional[str] = None
+
+
+def nearest_metro_stations(listing_ids: Iterable[int]) -> Dict[int, NearestStation]:
+    """
+    Nearest metro station for each listing id, in a single statement
+    (two-phase KNN, see listings.knn).
+    """
+    nearest = nearest_k_for_listings(MetroStation, list(listing_ids), 1, columns=("name",))
+    return {
+        listing_id: NearestStation(name=hits[0]["name"], distance_m=hits[0]["distance_m"])
+        for listing_id, hits in nearest.items()
+    }
+
+
+def load_listing_page(page: PageRequest) -> ListingPageContext:
+    """
+    Load one page of listings (bbox / limit / cursor, see listings.geoapi)
+    together with their nearest station, cached closest stores and carousel images.
+
+    Query budget (independent of the page size):
+      1. listings + closest_stores_cache (select_related)
+      2. carousel images (sliced prefetch, one window-function query)
+      3. nearest metro station for every listing (LATERAL KNN)
+      4. only if some caches are missing: one KNN statement per store layer and
+         one upsert of the new rows (see ClosestStoresService.get_cached_stores_bulk)
+    """
+    start = time.time()
+    images_qs = ListingImage.objects.order_by("order")[:LISTING_IMAGE_LIMIT]
+    queryset, limit = keyset_page(
+        Listing.objects.select_related("closest_stores_cache")
+        .prefetch_related(Prefetch("images", queryset=images_qs, to_attr="carousel_images")),
+        LISTING_ORDERING,
+        page,
+    )
+    listings, cursor = next_cursor(list(queryset), LISTING_ORDERING, limit)
+    context = ListingPageContext(listings=listings, next_cursor=cursor)
+    context.nearest_stations = nearest_metro_stations(l.id for l in listings)
+    context.closest_stores = ClosestStoresService.get_cached_stores_bulk(listings)
+
+    logger.debug(
+        f"[PAGE_CONTEXT] Loaded {len(listings)} listings with "
+        f"{len(context.nearest_stations)} nearest stations | Time: {time.time() - start:.4f}s"
+    )
+    return context
+
+
+class ListingPageStream:
+    """
+    One page of listings read in keyset chunks of `chunk_size`, each chunk
+    loaded by `load_listing_page` (constant statements per chunk), so memory
+    is bounded by the chunk size rather than the page size.
+
+    Iterating yields `(listing, nearest station, closest stores)`;
+    `next_cursor` is set once iteration finishes.
+    """
+
+    def __init__(self, page: PageRequest, chunk_size: int = LISTING_CHUNK_SIZE):
+        self.page = page
+        self.chunk_size = chunk_size
+        self.next_cursor: Optional[str] = None
+        # Validate eagerly: once streaming has started an error can no longer become a 400
+        keyset_page(Listing.objects.all(), LISTING_ORDERING, page)
+
+    def __iter__(self) -> Iterator[Tuple[Listing, Optional[NearestStation], Optional[Tuple[List[int], List[int]]]]]:
+        limit = self.page.limit
+        cursor = self.page.cursor
+        emitted = 0
+        while limit is None or emitted < limit:
+            size = self.chunk_size if limit is None else min(self.chunk_size, limit - emitted)
+            chunk = load_listing_page(PageRequest(self.page.bbox, size, cursor))
+            for listing in chunk.listings:
+                yield listing, chunk.nearest_stations.get(listing.id), chunk.closest_stores.get(listing.id)
+            emitted += len(chunk.listings)
+            self.next_cursor = chunk.next_cursor
+            if chunk.next_cursor is None:
+                return
+            cursor = decode_cursor(chunk.next_cursor)
+
+
+# Nearby amenity layers in response order: (response key, NearbyAmenityConfig toggle, model or None).
+# Layers without a model are line layers answered by `NEARBY_LINE_LAYERS`.
+NEARBY_LAYERS: Tuple[Tuple[str, str, Any], ...] = (
+    ("metro", "enable_metro", MetroStation),
+    ("metrobus", "enable_metrobus", MetrobusStation),
+    ("bus", "enable_bus", BusStop),
+    ("taxi", "enable_taxi", TaxiStand),
+    ("minibus", "enable_minibus", None),
+    ("grocery", "enable_grocery", Grocery),
+    ("clothing", "enable_clothing", Clothing),
+    ("malls", "enable_malls", Mall),
+    ("parks", "enable_parks", Park),
+    ("schools", "enable_schools", School),
+)
+
+
+def _nearby_minibus(lon: float, lat: float, radius_m: float, limit: int) -> List[Dict[str, Any]]:
+    from tools.nearby_enrichment.minibus import nearby_minibus_segments
+
+    data = nearby_minibus_segments(lon=lon, lat=lat, radius_m=radius_m, limit=limit)
+    return [{"id": item["id"], "name": item["name"], "geometry": item["geometry"]} for item in data]
+
+
+NEARBY_LINE_LAYERS: Dict[str, Callable[[float, float, float, int], List[Dict[str, Any]]]] = {
+    "minibus": _nearby_minibus,
+}
+
+# Threads running line layers next to the point-layer statement
+_line_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="nearby-lines")
+
+
+@dataclass
+class NearbyAmenities:
+    results: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    # Per-layer milliseconds; layers answered by the shared statement all report its time
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+
+def nearby_layer_sql(model) -> str:
+    """
+    LATERAL KNN subquery for one point layer around `q.p` (params: layer key, radius_m, limit).
+
+    The ST_DWithin and `<->` predicates are written against the indexed
+    expression; ST_Distance only runs for the rows that survive the LIMIT.
+    """
+    location = geography_sql(model, "s")
+    return f"""
+        SELECT n.* FROM q CROSS JOIN LATERAL (
+            SELECT %s::text AS layer, s.id, s.name, ST_Distance({location}, q.p) AS distance_m,
+                   ST_Y(s.location::geometry) AS lat, ST_X(s.location::geometry) AS lng
+            FROM {_table(model)} AS s
+            WHERE ST_DWithin({location}, q.p, %s)
+            ORDER BY {location} <-> q.p
+            LIMIT %s
+        ) AS n
+    """
+
+
+NEARBY_ORIGIN_SQL = "WITH q AS (SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography AS p) "
+
+
+def nearby_point_layers(
+    layers: Sequence[Tuple[str, Any]], lon: float, lat: float, radius_m: float, limit: int
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Nearest rows of several point layers in a single statement.
+
+    One LATERAL KNN subquery per layer (see `nearby_layer_sql`), glued with
+    UNION ALL and tagged with the layer key. Geography and geometry (4326)
+    location fields are both supported.
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {key: [] for key, _ in layers}
+    if not layers:
+        return out
+
+    params: List[Any] = [lon, lat]
+    for key, _ in layers:
+        params += [key, radius_m, limit]
+    sql = NEARBY_ORIGIN_SQL + " UNION ALL ".join(nearby_layer_sql(model) for _, model in layers)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    for key, pk, name, distance, row_lat, row_lng in rows:
+        out[key].append(
+            {"id": pk, "name": name or "", "distance_m": float(distance), "lat": row_lat, "lng": row_lng}
+        )
+    for hits in out.values():
+        hits.sort(key=lambda h: h["distance_m"])
+    return out
+
+
+def _run_line_layer(fn, lon: float, lat: float, radius_m: float, limit: int) -> Tuple[List[Dict[str, Any]], float]:
+    start = time.time()
+    try:
+        return fn(lon, lat, radius_m, limit), (time.time() - start) * 1000
+    finally:
+        # Pool threads may have opened their own DB connection (PostGIS route lines)
+        connection.close()
+
+
+def nearby_amenities_for_point(config, lon: float, lat: float, radius_m: float, limit: int) -> NearbyAmenities:
+    """
+    All enabled amenity layers around a point (see NearbyAmenityConfig).
+
+    Line layers start first on worker threads; meanwhile point layers are
+    served from the per-worker POI index when warm and the rest by one
+    UNION ALL statement. Latency is roughly the slowest of the two paths.
+    """
+    start = time.time()
+    enabled = [(key, model) for key, toggle, model in NEARBY_LAYERS if getattr(config, toggle, False)]
+    nearby = NearbyAmenities()
+
+    futures = {
+        key: _line_pool.submit(_run_line_layer, NEARBY_LINE_LAYERS[key], lon, lat, radius_m, limit)
+        for key, model in enabled
+        if model is None
+    }
+
+    db_layers = []
+    for key, model in enabled:
+        if model is None:
+            continue
+        layer_start = time.time()
+        hits = None
+        if getattr(settings, "NEARBY_POI_INDEX", False):
+            hits = get_poi_index().query(model, lon=lon, lat=lat, radius_m=radius_m, limit=limit)
+        if hits is None:
+            db_layers.append((key, model))
+            continue
+        nearby.results[key] = hits
+        nearby.timings_ms[key] = (time.time() - layer_start) * 1000
+
+    if db_layers:
+        sql_start = time.time()
+        nearby.results.update(nearby_point_layers(db_layers, lon, lat, radius_m, limit))
+        sql_ms = (time.time() - sql_start) * 1000
+        nearby.timings_ms.update({key: sql_ms for key, _ in db_layers})
+
+    for key, future in futures.items():
+        try:
+            nearby.results[key], nearby.timings_ms[key] = future.result()
+        except Exception as exc:
+            logger.error(f"[NEARBY] Line layer {key} failed: {exc}", exc_info=True)
+            nearby.results[key] = []
+
+    # Keep the response order stable regardless of which path answered
+    nearby.results = {key: nearby.results[key] for key, _ in enabled if key in nearby.results}
+    nearby.timings_ms = {k: round(v, 2) for k, v in nearby.timings_ms.items()}
+    nearby.timings_ms["total"] = round((time.time() - start) * 1000, 2)
+    logger.info(
+        f"[NEARBY] {len(enabled)} layers ({len(db_layers)} via SQL, {len(futures)} line) | "
+        f"Time: {nearby.timings_ms['total']:.1f}ms"
+    )
+    return nearby
@@ -3,16 +3,29 @@ Service module for managing closest stores cache.
 Handles pre-computation and storage of nearest stores for each listing.
 """
 import logging
+import threading
 import time
-from typing import List, Dict, Any
-from django.contrib.gis.db.models.functions import Distance
-from django.db import transaction
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from django.conf import settings
+from django.db import connection, transaction
 
+from .knn import nearest_k, nearest_k_for_listings
 from .models import Listing, DisplayConfig, ClosestStoresCache
 from stores_layer.models import Grocery, Clothing
 
 logger = logging.getLogger(__name__)
 
+# Namespace for pg advisory locks taken while refreshing a listing's cache
+REFRESH_LOCK_NAMESPACE = 7301
+
+# Per store layer: (cached IDs field, K-th distance field, DisplayConfig K field)
+CACHE_LAYERS = {
+    Grocery: ("closest_grocery_ids", "grocery_max_distance_m", "closest_grocery_stores"),
+    Clothing: ("closest_clothing_ids", "clothing_max_distance_m", "closest_clothing_stores"),
+}
+
 
 class ClosestStoresService:
     """
@@ -37,11 +50,8 @@ class ClosestStoresService:
         
         # Get closest grocery stores
         grocery_start = time.time()
-        closest_grocery_ids = list(
-            Grocery.objects.annotate(distance=Distance("location", listing.location))
-            .order_by("distance")
-            .values_list("id", flat=True)[: config.closest_grocery_stores]
-        )
+        closest_groceries = nearest_k(Grocery, listing.location.x, listing.location.y, config.closest_grocery_stores)
+        closest_grocery_ids = [hit["id"] for hit in closest_groceries]
         grocery_time = time.time() - grocery_start
         logger.debug(
             f"[CACHE_GROCERY] Listing {listing.id}: Found {len(closest_grocery_ids)} stores | Time: {grocery_time:.4f}s"
@@ -49,11 +59,8 @@ class ClosestStoresService:
         
         # Get closest clothing stores
         clothing_start = time.time()
-        closest_clothing_ids = list(
-            Clothing.objects.annotate(distance=Distance("location", listing.location))
-            .order_by("distance")
-            .values_list("id", flat=True)[: config.closest_clothing_stores]
-        )
+        closest_clothing = nearest_k(Clothing, listing.location.x, listing.location.y, config.closest_clothing_stores)
+        closest_clothing_ids = [hit["id"] for hit in closest_clothing]
         clothing_time = time.time() - clothing_start
         logger.debug(
             f"[CACHE_CLOTHING] Listing {listing.id}: Found {len(closest_clothing_ids)} stores | Time: {clothing_time:.4f}s"
@@ -65,6 +72,9 @@ class ClosestStoresService:
             defaults={
                 "closest_grocery_ids": closest_grocery_ids,
                 "closest_clothing_ids": closest_clothing_ids,
+                "grocery_max_distance_m": closest_groceries[-1]["distance_m"] if closest_groceries else None,
+                "clothing_max_distance_m": closest_clothing[-1]["distance_m"] if closest_clothing else None,
+                "is_stale": False,
             }
         )
         
@@ -79,9 +89,77 @@ class ClosestStoresService:
         return cache
     
     @staticmethod
-    def compute_all_listings() -> Dict[str, Any]:
+    def _closest_ids_for_listings(store_model, listing_ids: List[int], k: int) -> Dict[int, Tuple[List[int], Optional[float]]]:
+        """
+        Top-k closest store IDs (and the K-th distance) for many listings in a single statement
+        (two-phase KNN, see listings.knn).
+        """
+        return {
+            listing_id: ([hit["id"] for hit in hits], hits[-1]["distance_m"])
+            for listing_id, hits in nearest_k_for_listings(store_model, listing_ids, k).items()
+        }
+
+    @staticmethod
+    def compute_batch(listing_ids: Iterable[int], config: DisplayConfig) -> int:
+        """
+        Compute and cache closest stores for a chunk of listings.
+
+        Runs one KNN LATERAL statement per store layer and writes every row with
+        a single bulk upsert, independent of the number of listings in the chunk.
+
+        Returns:
+            Number of cache rows written
+        """
+        return len(ClosestStoresService._compute_rows(listing_ids, config))
+
+    @staticmethod
+    def _compute_rows(listing_ids: Iterable[int], config: DisplayConfig) -> List[ClosestStoresCache]:
+        """`compute_batch`, returning the rows it wrote."""
+        ids = list(listing_ids)
+        if not ids:
+            return []
+
+        grocery = ClosestStoresService._closest_ids_for_listings(Grocery, ids, config.closest_grocery_stores)
+        clothing = ClosestStoresService._closest_ids_for_listings(Clothing, ids, config.closest_clothing_stores)
+
+        rows = []
+        for listing_id in ids:
+            grocery_ids, grocery_max = grocery.get(listing_id, ([], None))
+            clothing_ids, clothing_max = clothing.get(listing_id, ([], None))
+            rows.append(
+                ClosestStoresCache(
+                    listing_id=listing_id,
+                    closest_grocery_ids=grocery_ids,
+                    closest_clothing_ids=clothing_ids,
+                    grocery_max_distance_m=grocery_max,
+                    clothing_max_distance_m=clothing_max,
+                )
+            )
+        ClosestStoresCache.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["listing"],
+            update_fields=[
+                "closest_grocery_ids",
+                "closest_clothing_ids",
+                "grocery_max_distance_m",
+                "clothing_max_distance_m",
+                "is_stale",
+                "updated_at",
+            ],
+        )
+        return rows
+
+    @staticmethod
+    def compute_all_listings(batch: bool = True, chunk_size: int = 500) -> Dict[str, Any]:
         """
         Compute and cache closest stores for all listings.
+
+        Args:
+            batch: Use the set-based path (one statement per layer per chunk).
+                   If False, fall back to computing listing by listing.
+            chunk_size: Listings per chunk in batch mode. Chunks are walked by
+                        primary key so memory stays flat as the table grows.
         
         Returns:
             Dictionary with statistics about the cache computation
@@ -90,7 +168,7 @@ class ClosestStoresService:
         all_listings = Listing.objects.all()
         total = all_listings.count()
         
-        logger.info(f"[CACHE_BATCH_START] Computing cache for {total} listings")
+        logger.info(f"[CACHE_BATCH_START] Computing cache for {total} listings (batch={batch})")
         start_time = time.time()
         
         stats = {
@@ -100,19 +178,40 @@ class ClosestStoresService:
             "errors": [],
         }
         
-        for idx, listing in enumerate(all_listings, 1):
-            try:
-                ClosestStoresService.compute_closest_stores_for_listing(listing, config)
-                stats["successful"] += 1
-                
-                if idx % 10 == 0:
-                    logger.info(f"[CACHE_BATCH_PROGRESS] {idx}/{total} listings processed")
+        if batch:
+            last_id = 0
+            while True:
+                chunk = list(
+                    Listing.objects.filter(pk__gt=last_id)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[:chunk_size]
+                )
+                if not chunk:
+                    break
+                last_id = chunk[-1]
+                try:
+                    with transaction.atomic():
+                        stats["successful"] += ClosestStoresService.compute_batch(chunk, config)
+                    logger.info(f"[CACHE_BATCH_PROGRESS] {stats['successful']}/{total} listings processed")
+                except Exception as e:
+                    stats["failed"] += len(chunk)
+                    error_msg = f"Listings {chunk[0]}-{chunk[-1]}: {str(e)}"
+                    stats["errors"].append(error_msg)
+                    logger.error(f"[CACHE_COMPUTE_ERROR] {error_msg}", exc_info=True)
+        else:
+            for idx, listing in enumerate(all_listings, 1):
+                try:
+                    ClosestStoresService.compute_closest_stores_for_listing(listing, config)
+                    stats["successful"] += 1
                     
-            except Exception as e:
-                stats["failed"] += 1
-                error_msg = f"Listing {listing.id}: {str(e)}"
-                stats["errors"].append(error_msg)
-                logger.error(f"[CACHE_COMPUTE_ERROR] {error_msg}", exc_info=True)
+                    if idx % 10 == 0:
+                        logger.info(f"[CACHE_BATCH_PROGRESS] {idx}/{total} listings processed")
+                        
+                except Exception as e:
+                    stats["failed"] += 1
+                    error_msg = f"Listing {listing.id}: {str(e)}"
+                    stats["errors"].append(error_msg)
+                    logger.error(f"[CACHE_COMPUTE_ERROR] {error_msg}", exc_info=True)
         
         elapsed = time.time() - start_time
         logger.info(
@@ -128,7 +227,11 @@ class ClosestStoresService:
     def get_cached_stores(listing: Listing) -> tuple:
         """
         Retrieve cached closest stores for a listing.
-        If cache doesn't exist, compute it on the fly.
+
+        With settings.CLOSEST_STORES_SWR (stale-while-revalidate), a stale cache
+        never blocks the request: the stale IDs are returned right away and the
+        recompute is queued for the background refresher. A missing cache (or,
+        without SWR, a stale one) is computed and stored on the fly.
         
         Args:
             listing: The Listing instance
@@ -136,31 +239,67 @@ class ClosestStoresService:
         Returns:
             Tuple of (closest_grocery_ids, closest_clothing_ids)
         """
-        try:
-            cache = listing.closest_stores_cache
-            logger.debug(
-                f"[CACHE_HIT] Listing {listing.id}: "
-                f"Retrieved {len(cache.closest_grocery_ids)} grocery, {len(cache.closest_clothing_ids)} clothing"
-            )
-            return cache.closest_grocery_ids, cache.closest_clothing_ids
-        except ClosestStoresCache.DoesNotExist:
-            logger.warning(f"[CACHE_MISS] Listing {listing.id}: Computing on-the-fly")
-            config = DisplayConfig.get_config()
-            cache = ClosestStoresService.compute_closest_stores_for_listing(listing, config)
-            return cache.closest_grocery_ids, cache.closest_clothing_ids
+        return ClosestStoresService.get_cached_stores_bulk([listing])[listing.id]
+    
+    @staticmethod
+    def get_cached_stores_bulk(listings: List[Listing]) -> Dict[int, tuple]:
+        """
+        `get_cached_stores` for a page of listings (with `closest_stores_cache`
+        select_related). All misses are computed together, in one KNN statement
+        per layer, and stored with one upsert, so a cold cache does not add
+        queries per listing and is not computed again in the background.
+        """
+        swr = getattr(settings, "CLOSEST_STORES_SWR", False)
+        result: Dict[int, tuple] = {}
+        missing: List[Listing] = []
+        refresh: List[int] = []
+
+        for listing in listings:
+            try:
+                cache = listing.closest_stores_cache
+            except ClosestStoresCache.DoesNotExist:
+                missing.append(listing)
+                continue
+            if cache.is_stale:
+                if swr:
+                    logger.debug(f"[CACHE_STALE] Listing {listing.id}: Serving stale IDs, refresh queued")
+                    refresh.append(listing.id)
+                else:
+                    missing.append(listing)
+                    continue
+            else:
+                logger.debug(
+                    f"[CACHE_HIT] Listing {listing.id}: "
+                    f"Retrieved {len(cache.closest_grocery_ids)} grocery, {len(cache.closest_clothing_ids)} clothing"
+                )
+            result[listing.id] = (cache.closest_grocery_ids, cache.closest_clothing_ids)
+
+        if missing:
+            logger.warning(f"[CACHE_MISS] {len(missing)} listing(s): Computing on-the-fly")
+            rows = ClosestStoresService._compute_rows([listing.id for listing in missing], DisplayConfig.get_config())
+            for cache in rows:
+                result[cache.listing_id] = (cache.closest_grocery_ids, cache.closest_clothing_ids)
+
+        if refresh:
+            refresh_queue.enqueue_on_commit(refresh)
+        return result
     
     @staticmethod
     def invalidate_cache(listing: Listing) -> None:
         """
         Invalidate cache for a specific listing.
+        The row is only marked stale, so readers keep getting the last known IDs
+        until the refresh queued here has rewritten it.
         
         Args:
             listing: The Listing instance
         """
-        try:
-            listing.closest_stores_cache.delete()
+        updated = ClosestStoresCache.objects.filter(listing=listing).update(is_stale=True)
+        if updated:
             logger.info(f"[CACHE_INVALIDATED] Listing {listing.id}")
-        except ClosestStoresCache.DoesNotExist:
+            if getattr(settings, "CLOSEST_STORES_SWR", False):
+                refresh_queue.enqueue_on_commit([listing.id])
+        else:
             logger.debug(f"[CACHE_NOT_FOUND] Listing {listing.id}: Nothing to invalidate")
     
     @staticmethod
@@ -170,3 +309,218 @@ class ClosestStoresService:
         """
         count = ClosestStoresCache.objects.all().delete()[0]
         logger.info(f"[CACHE_INVALIDATED_ALL] Deleted {count} cache entries")
+    
+    @staticmethod
+    def affected_listing_ids(
+        store_model, store_ids: Iterable[int], points: Iterable[Any], inserted: bool = False
+    ) -> List[int]:
+        """
+        Listings whose cached top-K for `store_model` could change because the
+        stores `store_ids` appeared, moved or disappeared at `points` (old and/or new locations).
+
+        A listing is affected when:
+          - one of the stores is currently among its cached IDs (moved away or deleted), or
+          - one of `points` is within its K-th cached distance, or
+          - `inserted` and its cache is not full / has no K-th distance. Such a
+            cache already holds every store of the layer, so only a new store
+            can change it, wherever it is.
+        """
+        ids_field, max_field, k_field = CACHE_LAYERS[store_model]
+        config = DisplayConfig.get_config()
+        points = [p for p in points if p is not None]
+        quote = connection.ops.quote_name
+
+        sql = f"""
+            SELECT c.listing_id
+            FROM {quote(ClosestStoresCache._meta.db_table)} AS c
+            JOIN {quote(Listing._meta.db_table)} AS l ON l.id = c.listing_id
+            WHERE c.{quote(ids_field)} @> ANY(%s::jsonb[])
+               OR (%s AND (c.{quote(max_field)} IS NULL OR jsonb_array_length(c.{quote(ids_field)}) < %s))
+               OR EXISTS (
+                    SELECT 1 FROM unnest(%s::bytea[]) AS p(wkb)
+                    WHERE ST_DWithin(l.location, ST_GeogFromWKB(p.wkb), c.{quote(max_field)})
+               )
+        """
+        params: List[Any] = [
+            [f"[{int(store_id)}]" for store_id in store_ids],
+            inserted,
+            getattr(config, k_field),
+            [bytes(p.wkb) for p in points],
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+    
+    @staticmethod
+    def recompute_for_store_changes(
+        store_model, store_ids: Iterable[int], points: Iterable[Any], inserted: bool = False, chunk_size: int = 500
+    ) -> int:
+        """
+        Targeted invalidation: recompute only the cache rows that changes to
+        `store_ids` (at the old/new `points`, `inserted` if any store is new) can
+        affect. Every other listing keeps its (still correct) cache.
+        
+        Returns:
+            Number of listings recomputed
+        """
+        start_time = time.time()
+        store_ids = list(store_ids)
+        affected = ClosestStoresService.affected_listing_ids(store_model, store_ids, points, inserted)
+        if affected:
+            config = DisplayConfig.get_config()
+            for i in range(0, len(affected), chunk_size):
+                with transaction.atomic():
+                    ClosestStoresService.compute_batch(affected[i:i + chunk_size], config)
+        logger.info(
+            f"[CACHE_TARGETED] {store_model.__name__} x{len(store_ids)}: "
+            f"recomputed {len(affected)} listing(s) | Time: {time.time() - start_time:.4f}s"
+        )
+        return len(affected)
+
+    @staticmethod
+    def recompute_for_store_change(
+        store_model, store_id: int, old_location=None, new_location=None, created: bool = False
+    ) -> int:
+        """
+        Handle a single store change, or record it if a `deferred_cache_invalidation()`
+        block is active on this thread (it is then recomputed when the block exits).
+
+        Returns:
+            Number of listings recomputed (0 when deferred)
+        """
+        batch = getattr(_deferred, "changes", None)
+        if batch is not None:
+            ids, points, created_ids = batch.setdefault(store_model, (set(), [], set()))
+            ids.add(store_id)
+            points.extend(p for p in (old_location, new_location) if p is not None)
+            if created:
+                created_ids.add(store_id)
+            return 0
+        return ClosestStoresService.recompute_for_store_changes(
+            store_model, [store_id], [old_location, new_location], inserted=created
+        )
+
+
+# Per-thread store changes collected by deferred_cache_invalidation()
+_deferred = threading.local()
+
+
+def cache_invalidation_deferred() -> bool:
+    """True while a deferred_cache_invalidation() block is active on this thread."""
+    return getattr(_deferred, "changes", None) is not None
+
+
+@contextmanager
+def deferred_cache_invalidation(full_recompute: bool = False):
+    """
+    Coalesce closest-stores cache invalidation for bulk store imports.
+
+    Inside the block the store signals only record which stores changed and
+    where; on exit every affected listing is recomputed once per store layer,
+    instead of once per saved store. Nested blocks join the outermost one.
+
+    Finding the affected listings costs O(listings x changed stores), so a
+    block that replaces most stores (`full_recompute`, e.g. an import with
+    --truncate) or changes more than CLOSEST_STORES_TARGETED_MAX_POINTS
+    locations recomputes every cache in batches instead.
+
+        with deferred_cache_invalidation():
+            for row in rows:
+                Grocery.objects.update_or_create(...)
+    """
+    if cache_invalidation_deferred():
+        _deferred.full_recompute = _deferred.full_recompute or full_recompute
+        yield
+        return
+
+    _deferred.changes = {}
+    _deferred.full_recompute = full_recompute
+    try:
+        yield
+    finally:
+        changes, _deferred.changes = _deferred.changes, None
+        max_points = getattr(settings, "CLOSEST_STORES_TARGETED_MAX_POINTS", 1000)
+        changed_points = sum(len(points) for _, points, _ in changes.values())
+        # Run even after an error: rows saved before it may already be committed
+        if changes and (_deferred.full_recompute or changed_points > max_points):
+            logger.info(f"[CACHE_TARGETED] {changed_points} changed store location(s), recomputing every listing")
+            try:
+                ClosestStoresService.compute_all_listings(batch=True)
+            except Exception as exc:
+                logger.error(f"[CACHE_TARGETED] Deferred full recompute failed: {exc}", exc_info=True)
+        else:
+            for store_model, (store_ids, points, created_ids) in changes.items():
+                try:
+                    ClosestStoresService.recompute_for_store_changes(
+                        store_model, store_ids, points, inserted=bool(created_ids)
+                    )
+                except Exception as exc:
+                    logger.error(
+                        f"[CACHE_TARGETED] Deferred recompute for {store_model.__name__} failed: {exc}",
+                        exc_info=True,
+                    )
+
+
+class CacheRefreshQueue:
+    """
+    In-process background refresher for stale/missing cache rows.
+
+    Requests for the same listing are de-duplicated twice: within the process
+    by the pending set, and across gunicorn workers by a transaction-scoped
+    advisory lock per listing (a listing locked elsewhere is simply skipped).
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: set = set()
+        self._lock = threading.Lock()
+
+    def enqueue(self, listing_ids: Iterable[int]) -> int:
+        with self._lock:
+            new_ids = [i for i in dict.fromkeys(listing_ids) if i not in self._pending]
+            if not new_ids:
+                return 0
+            self._pending.update(new_ids)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cache-refresh")
+        self._executor.submit(self._refresh, new_ids)
+        logger.debug(f"[CACHE_REFRESH_QUEUED] {len(new_ids)} listing(s)")
+        return len(new_ids)
+
+    def enqueue_on_commit(self, listing_ids: Iterable[int]) -> None:
+        """
+        `enqueue` once the caller's transaction commits (right away outside one).
+        A refresh started earlier could read the pre-commit data and clear the
+        stale mark with outdated IDs.
+        """
+        ids = list(listing_ids)
+        transaction.on_commit(lambda: self.enqueue(ids))
+
+    def _refresh(self, listing_ids: List[int]) -> None:
+        start_time = time.time()
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id FROM unnest(%s::bigint[]) AS id WHERE pg_try_advisory_xact_lock(%s, id::int)",
+                        [listing_ids, REFRESH_LOCK_NAMESPACE],
+                    )
+                    locked = [row[0] for row in cursor.fetchall()]
+                # Skip listings deleted in the meantime
+                locked = list(Listing.objects.filter(pk__in=locked).values_list("pk", flat=True))
+                refreshed = ClosestStoresService.compute_batch(locked, DisplayConfig.get_config())
+            logger.info(
+                f"[CACHE_REFRESHED] {refreshed}/{len(listing_ids)} listing(s) "
+                f"(others locked by another worker) | Time: {time.time() - start_time:.4f}s"
+            )
+        except Exception as e:
+            logger.error(f"[CACHE_REFRESH_ERROR] {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.difference_update(listing_ids)
+            # Worker threads own their DB connection
+            connection.close()
+
+
+refresh_queue = CacheRefreshQueue(max_workers=getattr(settings, "CLOSEST_STORES_REFRESH_WORKERS", 2))
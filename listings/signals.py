@@ -1,19 +1,18 @@
 """
-Optional: Signals for automatic cache invalidation.
-This module provides automatic cache invalidation when stores or listings change.
+Signals for automatic cache invalidation.
+This module keeps the closest stores cache in sync when stores or listings change.
 
-Usage: Add to listings/apps.py:
-    def ready(self):
-        import listings.signals
+Connected in ListingsConfig.ready(). Bulk importers wrap their loops in
+services.deferred_cache_invalidation() so store changes are recomputed once at the end.
 """
 
 import logging
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 
 from stores_layer.models import Grocery, Clothing
 from .models import Listing
-from .services import ClosestStoresService
+from .services import ClosestStoresService, cache_invalidation_deferred
 
 logger = logging.getLogger(__name__)
 
@@ -38,53 +37,41 @@ def cleanup_cache_on_listing_delete(sender, instance, **kwargs):
     logger.info(f"[SIGNAL] Listing {instance.id} deleted")
 
 
-@receiver(post_save, sender=Grocery)
-def invalidate_all_cache_on_grocery_change(sender, instance, created, **kwargs):
-    """
-    Invalidate all caches when a grocery store is created/updated.
-    This ensures all listings reflect the latest store locations.
-    """
-    action = "created" if created else "updated"
-    logger.warning(
-        f"[SIGNAL] Grocery store {instance.id} {action}, "
-        f"invalidating all caches (expensive operation)"
-    )
-    ClosestStoresService.invalidate_all_cache()
-
-
-@receiver(post_delete, sender=Grocery)
-def invalidate_all_cache_on_grocery_delete(sender, instance, **kwargs):
-    """
-    Invalidate all caches when a grocery store is deleted.
-    """
-    logger.warning(
-        f"[SIGNAL] Grocery store {instance.id} deleted, "
-        f"invalidating all caches (expensive operation)"
-    )
-    ClosestStoresService.invalidate_all_cache()
+@receiver(pre_save, sender=Grocery)
+@receiver(pre_save, sender=Clothing)
+def remember_old_store_location(sender, instance, **kwargs):
+    """Keep the stored location so post_save knows where the store moved from."""
+    instance._previous_location = None
+    # During bulk imports skip the extra SELECT per row: a store leaving a
+    # listing's top-K is already caught by the cached-IDs check.
+    if instance.pk and not cache_invalidation_deferred():
+        instance._previous_location = (
+            sender.objects.filter(pk=instance.pk).values_list("location", flat=True).first()
+        )
 
 
+@receiver(post_save, sender=Grocery)
 @receiver(post_save, sender=Clothing)
-def invalidate_all_cache_on_clothing_change(sender, instance, created, **kwargs):
+def recompute_cache_on_store_change(sender, instance, created, **kwargs):
     """
-    Invalidate all caches when a clothing store is created/updated.
-    This ensures all listings reflect the latest store locations.
+    Recompute only the listings whose cached top-K can change because this
+    store was created or moved. Every other listing keeps its cache.
     """
+    old_location = getattr(instance, "_previous_location", None)
+    if not created and old_location is not None and old_location.equals_exact(instance.location):
+        logger.debug(f"[SIGNAL] {sender.__name__} {instance.id} saved without moving, cache untouched")
+        return
     action = "created" if created else "updated"
-    logger.warning(
-        f"[SIGNAL] Clothing store {instance.id} {action}, "
-        f"invalidating all caches (expensive operation)"
+    logger.info(f"[SIGNAL] {sender.__name__} {instance.id} {action}, recomputing affected caches")
+    ClosestStoresService.recompute_for_store_change(
+        sender, instance.id, old_location=old_location, new_location=instance.location, created=created
     )
-    ClosestStoresService.invalidate_all_cache()
 
 
+@receiver(post_delete, sender=Grocery)
 @receiver(post_delete, sender=Clothing)
-def invalidate_all_cache_on_clothing_delete(sender, instance, **kwargs):
-    """
-    Invalidate all caches when a clothing store is deleted.
-    """
-    logger.warning(
-        f"[SIGNAL] Clothing store {instance.id} deleted, "
-        f"invalidating all caches (expensive operation)"
-    )
-    ClosestStoresService.invalidate_all_cache()
+def recompute_cache_on_store_delete(sender, instance, **kwargs):
+    """Recompute only the listings that had this store in their cached top-K."""
+    logger.info(f"[SIGNAL] {sender.__name__} {instance.id} deleted, recomputing affected caches")
+    ClosestStoresService.recompute_for_store_change(sender, instance.id, old_location=instance.location)
+
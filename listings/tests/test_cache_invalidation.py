@@ -0,0 +1,150 @@
+from unittest import mock
+
+from django.contrib.gis.geos import Point
+from django.test import TestCase, override_settings
+
+from listings.models import ClosestStoresCache, DisplayConfig, Listing
+from listings.services import ClosestStoresService, deferred_cache_invalidation
+from stores_layer.models import Clothing, Grocery
+
+
+def _point(lon: float, lat: float = 41.0) -> Point:
+    return Point(lon, lat, srid=4326)
+
+
+class AffectedListingsTests(TestCase):
+    """
+    Two clusters 40 km apart, K = 2 grocery stores per listing; a single
+    clothing store, so every clothing cache is partial (fewer than K stores).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        DisplayConfig.objects.create(closest_grocery_stores=2, closest_clothing_stores=2)
+        # bulk_create: no signals, the caches are computed once below
+        cls.west_stores = Grocery.objects.bulk_create(
+            [Grocery(name="West 1", location=_point(29.001)), Grocery(name="West 2", location=_point(29.002))]
+        )
+        cls.east_stores = Grocery.objects.bulk_create(
+            [Grocery(name="East 1", location=_point(29.480)), Grocery(name="East 2", location=_point(29.481))]
+        )
+        cls.clothing = Clothing.objects.bulk_create([Clothing(name="Only", location=_point(29.001))])[0]
+        cls.west = Listing.objects.create(title="West", price=1, size_sqm=50, location=_point(29.0))
+        cls.east = Listing.objects.create(title="East", price=1, size_sqm=50, location=_point(29.4802))
+        ClosestStoresService.compute_all_listings()
+
+    def _cache(self, listing) -> ClosestStoresCache:
+        return ClosestStoresCache.objects.get(listing=listing)
+
+    def _affected(self, model, store_ids, points, inserted=False):
+        return sorted(ClosestStoresService.affected_listing_ids(model, store_ids, points, inserted))
+
+    def test_caches_are_not_radius_bounded(self):
+        far = Listing.objects.create(title="Far", price=1, size_sqm=50, location=_point(30.2))
+        ClosestStoresService.compute_batch([far.id], DisplayConfig.get_config())
+        cache = self._cache(far)
+        self.assertEqual(cache.closest_grocery_ids, [s.id for s in reversed(self.east_stores)])
+        self.assertEqual(cache.closest_clothing_ids, [self.clothing.id])
+        self.assertGreater(cache.grocery_max_distance_m, 50_000)
+
+    def test_store_within_kth_distance(self):
+        self.assertEqual(self._affected(Grocery, [999], [_point(29.0005)], inserted=True), [self.west.id])
+        self.assertEqual(self._affected(Grocery, [999], [_point(29.24)], inserted=True), [])
+
+    def test_cached_store_moving_away_or_deleted(self):
+        self.assertEqual(self._affected(Grocery, [self.east_stores[0].id], [_point(29.9)]), [self.east.id])
+        self.assertEqual(self._affected(Grocery, [self.west_stores[1].id], []), [self.west.id])
+
+    def test_partial_cache_is_affected_by_inserts_only(self):
+        ids = sorted([self.west.id, self.east.id])
+        # A new clothing store anywhere enters every partial cache
+        self.assertEqual(self._affected(Clothing, [999], [_point(31.0)], inserted=True), ids)
+        # Moving the cached store: caught through the cached IDs
+        self.assertEqual(self._affected(Clothing, [self.clothing.id], [_point(31.0)]), ids)
+        # A moved store that no partial cache holds cannot exist; nothing else is affected
+        self.assertEqual(self._affected(Clothing, [999], [_point(31.0)]), [])
+
+    def test_store_signal_recomputes_only_affected_listings(self):
+        east_before = self._cache(self.east).updated_at
+        store = Grocery.objects.create(name="West 0", location=_point(29.0002))
+
+        self.assertEqual(self._cache(self.west).closest_grocery_ids, [store.id, self.west_stores[0].id])
+        self.assertEqual(self._cache(self.east).updated_at, east_before)
+
+        store.location = _point(29.4803)
+        store.save()
+        self.assertEqual(self._cache(self.west).closest_grocery_ids, [s.id for s in self.west_stores])
+        self.assertEqual(self._cache(self.east).closest_grocery_ids, [store.id, self.east_stores[0].id])
+
+    def test_new_clothing_store_fills_partial_caches(self):
+        store = Clothing.objects.create(name="Far away", location=_point(30.5))
+        self.assertEqual(self._cache(self.west).closest_clothing_ids, [self.clothing.id, store.id])
+        self.assertEqual(self._cache(self.east).closest_clothing_ids, [self.clothing.id, store.id])
+
+
+class DeferredInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        DisplayConfig.objects.create(closest_grocery_stores=1, closest_clothing_stores=1)
+        cls.store = Grocery.objects.bulk_create([Grocery(name="Old", location=_point(29.01))])[0]
+        cls.listing = Listing.objects.create(title="Listing", price=1, size_sqm=50, location=_point(29.0))
+        ClosestStoresService.compute_all_listings()
+
+    def _grocery_ids(self):
+        return ClosestStoresCache.objects.get(listing=self.listing).closest_grocery_ids
+
+    def _spy(self, name):
+        patcher = mock.patch.object(ClosestStoresService, name, wraps=getattr(ClosestStoresService, name))
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_recomputed_once_when_the_block_exits(self):
+        targeted = self._spy("recompute_for_store_changes")
+        with deferred_cache_invalidation():
+            near = Grocery.objects.create(name="Near", location=_point(29.005))
+            Grocery.objects.create(name="Nearer", location=_point(29.001))
+            near.location = _point(29.002)
+            near.save()
+            self.assertEqual(self._grocery_ids(), [self.store.id])
+            targeted.assert_not_called()
+
+        targeted.assert_called_once()
+        self.assertEqual(self._grocery_ids(), [Grocery.objects.get(name="Nearer").id])
+
+    def test_nested_blocks_join_the_outermost(self):
+        targeted = self._spy("recompute_for_store_changes")
+        with deferred_cache_invalidation():
+            with deferred_cache_invalidation():
+                Grocery.objects.create(name="Nearer", location=_point(29.001))
+            targeted.assert_not_called()
+        targeted.assert_called_once()
+
+    @override_settings(CLOSEST_STORES_TARGETED_MAX_POINTS=2)
+    def test_large_import_recomputes_everything(self):
+        targeted = self._spy("affected_listing_ids")
+        full = self._spy("compute_all_listings")
+        with deferred_cache_invalidation():
+            for i in range(3):
+                Grocery.objects.create(name=f"New {i}", location=_point(29.002 + i * 0.001))
+
+        targeted.assert_not_called()
+        full.assert_called_once_with(batch=True)
+        self.assertEqual(self._grocery_ids(), [Grocery.objects.get(name="New 0").id])
+
+    def test_truncate_recomputes_everything(self):
+        targeted = self._spy("affected_listing_ids")
+        full = self._spy("compute_all_listings")
+        with deferred_cache_invalidation():
+            with deferred_cache_invalidation(full_recompute=True):
+                Grocery.objects.all().delete()
+            Grocery.objects.create(name="Replacement", location=_point(29.02))
+
+        targeted.assert_not_called()
+        full.assert_called_once_with(batch=True)
+        self.assertEqual(self._grocery_ids(), [Grocery.objects.get(name="Replacement").id])
+
+    def test_no_changes_no_recompute(self):
+        full = self._spy("compute_all_listings")
+        with deferred_cache_invalidation(full_recompute=True):
+            pass
+        full.assert_not_called()
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.contrib.gis.geos import Point
+from django.test import TestCase, override_settings
+
+from listings.models import ClosestStoresCache, DisplayConfig, Listing
+from listings.services import ClosestStoresService, refresh_queue
+from stores_layer.models import Clothing, Grocery
+
+
+@override_settings(CLOSEST_STORES_SWR=True)
+class CachedStoresTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        DisplayConfig.objects.create(closest_grocery_stores=1, closest_clothing_stores=1)
+        cls.grocery = Grocery.objects.bulk_create([Grocery(name="Grocery", location=Point(29.001, 41.0, srid=4326))])[0]
+        cls.clothing = Clothing.objects.bulk_create([Clothing(name="Clothing", location=Point(29.002, 41.0, srid=4326))])[0]
+        cls.listing = Listing.objects.create(title="Listing", price=1, size_sqm=50, location=Point(29.0, 41.0, srid=4326))
+
+    def _bulk(self):
+        listing = Listing.objects.select_related("closest_stores_cache").get(pk=self.listing.pk)
+        return ClosestStoresService.get_cached_stores_bulk([listing])[listing.pk]
+
+    def test_cold_miss_is_computed_once_and_stored(self):
+        with mock.patch.object(refresh_queue, "enqueue") as enqueue, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self._bulk(), ([self.grocery.id], [self.clothing.id]))
+        enqueue.assert_not_called()
+        cache = ClosestStoresCache.objects.get(listing=self.listing)
+        self.assertEqual((cache.closest_grocery_ids, cache.is_stale), ([self.grocery.id], False))
+
+        # Served from the stored row from now on
+        with self.assertNumQueries(1):
+            self.assertEqual(self._bulk(), ([self.grocery.id], [self.clothing.id]))
+
+    def test_stale_row_is_served_and_refreshed_after_commit(self):
+        ClosestStoresCache.objects.create(
+            listing=self.listing, closest_grocery_ids=[123], closest_clothing_ids=[456], is_stale=True
+        )
+        with mock.patch.object(refresh_queue, "enqueue") as enqueue:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self.assertEqual(self._bulk(), ([123], [456]))
+            enqueue.assert_not_called()
+            for callback in callbacks:
+                callback()
+        enqueue.assert_called_once_with([self.listing.id])
+
+    @override_settings(CLOSEST_STORES_SWR=False)
+    def test_stale_row_is_recomputed_without_swr(self):
+        ClosestStoresCache.objects.create(
+            listing=self.listing, closest_grocery_ids=[123], closest_clothing_ids=[456], is_stale=True
+        )
+        self.assertEqual(self._bulk(), ([self.grocery.id], [self.clothing.id]))
+        self.assertFalse(ClosestStoresCache.objects.get(listing=self.listing).is_stale)
+
+    def test_invalidate_keeps_the_row_and_marks_it_stale(self):
+        ClosestStoresService.compute_batch([self.listing.id], DisplayConfig.get_config())
+        with mock.patch.object(refresh_queue, "enqueue") as enqueue, self.captureOnCommitCallbacks(execute=True):
+            ClosestStoresService.invalidate_cache(self.listing)
+        cache = ClosestStoresCache.objects.get(listing=self.listing)
+        self.assertTrue(cache.is_stale)
+        self.assertEqual(cache.closest_grocery_ids, [self.grocery.id])
+        enqueue.assert_called_once_with([self.listing.id])
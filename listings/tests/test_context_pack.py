@@ -0,0 +1,69 @@
+import json
+import tempfile
+
+from django.test import SimpleTestCase
+
+from tools.nearby_enrichment.context_pack import ContextPack
+
+
+class ContextPackTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.pack = ContextPack(tmp.name)
+
+    def _context(self, listing_id, **extra):
+        return {"listing": {"id": listing_id, "title": f"Listing {listing_id} – Kadıköy"}, **extra}
+
+    def test_append_and_get(self):
+        with self.pack.writer() as writer:
+            for listing_id in (3, 1, 2):
+                writer.append(listing_id, self._context(listing_id))
+
+        self.assertEqual(len(self.pack), 3)
+        self.assertEqual(self.pack.get(1), self._context(1))
+        self.assertEqual(self.pack.get("2"), self._context(2))
+        self.assertIsNone(self.pack.get(4))
+        self.assertEqual([listing_id for listing_id, _ in self.pack], ["3", "1", "2"])
+
+    def test_offsets_are_byte_ranges(self):
+        with self.pack.writer() as writer:
+            writer.append(1, self._context(1))
+            writer.append(2, self._context(2))
+        data = self.pack.data_path.read_bytes()
+        for listing_id, (offset, length) in self.pack.index().items():
+            self.assertEqual(json.loads(data[offset:offset + length]), self._context(int(listing_id)))
+
+    def test_later_writers_append_and_latest_record_wins(self):
+        with self.pack.writer() as writer:
+            writer.append(1, self._context(1, version=1))
+            writer.append(2, self._context(2))
+        self.pack.get(1)  # load the index before the next writer
+        with self.pack.writer() as writer:
+            writer.append(1, self._context(1, version=2))
+
+        self.assertEqual(self.pack.get(1)["version"], 2)
+        self.assertEqual(len(self.pack), 2)
+        self.assertEqual(ContextPack(self.pack.directory).get(1)["version"], 2)
+
+    def test_compact_drops_superseded_records(self):
+        with self.pack.writer() as writer:
+            for version in range(3):
+                writer.append(1, self._context(1, version=version))
+            writer.append(2, self._context(2))
+        before = self.pack.data_path.stat().st_size
+
+        reclaimed = self.pack.compact()
+
+        self.assertGreater(reclaimed, 0)
+        self.assertEqual(self.pack.data_path.stat().st_size, before - reclaimed)
+        self.assertEqual(len(self.pack.data_path.read_bytes().splitlines()), 2)
+        self.assertEqual(len(self.pack.index_path.read_bytes().splitlines()), 2)
+        self.assertEqual(self.pack.get(1), self._context(1, version=2))
+        self.assertEqual(self.pack.get(2), self._context(2))
+        self.assertEqual(self.pack.compact(), 0)
+
+    def test_empty_pack(self):
+        self.assertEqual(len(self.pack), 0)
+        self.assertIsNone(self.pack.get(1))
+        self.assertEqual(self.pack.compact(), 0)
@@ -0,0 +1,89 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django_distill.distill import urls_to_distill
+
+from listings.management.commands.export_static import (
+    MANIFEST_NAME,
+    OUTPUT_INPUTS,
+    Export,
+    _export_key,
+    distill_exports,
+)
+from tools.nearby_enrichment.poi_index import fetch_layer_versions
+from transit_layer.models import MetroStation
+
+METRO_FILE = "api/metro_stations.geojson"
+
+
+class ExportKeyTests(TestCase):
+    def _exports(self):
+        return {export.distill_file: export for export in distill_exports()}
+
+    def _key(self, export: Export):
+        labels = export.inputs.tables if export.inputs else ()
+        return _export_key(export, fetch_layer_versions(labels) if labels else {})
+
+    def test_every_distill_path_is_exported_with_declared_inputs(self):
+        exports = distill_exports()
+        self.assertEqual({e.url_name for e in exports}, {entry[4] for entry in urls_to_distill})
+        self.assertEqual({e.distill_file for e in exports if e.inputs is None}, set())
+        self.assertIn(METRO_FILE, {e.distill_file for e in exports})
+
+    def test_key_follows_the_tables_read(self):
+        exports = self._exports()
+        metro, stores = exports[METRO_FILE], exports["api/stores.geojson"]
+        metro_key, stores_key = self._key(metro), self._key(stores)
+
+        MetroStation.objects.create(name="Kadıköy", location=Point(29.03, 40.99, srid=4326))
+
+        self.assertNotEqual(self._key(metro), metro_key)
+        self.assertEqual(self._key(stores), stores_key)
+
+    def test_key_follows_declared_settings(self):
+        simplified = self._exports()["simplified/index.html"]
+        with override_settings(SIMPLIFIED_INLINE_DATA=False):
+            before = self._key(simplified)
+        with override_settings(SIMPLIFIED_INLINE_DATA=True):
+            self.assertNotEqual(self._key(simplified), before)
+
+    def test_undeclared_output_has_no_key(self):
+        self.assertIsNone(_export_key(Export("/new/", "new/index.html", "new_page"), {}))
+        self.assertNotIn("new_page", OUTPUT_INPUTS)
+
+
+class ExportCommandTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.out_dir = Path(tmp.name)
+
+    def _export(self, *args) -> str:
+        out = io.StringIO()
+        call_command(
+            "export_static", "--out-dir", str(self.out_dir), "--only", METRO_FILE, "--exclude-staticfiles", *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_unchanged_output_is_skipped(self):
+        self.assertIn("1 of 1 output(s) to render", self._export())
+        self.assertTrue((self.out_dir / METRO_FILE).exists())
+        manifest = json.loads((self.out_dir / MANIFEST_NAME).read_text())
+        self.assertIn(METRO_FILE, manifest)
+
+        self.assertIn("0 of 1 output(s) to render", self._export())
+        self.assertIn("1 of 1 output(s) to render", self._export("--force"))
+
+    def test_changed_table_or_missing_file_is_rendered(self):
+        self._export()
+        MetroStation.objects.create(name="Üsküdar", location=Point(29.01, 41.02, srid=4326))
+        self.assertIn("1 of 1 output(s) to render", self._export())
+
+        (self.out_dir / METRO_FILE).unlink()
+        self.assertIn("1 of 1 output(s) to render", self._export())
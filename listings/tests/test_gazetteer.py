@@ -0,0 +1,15 @@
+from django.test import SimpleTestCase
+
+from listings.gazetteer import ISTANBUL_DISTRICTS, _place_key
+from listings.text import fold_turkish
+
+
+class PlaceKeyTests(SimpleTestCase):
+    def test_district_names_fold_to_ascii(self):
+        for name in ISTANBUL_DISTRICTS:
+            with self.subTest(name=name):
+                self.assertTrue(fold_turkish(name).isascii())
+
+    def test_place_key_drops_trailing_noise(self):
+        self.assertEqual(_place_key("Kadıköy, İstanbul, Türkiye"), "kadikoy")
+        self.assertEqual(_place_key("İstanbul"), "istanbul")
@@ -0,0 +1,59 @@
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase
+
+from listings import proximity
+from listings.management.commands.generate_listing_maps import _inputs_hash, _write_chunk, _written_hash
+from listings.models import ExternalListing, MapGenerationConfig
+
+
+class InputsHashTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # No layer enabled: maps are rendered from the listing alone
+        cls.cfg = MapGenerationConfig.objects.create(
+            **{f"enable_{key}": False for key in (*proximity.POINT_LAYERS, *proximity.LINE_LAYERS, "pharmacy")}
+        )
+        cls.ext = ExternalListing.objects.create(
+            external_id="7", title="Moda flat", price=5_000_000, lat=40.98, lng=29.03
+        )
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.out_path = Path(tmp.name) / "listing_7.html"
+        self.options = {"out_dir": tmp.name, "icons_src": "icons.abc.js", "preserve_icon_aspect": False, "force": False}
+
+    def _write(self, **options) -> int:
+        return _write_chunk([self.ext.pk], {**self.options, **options})
+
+    def test_hash_follows_the_rendered_inputs(self):
+        ext = ExternalListing.objects.get(pk=self.ext.pk)
+        before = _inputs_hash(ext, self.cfg, self.options)
+        self.assertEqual(_inputs_hash(ext, self.cfg, dict(self.options)), before)
+
+        self.assertNotEqual(_inputs_hash(ext, self.cfg, {**self.options, "icons_src": "icons.def.js"}), before)
+        ext.proximity_version = "other"
+        self.assertNotEqual(_inputs_hash(ext, self.cfg, self.options), before)
+
+    def test_unchanged_map_is_skipped(self):
+        self.assertIsNone(_written_hash(self.out_path))
+        self.assertEqual(self._write(), 1)
+        ext = ExternalListing.objects.get(pk=self.ext.pk)
+        self.assertEqual(_written_hash(self.out_path), _inputs_hash(ext, self.cfg, self.options))
+
+        self.assertEqual(self._write(), 0)
+        self.assertEqual(self._write(force=True), 1)
+
+    def test_changed_listing_is_rewritten(self):
+        self._write()
+        ExternalListing.objects.filter(pk=self.ext.pk).update(title="Moda flat, renovated")
+        self.assertEqual(self._write(), 1)
+        self.assertIn("Moda flat, renovated", self.out_path.read_text(encoding="utf-8"))
+
+    def test_missing_or_unmarked_file_is_rewritten(self):
+        self._write()
+        self.out_path.write_text("<html></html>", encoding="utf-8")
+        self.assertIsNone(_written_hash(self.out_path))
+        self.assertEqual(self._write(), 1)
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase
+
+from listings.geoapi import (
+    LayerPage,
+    PageRequest,
+    PageRequestError,
+    _cursor_values,
+    _keyset_condition,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+)
+from listings.models import Listing
+from listings.queries import LISTING_ORDERING
+from stores_layer.models import Clothing, Grocery
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        for values in ([3, 17], ["2025-11-14T01:44:00+00:00", 42], [0, "a/b+c=?"], [1.5, None, True]):
+            with self.subTest(values=values):
+                token = encode_cursor(values)
+                self.assertNotIn("=", token)
+                self.assertEqual(decode_cursor(token), values)
+
+    def test_datetimes_are_encoded_as_isoformat(self):
+        created_at = datetime(2025, 11, 14, 1, 44, 0, 123456, tzinfo=timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor([created_at, 5])), [created_at.isoformat(), 5])
+
+    def test_invalid_tokens(self):
+        for token in ("!!!", encode_cursor([]), "eyJhIjoxfQ", "bm90IGpzb24"):
+            with self.subTest(token=token), self.assertRaises(PageRequestError):
+                decode_cursor(token)
+
+
+class KeysetConditionTests(SimpleTestCase):
+    def test_single_field(self):
+        self.assertEqual(_keyset_condition(["id"], [5]), Q(id__gt=5))
+        self.assertEqual(_keyset_condition(["-id"], [5]), Q(id__lt=5))
+
+    def test_descending_with_tie_breaker(self):
+        self.assertEqual(
+            _keyset_condition(["-created_at", "-id"], ["2025-11-14T01:44:00+00:00", 9]),
+            Q(created_at__lt="2025-11-14T01:44:00+00:00")
+            | (Q(created_at="2025-11-14T01:44:00+00:00") & Q(id__lt=9)),
+        )
+
+    def test_mixed_directions(self):
+        self.assertEqual(
+            _keyset_condition(["table", "-name", "id"], [1, "b", 7]),
+            Q(table__gt=1) | (Q(table=1) & Q(name__lt="b")) | (Q(table=1, name="b") & Q(id__gt=7)),
+        )
+
+
+class CursorValidationTests(SimpleTestCase):
+    def test_values_take_the_field_types(self):
+        created_at, listing_id = _cursor_values(
+            Listing.objects.all(), LISTING_ORDERING, ["2025-11-14T01:44:00+00:00", "42"]
+        )
+        self.assertEqual(created_at, datetime(2025, 11, 14, 1, 44, tzinfo=timezone.utc))
+        self.assertEqual(listing_id, 42)
+
+    def test_tampered_values(self):
+        now = "2025-11-14T01:44:00+00:00"
+        for cursor in (["x", 1], [now, "x"], [now, None], [now, [1]], [{"a": 1}, 1], [1, 1], [now]):
+            with self.subTest(cursor=cursor), self.assertRaises(PageRequestError):
+                keyset_page(Listing.objects.all(), LISTING_ORDERING, PageRequest(limit=10, cursor=cursor))
+
+    def test_layer_table_index_in_range(self):
+        querysets = [Grocery.objects.all(), Clothing.objects.all()]
+        self.assertEqual(LayerPage(querysets, PageRequest(cursor=[1, None])).start, 1)
+        for cursor in ([-1, None], [2, None], [2, 5], ["x", None], [0, "x"]):
+            with self.subTest(cursor=cursor), self.assertRaises(PageRequestError):
+                LayerPage(querysets, PageRequest(cursor=cursor))
+
+
+class TamperedCursorResponseTests(TestCase):
+    def test_bad_cursor_is_a_client_error(self):
+        response = self.client.get("/api/listings.geojson", {"cursor": encode_cursor(["x", 1])})
+        self.assertEqual(response.status_code, 400)
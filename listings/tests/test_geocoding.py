@@ -0,0 +1,98 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from listings import geocoding
+from listings.geocoding import GeocoderUnavailable, geocode, normalize_query
+from listings.models import GeocoderState
+
+
+class NormalizeQueryTests(SimpleTestCase):
+    def test_variants_share_a_key(self):
+        for query in ("Kadıköy,  İstanbul", "kadikoy istanbul", "KADIKÖY / ISTANBUL", " kadıköy-istanbul! "):
+            with self.subTest(query=query):
+                self.assertEqual(normalize_query(query), "kadikoy istanbul")
+
+    def test_compatibility_forms_and_punctuation(self):
+        self.assertEqual(normalize_query("ＡＴＡŞＥＨİＲ"), "atasehir")
+        self.assertEqual(normalize_query("Bağdat Cd. No:12"), "bagdat cd no 12")
+        self.assertEqual(normalize_query(" ,;- "), "")
+
+    def test_key_length_is_bounded(self):
+        self.assertEqual(len(normalize_query("a" * 2000)), geocoding.MAX_KEY_LENGTH)
+
+
+@override_settings(GEOCODE_BREAKER_THRESHOLD=2, GEOCODE_BREAKER_COOLDOWN_S=60, GEOCODE_MIN_INTERVAL_S=0)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        geocoding._lru._data.clear()
+        self.upstream = mock.Mock()
+        patcher = mock.patch.object(geocoding, "_geolocator", return_value=self.upstream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _state(self) -> GeocoderState:
+        return GeocoderState.objects.get(pk=1)
+
+    def _fail(self, query: str) -> None:
+        with self.assertRaises(GeocoderUnavailable):
+            geocode(query)
+
+    def test_opens_after_threshold_failures(self):
+        self.upstream.geocode.side_effect = OSError("timeout")
+        self._fail("first")
+        self.assertEqual(self._state().consecutive_failures, 1)
+        self.assertIsNone(self._state().open_until)
+
+        self._fail("second")
+        self.assertEqual(self._state().consecutive_failures, 2)
+        self.assertGreater(self._state().open_until, timezone.now())
+
+        # Open: rejected without calling the provider
+        self._fail("third")
+        self.assertEqual(self.upstream.geocode.call_count, 2)
+
+    def test_probe_after_cooldown_closes_on_success(self):
+        GeocoderState.objects.create(pk=1, consecutive_failures=2, open_until=timezone.now() - timedelta(seconds=1))
+        self.upstream.geocode.return_value = SimpleNamespace(longitude=29.03, latitude=40.99, address="Kadıköy")
+
+        result = geocode("Kadıköy")
+
+        self.assertEqual((result.lon, result.lat, result.display_name), (29.03, 40.99, "Kadıköy"))
+        self.assertEqual(self._state().consecutive_failures, 0)
+        self.assertIsNone(self._state().open_until)
+
+    def test_failed_probe_reopens(self):
+        GeocoderState.objects.create(pk=1, consecutive_failures=2, open_until=timezone.now() - timedelta(seconds=1))
+        self.upstream.geocode.side_effect = OSError("timeout")
+
+        self._fail("probe")
+
+        self.assertEqual(self._state().consecutive_failures, 3)
+        self.assertGreater(self._state().open_until, timezone.now())
+
+    def test_failures_must_be_consecutive(self):
+        self.upstream.geocode.side_effect = [OSError("timeout"), None, OSError("timeout")]
+        self._fail("first")
+        self.assertIsNone(geocode("second"))
+        self._fail("third")
+        self.assertEqual(self._state().consecutive_failures, 1)
+        self.assertIsNone(self._state().open_until)
+
+    @override_settings(GEOCODE_MIN_INTERVAL_S=60)
+    def test_rate_limit_wait_over_max_wait_is_rejected(self):
+        self.upstream.geocode.return_value = None
+        self.assertIsNone(geocode("first", max_wait_s=0))
+        with self.assertRaises(GeocoderUnavailable):
+            geocode("second", max_wait_s=0)
+        self.assertEqual(self.upstream.geocode.call_count, 1)
+
+    def test_cached_answers_skip_the_provider(self):
+        self.upstream.geocode.return_value = SimpleNamespace(longitude=29.03, latitude=40.99, address="Kadıköy")
+        geocode("Kadıköy, İstanbul")
+        geocoding._lru._data.clear()  # served from the cache table
+        self.assertEqual(geocode("kadikoy istanbul").lat, 40.99)
+        self.assertEqual(self.upstream.geocode.call_count, 1)
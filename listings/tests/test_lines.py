@@ -0,0 +1,38 @@
+import random
+
+from django.test import SimpleTestCase
+
+from tools.nearby_enrichment.lines import STRTree, _envelope_distance, _intersects
+
+
+class STRTreeTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(11)
+        self.envelopes = []
+        for _ in range(400):
+            x, y = rng.uniform(0, 50_000), rng.uniform(0, 50_000)
+            self.envelopes.append((x, y, x + rng.uniform(0, 2_000), y + rng.uniform(0, 2_000)))
+        self.tree = STRTree(self.envelopes, node_capacity=4)
+        self.rng = rng
+
+    def test_query_matches_brute_force(self):
+        for _ in range(100):
+            x, y = self.rng.uniform(-5_000, 55_000), self.rng.uniform(-5_000, 55_000)
+            box = (x, y, x + self.rng.uniform(0, 10_000), y + self.rng.uniform(0, 10_000))
+            expected = [i for i, env in enumerate(self.envelopes) if _intersects(env, box)]
+            self.assertEqual(sorted(self.tree.query(box)), expected)
+
+    def test_nearest_candidates_in_distance_order(self):
+        for _ in range(20):
+            x, y = self.rng.uniform(-5_000, 55_000), self.rng.uniform(-5_000, 55_000)
+            candidates = list(self.tree.nearest_candidates(x, y))
+            self.assertEqual(sorted(item for _, item in candidates), list(range(len(self.envelopes))))
+            distances = [d for d, _ in candidates]
+            self.assertEqual(distances, sorted(distances))
+            for d, item in candidates:
+                self.assertAlmostEqual(d, _envelope_distance(self.envelopes[item], x, y))
+
+    def test_empty_tree(self):
+        tree = STRTree([])
+        self.assertEqual(tree.query((0, 0, 1, 1)), [])
+        self.assertEqual(list(tree.nearest_candidates(0, 0)), [])
@@ -0,0 +1,39 @@
+import math
+import random
+
+from django.test import SimpleTestCase
+
+from tools.nearby_enrichment.poi_index import KDTree, _arc_to_chord, _to_xyz
+
+
+class KDTreeTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        # Istanbul-sized box, with duplicates to exercise ties
+        self.lonlats = [(rng.uniform(28.6, 29.4), rng.uniform(40.8, 41.3)) for _ in range(500)]
+        self.lonlats += self.lonlats[:20]
+        self.points = [_to_xyz(lon, lat) for lon, lat in self.lonlats]
+        self.tree = KDTree(self.points)
+        self.queries = [(rng.uniform(28.5, 29.5), rng.uniform(40.7, 41.4)) for _ in range(50)]
+
+    def _brute_force(self, xyz, max_dist, k):
+        hits = sorted((math.dist(p, xyz), i) for i, p in enumerate(self.points))
+        return [hit for hit in hits if hit[0] <= max_dist][:k]
+
+    def test_matches_brute_force(self):
+        for radius_m in (500, 3000, 20000, 1e7):
+            for k in (1, 5, 40):
+                for lon, lat in self.queries:
+                    with self.subTest(radius_m=radius_m, k=k, lon=lon, lat=lat):
+                        xyz = _to_xyz(lon, lat)
+                        expected = self._brute_force(xyz, _arc_to_chord(radius_m), k)
+                        actual = self.tree.query(xyz, _arc_to_chord(radius_m), k)
+                        # Duplicated points tie, so compare distances rather than indices
+                        self.assertEqual(len(actual), len(expected))
+                        for (d1, i), (d2, _) in zip(actual, expected):
+                            self.assertAlmostEqual(d1, d2, places=6)
+                            self.assertAlmostEqual(d1, math.dist(self.points[i], xyz), places=6)
+
+    def test_empty_tree_and_zero_k(self):
+        self.assertEqual(KDTree([]).query(_to_xyz(29.0, 41.0), 1e6, 5), [])
+        self.assertEqual(self.tree.query(_to_xyz(29.0, 41.0), 1e6, 0), [])
@@ -0,0 +1,66 @@
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+
+from listings import proximity
+from listings.models import ExternalListing, ListingProximity, MapGenerationConfig
+from stores_layer.models import Grocery
+
+
+def _point(lon: float, lat: float = 41.0) -> Point:
+    return Point(lon, lat, srid=4326)
+
+
+class MaterializeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        disabled = {f"enable_{key}": False for key in (*proximity.POINT_LAYERS, *proximity.LINE_LAYERS, "pharmacy")}
+        cls.cfg = MapGenerationConfig.objects.create(
+            **{**disabled, "enable_grocery": True, "radius_grocery": 1000, "max_grocery": 2}
+        )
+        cls.near, cls.far = Grocery.objects.bulk_create(
+            [Grocery(name="Near", location=_point(29.001)), Grocery(name="Far", location=_point(29.005))]
+        )
+        cls.ext = ExternalListing.objects.create(external_id="1", title="Listing", lat=41.0, lng=29.0)
+
+    def _materialize(self, **kwargs) -> int:
+        return proximity.materialize(ExternalListing.objects.filter(pk=self.ext.pk), **kwargs)
+
+    def _poi_ids(self):
+        return list(ListingProximity.objects.filter(listing=self.ext).order_by("rank").values_list("poi_id", flat=True))
+
+    def test_rows_are_built_once_per_version(self):
+        self.assertEqual(self._materialize(), 1)
+        self.ext.refresh_from_db()
+        self.assertEqual(self.ext.proximity_version, proximity.proximity_version(self.cfg))
+        self.assertEqual(self._poi_ids(), [str(self.near.id), str(self.far.id)])
+        self.assertAlmostEqual(self.ext.nearest_distances_m["grocery_m"], 84, delta=1)
+
+        self.assertEqual(self._materialize(), 0)
+        self.assertEqual(self._materialize(force=True), 1)
+
+    def test_poi_change_makes_listings_stale(self):
+        self._materialize()
+        nearer = Grocery.objects.create(name="Nearer", location=_point(29.0005))
+        self.assertEqual(self._materialize(), 1)
+        self.assertEqual(self._poi_ids(), [str(nearer.id), str(self.near.id)])
+
+    def test_config_edit_makes_listings_stale(self):
+        self._materialize()
+        self.cfg.radius_grocery = 200
+        self.cfg.save()
+        self.assertEqual(self._materialize(), 1)
+        self.assertEqual(self._poi_ids(), [str(self.near.id)])
+
+    def test_moved_listing_drops_its_rows_and_is_rebuilt_on_read(self):
+        self._materialize()
+        ext = ExternalListing.objects.get(pk=self.ext.pk)
+        ext.lng = 29.006
+        ext.save()
+        ext.refresh_from_db()
+        self.assertEqual(ext.proximity_version, "")
+        self.assertEqual(self._poi_ids(), [])
+
+        response = self.client.get(f"/api/external-listings/{ext.source}/{ext.external_id}/nearby")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.json()["layers"]["grocery"]], [self.far.id, self.near.id])
+        self.assertEqual(self._poi_ids(), [str(self.far.id), str(self.near.id)])
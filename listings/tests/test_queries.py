@@ -0,0 +1,104 @@
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from listings.geoapi import PageRequest, decode_cursor
+from listings.models import ClosestStoresCache, DisplayConfig, Listing, ListingImage
+from listings.queries import LISTING_IMAGE_LIMIT, ListingPageStream, load_listing_page
+from stores_layer.models import Clothing, Grocery
+from transit_layer.models import MetroStation
+
+
+def _point(i: int) -> Point:
+    return Point(28.95 + i * 0.002, 41.0 + i * 0.001, srid=4326)
+
+
+class ListingPageTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        DisplayConfig.get_config()
+        MetroStation.objects.bulk_create(MetroStation(name=f"Station {i}", location=_point(i * 3)) for i in range(5))
+        Grocery.objects.bulk_create(Grocery(name=f"Grocery {i}", location=_point(i * 2)) for i in range(5))
+        Clothing.objects.bulk_create(Clothing(name=f"Clothing {i}", location=_point(i * 2 + 1)) for i in range(5))
+        cls.listings = Listing.objects.bulk_create(
+            Listing(title=f"Listing {i}", price=1_000_000 + i, size_sqm=80, location=_point(i)) for i in range(20)
+        )
+        ListingImage.objects.bulk_create(
+            ListingImage(listing=listing, image=f"listings/images/{listing.pk}-{order}.jpg", order=order)
+            for listing in cls.listings
+            for order in range(LISTING_IMAGE_LIMIT + 1)
+        )
+
+    def _cache_all(self):
+        ClosestStoresCache.objects.bulk_create(
+            ClosestStoresCache(listing=listing, closest_grocery_ids=[1], closest_clothing_ids=[1])
+            for listing in self.listings
+        )
+
+
+class LoadListingPageQueryCountTests(ListingPageTestCase):
+    """The statements issued for a page do not depend on the page size (max_listings)."""
+
+    def test_warm_cache_page_is_three_statements(self):
+        self._cache_all()
+        for limit in (1, 5, 20):
+            with self.subTest(limit=limit), self.assertNumQueries(3):
+                page = load_listing_page(PageRequest(limit=limit))
+            self.assertEqual(len(page.listings), limit)
+            self.assertEqual(len(page.nearest_stations), limit)
+            self.assertEqual(len(page.closest_stores), limit)
+            for listing in page.listings:
+                self.assertEqual(
+                    [image.order for image in listing.carousel_images], list(range(LISTING_IMAGE_LIMIT))
+                )
+
+    @override_settings(CLOSEST_STORES_SWR=True)
+    def test_cold_cache_page_count_is_constant(self):
+        counts = []
+        for limit in (1, 5, 20):
+            with CaptureQueriesContext(connection) as ctx:
+                page = load_listing_page(PageRequest(limit=limit))
+            self.assertEqual(len(page.closest_stores), limit)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_cursor_walks_every_listing_once(self):
+        self._cache_all()
+        seen = []
+        page = load_listing_page(PageRequest(limit=6))
+        seen.extend(listing.id for listing in page.listings)
+        while page.next_cursor:
+            page = load_listing_page(PageRequest(limit=6, cursor=decode_cursor(page.next_cursor)))
+            seen.extend(listing.id for listing in page.listings)
+        expected = list(Listing.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+
+
+class ListingPageStreamTests(ListingPageTestCase):
+    """A streamed page matches the loaded page, chunk by chunk."""
+
+    def test_chunks_join_into_the_page(self):
+        self._cache_all()
+        expected = load_listing_page(PageRequest(limit=10))
+        for chunk_size in (3, 5, 10, 50):
+            with self.subTest(chunk_size=chunk_size):
+                stream = ListingPageStream(PageRequest(limit=10), chunk_size=chunk_size)
+                rows = list(stream)
+                self.assertEqual([listing.id for listing, _, _ in rows], [l.id for l in expected.listings])
+                self.assertEqual(
+                    [stores for _, _, stores in rows], [expected.closest_stores[l.id] for l in expected.listings]
+                )
+                self.assertEqual(stream.next_cursor, expected.next_cursor)
+
+    def test_last_page_has_no_cursor(self):
+        self._cache_all()
+        stream = ListingPageStream(PageRequest(limit=25), chunk_size=4)
+        self.assertEqual(len(list(stream)), 20)
+        self.assertIsNone(stream.next_cursor)
+
+    def test_statements_per_chunk(self):
+        self._cache_all()
+        with self.assertNumQueries(3 * 4):
+            list(ListingPageStream(PageRequest(limit=20), chunk_size=5))
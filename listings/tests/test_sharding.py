@@ -0,0 +1,77 @@
+import argparse
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from listings.management.commands._sharding import Checkpoint, Shard, parse_shard
+
+
+class CheckpointTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(ENRICHMENT_CHECKPOINT_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.selection = {"limit": None, "config": "2025-11-14 01:44:00+00:00"}
+
+    def _resume(self, shard: Shard = Shard(), selection=None) -> Checkpoint:
+        checkpoint = Checkpoint("update_nearest_distances", shard, selection or self.selection)
+        checkpoint.load()
+        return checkpoint
+
+    def test_done_after_resume(self):
+        checkpoint = self._resume()
+        checkpoint.add([4, 1, 9])
+        checkpoint.add([12, 7])
+
+        resumed = self._resume()
+        for pk in (1, 4, 7, 9, 12):
+            self.assertTrue(resumed.done(pk))
+        # Rows inserted between the finished pks are still processed
+        for pk in (2, 5, 8, 10, 13):
+            self.assertFalse(resumed.done(pk))
+
+    def test_other_selection_starts_over(self):
+        self._resume().add([1, 2, 3])
+
+        other = self._resume(selection={**self.selection, "config": "2025-12-01 00:00:00+00:00"})
+        self.assertFalse(other.done(1))
+        other.add([5])
+
+        # The rerun replaced the file: neither run can resume the other's pks
+        self.assertFalse(self._resume().done(1))
+        self.assertTrue(self._resume(selection={**self.selection, "config": "2025-12-01 00:00:00+00:00"}).done(5))
+
+    def test_shards_keep_separate_files(self):
+        self._resume(Shard(0, 2)).add([2, 4])
+        self.assertFalse(self._resume(Shard(1, 2)).done(2))
+        self.assertTrue(self._resume(Shard(0, 2)).done(4))
+
+    def test_torn_last_line_is_ignored(self):
+        checkpoint = self._resume()
+        checkpoint.add([1, 2])
+        with open(checkpoint.path, "a", encoding="utf-8") as f:
+            f.write("[3, 4")
+        resumed = self._resume()
+        self.assertTrue(resumed.done(2))
+        self.assertFalse(resumed.done(3))
+
+    def test_clear(self):
+        checkpoint = self._resume()
+        checkpoint.add([1])
+        checkpoint.clear()
+        self.assertFalse(checkpoint.path.exists())
+        self.assertFalse(checkpoint.done(1))
+        self.assertFalse(self._resume().done(1))
+
+
+class ParseShardTests(SimpleTestCase):
+    def test_valid(self):
+        self.assertEqual(parse_shard("0/1"), Shard(0, 1))
+        self.assertEqual(parse_shard("3/4"), Shard(3, 4))
+
+    def test_invalid(self):
+        for value in ("4/4", "-1/2", "1/0", "1", "a/b", "1/2/3"):
+            with self.subTest(value=value), self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
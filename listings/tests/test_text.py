@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from listings.text import fold_turkish
+
+
+class FoldTurkishTests(SimpleTestCase):
+    def test_turkish_letters(self):
+        cases = {
+            "Kadıköy": "kadikoy",
+            "Şişli": "sisli",
+            "ÜSKÜDAR": "uskudar",
+            "Beyoğlu": "beyoglu",
+            "Çekmeköy": "cekmekoy",
+            "IĞDIR": "igdir",
+            "İSTİNYE PARK": "istinye park",
+            "Kâğıthane": "kagithane",
+        }
+        for text, folded in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(fold_turkish(text), folded)
+
+    def test_decomposed_and_compatibility_input(self):
+        # "Ş" and "ö" as base letter + combining mark, fullwidth Latin letters
+        self.assertEqual(fold_turkish("S\u0327is\u0327li Ko\u0308y"), "sisli koy")
+        self.assertEqual(fold_turkish("ＦＡＴＩＨ"), "fatih")
+
+    def test_punctuation_and_spacing_collapse(self):
+        self.assertEqual(fold_turkish("  Bağdat Cd.,  No:12 / Kadıköy "), "bagdat cd no 12 kadikoy")
+        self.assertEqual(fold_turkish(" - "), "")
@@ -0,0 +1,22 @@
+"""
+Turkish-aware text normalisation shared by the gazetteer and the geocoding cache.
+"""
+import re
+import unicodedata
+
+# Turkish dotted/dotless i both fold to "i" (str.lower() turns "İ" into "i̇");
+# the other Turkish letters lose their marks in the NFKD step
+_I_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def fold_turkish(text: str) -> str:
+    """
+    Lowercase ASCII-ish matching key: ı/İ/I -> i, ş -> s, ğ -> g, ç -> c,
+    ö -> o, ü -> u, â -> a; compatibility forms unified, punctuation and
+    spacing collapsed to single spaces.
+    """
+    text = unicodedata.normalize("NFKC", text).translate(_I_FOLD).lower()
+    # Combining marks, from the precomposed letters and from decomposed input
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", text).split())
@@ -0,0 +1,164 @@
+"""
+Mapbox vector tiles (MVT) for the point layers shown on the map.
+
+Tiles are rendered by PostGIS (ST_AsMVT) from a bounding-box filtered scan of
+the layer tables, so a request only ever touches the rows inside one tile.
+Below a layer's `full_zoom` the features are thinned to at most one per grid
+cell, which keeps low-zoom tiles small for dense layers like bus stops.
+
+Rendered tiles are kept in the Django cache under the layer's data version
+(row count + latest `updated_at`), so any change to a layer retires its tiles.
+"""
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from tools.nearby_enrichment.poi_index import fetch_layer_versions
+
+logger = logging.getLogger(__name__)
+
+TILE_EXTENT = 4096  # MVT coordinate space per tile
+TILE_BUFFER = 64  # extra pixels rendered around the tile so edge symbols are not clipped
+THIN_GRID = 64  # cells per tile side used for thinning below full_zoom
+WEB_MERCATOR_WIDTH_M = 40075016.685578488
+MAX_ZOOM = 22
+
+
+@dataclass(frozen=True)
+class TileSource:
+    model: str  # "<app_label>.<ModelName>"
+    kind: str = ""  # value of the layer's kind attribute for these rows
+
+
+@dataclass(frozen=True)
+class TileLayer:
+    """
+    A vector tile layer built from one or more point tables.
+
+    Sources are listed by priority: when thinning, the first source wins a
+    grid cell (e.g. metro stations over bus stops).
+    """
+    sources: Tuple[TileSource, ...]
+    min_zoom: int  # empty tiles below this zoom
+    full_zoom: int  # every feature from this zoom on, thinned below it
+    kind_attr: Optional[str] = None  # feature attribute that carries TileSource.kind
+
+
+TILE_LAYERS = {
+    "stores": TileLayer(
+        sources=(TileSource("stores_layer.Clothing", "clothing"), TileSource("stores_layer.Grocery", "grocery")),
+        min_zoom=10,
+        full_zoom=15,
+        kind_attr="store_type",
+    ),
+    "transit": TileLayer(
+        sources=(TileSource("transit_layer.MetroStation", "metro"), TileSource("transit_layer.BusStop", "bus")),
+        min_zoom=9,
+        full_zoom=15,
+        kind_attr="mode",
+    ),
+    "metro": TileLayer(sources=(TileSource("transit_layer.MetroStation"),), min_zoom=8, full_zoom=11),
+    "bus_stops": TileLayer(sources=(TileSource("transit_layer.BusStop"),), min_zoom=11, full_zoom=15),
+}
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def _tile_sql(name: str, layer: TileLayer, thin: bool) -> str:
+    quote = connection.ops.quote_name
+    sources = []
+    for priority, source in enumerate(layer.sources):
+        table = quote(apps.get_model(source.model)._meta.db_table)
+        sources.append(
+            f"""
+            SELECT s.id, s.name, %(kind_{priority})s::text AS kind, {priority} AS priority,
+                   ST_Transform(s.location::geometry, 3857) AS geom
+            FROM {table} AS s, bounds AS b
+            WHERE s.location && b.search
+            """
+        )
+
+    if thin:
+        cell = "floor(ST_X(geom) / %(cell)s), floor(ST_Y(geom) / %(cell)s)"
+        thinned = f"SELECT DISTINCT ON ({cell}) * FROM features ORDER BY {cell}, priority, id"
+    else:
+        thinned = "SELECT * FROM features"
+
+    kind_column = f", f.kind AS {quote(layer.kind_attr)}" if layer.kind_attr else ""
+    return f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env,
+                   ST_Transform(
+                       ST_TileEnvelope(%(z)s, %(x)s, %(y)s, margin => %(margin)s), 4326
+                   )::geography AS search
+        ),
+        features AS ({" UNION ALL ".join(sources)}),
+        thinned AS ({thinned})
+        SELECT ST_AsMVT(t, %(name)s, %(extent)s, 'geom')
+        FROM (
+            SELECT f.id, f.name{kind_column},
+                   ST_AsMVTGeom(f.geom, b.env, %(extent)s, %(buffer)s, true) AS geom
+            FROM thinned AS f, bounds AS b
+        ) AS t
+    """
+
+
+def layer_version(sources: Tuple[TileSource, ...]) -> str:
+    """Short hash of the sources' data version, cached briefly to spare a query per tile."""
+    labels = sorted({s.model for s in sources})
+
+    def fetch() -> str:
+        versions = fetch_layer_versions(labels)
+        return hashlib.md5(repr(sorted(versions.items())).encode()).hexdigest()[:12]
+
+    return cache.get_or_set(f"layer-version:{','.join(labels)}", fetch, settings.TILE_VERSION_TTL_S)
+
+
+def render_tile(name: str, z: int, x: int, y: int) -> bytes:
+    """
+    MVT bytes for tile z/x/y of layer `name` (empty below the layer's min_zoom).
+
+    Raises KeyError for an unknown layer.
+    """
+    layer = TILE_LAYERS[name]
+    if z < layer.min_zoom:
+        return b""
+
+    cache_key = f"mvt:{name}:{layer_version(layer.sources)}:{z}/{x}/{y}"
+    tile = cache.get(cache_key)
+    if tile is not None:
+        return tile
+
+    start = time.time()
+    thin = z < layer.full_zoom
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "margin": TILE_BUFFER / TILE_EXTENT,
+        "name": name,
+        "extent": TILE_EXTENT,
+        "buffer": TILE_BUFFER,
+        "cell": WEB_MERCATOR_WIDTH_M / 2 ** z / THIN_GRID,
+    }
+    params.update({f"kind_{i}": s.kind for i, s in enumerate(layer.sources)})
+    with connection.cursor() as cursor:
+        cursor.execute(_tile_sql(name, layer, thin), params)
+        row = cursor.fetchone()
+    tile = bytes(row[0]) if row and row[0] is not None else b""
+
+    cache.set(cache_key, tile, settings.TILE_CACHE_TIMEOUT)
+    logger.debug(
+        f"[MVT] {name} {z}/{x}/{y}: {len(tile)} bytes{' (thinned)' if thin else ''} | "
+        f"Time: {time.time() - start:.4f}s"
+    )
+    return tile
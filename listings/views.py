@@ -5,21 +5,28 @@ import logging
 import re
 import time
 from urllib.parse import parse_qs, urlparse
-from django.http import JsonResponse, HttpRequest, HttpResponse
+from django.http import Http404, JsonResponse, HttpRequest, HttpResponse
 from django.shortcuts import render
-from django.contrib.gis.db.models.functions import Distance, Transform
 from django.contrib.gis.geos import Point
 from django.db import connection, reset_queries
+from django.db.models import Prefetch
 from django.conf import settings
 from django.views.decorators.http import require_http_methods
 from django.template.loader import render_to_string
 from django.utils.text import slugify
 
-from .models import Listing, DisplayConfig, NearbyAmenityConfig
+from . import gazetteer, proximity
+from .clusters import ClusterRequestError, clusters_for_bbox
+from .geoapi import PageRequestError, parse_bbox, parse_page_request
+from .geocoding import GeocoderUnavailable, geocode
+from .geojson import streaming_feature_collection
+from .knn import nearest_k_for_listings
+from .models import ExternalListing, Listing, ListingImage, DisplayConfig, NearbyAmenityConfig
+from .queries import LISTING_IMAGE_LIMIT, ListingPageStream, NearestStation, nearby_amenities_for_point
 from .services import ClosestStoresService
-from transit_layer.models import BusStop, MetroStation, MetrobusStation, TaxiStand
-from stores_layer.models import Clothing, Grocery, Mall, Park
-from education_layer.models import School
+from .tiles import TILE_LAYERS, render_tile, valid_tile
+from transit_layer.models import MetroStation
+from stores_layer.models import Clothing, Grocery
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -35,35 +42,34 @@ NUM_CLOSEST_CLOTHING_STORES = 3  # Number of closest clothing stores
 # ============================================================================
 
 
-def _listing_feature(listing: Listing) -> Dict[str, Any]:
+def _listing_feature(
+    listing: Listing,
+    nearest: NearestStation | None,
+    closest_stores: Tuple[List[int], List[int]] | None = None,
+) -> Dict[str, Any]:
     """
     Convert a Listing to GeoJSON feature with stores and transit data.
     Uses pre-computed cached closest stores for performance.
+    The nearest station, closest stores and carousel images are resolved per
+    chunk of listings by `load_listing_page`, so building a feature issues no queries.
     """
     feature_start = time.time()
     queries_before = len(connection.queries) if settings.DEBUG else 0
     
     try:
-        # Find the nearest metro station with Distance annotation (meters due to geography=True)
-        metro_start = time.time()
-        nearest = (
-            MetroStation.objects.annotate(distance=Distance("location", listing.location))
-            .order_by("distance")
-            .first()
-        )
-        metro_time = time.time() - metro_start
-
         closest_name = nearest.name if nearest else None
-        distance_m = float(nearest.distance.m) if nearest and nearest.distance is not None else None
+        distance_m = nearest.distance_m if nearest else None
 
         logger.debug(
             f"[METRO] Listing {listing.id} ({listing.title}): "
-            f"Found nearest station '{closest_name}' at {distance_m}m | Time: {metro_time:.4f}s"
+            f"Nearest station '{closest_name}' at {distance_m}m"
         )
 
         # Get pre-computed closest stores from cache
         cache_start = time.time()
-        closest_grocery_ids, closest_clothing_ids = ClosestStoresService.get_cached_stores(listing)
+        if closest_stores is None:
+            closest_stores = ClosestStoresService.get_cached_stores(listing)
+        closest_grocery_ids, closest_clothing_ids = closest_stores
         cache_time = time.time() - cache_start
         
         logger.debug(
@@ -74,12 +80,10 @@ def _listing_feature(listing: Listing) -> Dict[str, Any]:
 
         geom = listing.location
         
-        # Get up to 3 images for the carousel
-        images_start = time.time()
-        listing_images = list(
-            listing.images.order_by('order')[:3]
-        )
-        images_time = time.time() - images_start
+        # Carousel images are prefetched (see load_listing_page)
+        listing_images = getattr(listing, "carousel_images", None)
+        if listing_images is None:
+            listing_images = list(listing.images.order_by('order')[:LISTING_IMAGE_LIMIT])
         
         # Build images array - include primary image and then listing images
         images = []
@@ -88,11 +92,10 @@ def _listing_feature(listing: Listing) -> Dict[str, Any]:
         for img in listing_images:
             images.append(img.image.url)
         # Deduplicate and limit to 3
-        images = list(dict.fromkeys(images))[:3]
+        images = list(dict.fromkeys(images))[:LISTING_IMAGE_LIMIT]
         
         logger.debug(
-            f"[IMAGES] Listing {listing.id}: "
-            f"Retrieved {len(images)} images | Time: {images_time:.4f}s"
+            f"[IMAGES] Listing {listing.id}: Retrieved {len(images)} images"
         )
         
         feature = {
@@ -121,7 +124,7 @@ def _listing_feature(listing: Listing) -> Dict[str, Any]:
             f"[FEATURE_COMPLETE] Listing {listing.id}: "
             f"Total time: {feature_time:.4f}s | "
             f"Queries: {queries_after - queries_before} | "
-            f"Breakdown - Metro: {metro_time:.4f}s, Cache: {cache_time:.4f}s"
+            f"Breakdown - Cache: {cache_time:.4f}s"
         )
         
         return feature
@@ -135,9 +138,85 @@ def map_view(request: HttpRequest) -> HttpResponse:
     return render(request, "listings/map_view_mob.html")
 
 
-def listings_geojson(request: HttpRequest) -> JsonResponse:
+@require_http_methods(["GET"])
+def vector_tile(request: HttpRequest, layer: str, z: int, x: int, y: int) -> HttpResponse:
+    """Mapbox vector tile for a point layer (see listings.tiles.TILE_LAYERS)."""
+    if layer not in TILE_LAYERS or not valid_tile(z, x, y):
+        raise Http404("Unknown tile")
+    response = HttpResponse(render_tile(layer, z, x, y), content_type="application/vnd.mapbox-vector-tile")
+    response["Cache-Control"] = f"public, max-age={settings.TILE_VERSION_TTL_S}"
+    return response
+
+
+@require_http_methods(["GET"])
+def place_autocomplete(request: HttpRequest) -> JsonResponse:
+    """
+    Place name suggestions from the offline gazetteer.
+
+    GET /api/places/autocomplete?q=<text>&limit=<n>
+    """
+    limit = min(_coerce_positive_int(request.GET.get("limit"), 10), 50)
+    entries = gazetteer.search(request.GET.get("q", ""), limit=limit)
+    return JsonResponse({"results": [gazetteer.serialize(e) for e in entries]})
+
+
+@require_http_methods(["GET"])
+def external_listing_nearby(request: HttpRequest, source: str, external_id: str) -> JsonResponse:
+    """
+    Materialised nearby POIs of an external listing (see listings.proximity).
+
+    GET /api/external-listings/<source>/<external_id>/nearby
+    Rows are served as materialised; rebuilding them after a config or POI
+    change is left to the enrichment commands. A listing that has never been
+    materialised, or has moved since (empty `proximity_version`), is built here.
+    """
+    ext = ExternalListing.objects.filter(source=source, external_id=external_id).first()
+    if ext is None:
+        raise Http404("Unknown listing")
+    if not ext.proximity_version:
+        proximity.materialize([ext])
+    return JsonResponse(
+        {
+            "listing": {"id": ext.external_id, "title": ext.title, "lat": ext.lat, "lng": ext.lng},
+            "layers": proximity.layers_for(ext),
+            "nearest_distances_m": ext.nearest_distances_m,
+        }
+    )
+
+
+@require_http_methods(["GET"])
+def clusters(request: HttpRequest) -> JsonResponse:
+    """
+    Pre-aggregated point clusters for zoomed-out views.
+
+    GET /api/clusters?layer=<listings|stores|transit|metro|bus_stops>&bbox=minLon,minLat,maxLon,maxLat&zoom=<z>
+    Returns a FeatureCollection of Points with `count` (plus `id`/`kind` for single points).
+    """
+    try:
+        bbox = parse_bbox(request.GET.get("bbox", ""))
+        zoom = int(request.GET.get("zoom", ""))
+        layer_clusters = clusters_for_bbox(request.GET.get("layer", "listings"), bbox.extent, zoom)
+    except (PageRequestError, ClusterRequestError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except ValueError:
+        return JsonResponse({"error": "zoom must be an integer"}, status=400)
+
+    features = []
+    for cluster in layer_clusters:
+        properties = {k: v for k, v in cluster.items() if k not in ("lng", "lat")}
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [cluster["lng"], cluster["lat"]]},
+                "properties": properties,
+            }
+        )
+    return JsonResponse({"type": "FeatureCollection", "features": features})
+
+
+def listings_geojson(request: HttpRequest) -> HttpResponse:
     """
-    Main endpoint that returns GeoJSON features for all listings.
+    Main endpoint that streams GeoJSON features for all listings.
     Includes comprehensive performance monitoring and debug logging.
     """
     request_start = time.time()
@@ -161,72 +240,59 @@ def listings_geojson(request: HttpRequest) -> JsonResponse:
             f"Max Listings: {config.max_listings}"
         )
         
-        # Query listings
-        query_start = time.time()
+        # Listings are read in keyset chunks, each with its nearest station,
+        # cache and images in a constant number of statements (see listings.queries)
         total_listings = Listing.objects.count()
-        listings = Listing.objects.all()[: config.max_listings]
-        listings_list = list(listings)  # Force evaluation
-        query_time = time.time() - query_start
-        actual_count = len(listings_list)
-        
-        logger.info(
-            f"[DB_QUERY] Retrieved {actual_count}/{total_listings} listings | "
-            f"Query time: {query_time:.4f}s"
-        )
-        
-        if settings.DEBUG:
-            queries_after_listings = len(connection.queries)
-            logger.debug(f"[DB_STATS] Queries so far: {queries_after_listings}")
-        
-        # Process features
-        features_start = time.time()
-        features: List[Dict[str, Any]] = []
-        
-        for idx, listing in enumerate(listings_list, 1):
-            try:
-                feature = _listing_feature(listing)
-                features.append(feature)
+        try:
+            page = ListingPageStream(parse_page_request(request, default_limit=config.max_listings))
+        except PageRequestError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        logger.info(f"[DB_QUERY] Streaming up to {page.page.limit}/{total_listings} listings")
+        
+        # Features are built and streamed one listing at a time
+        def features():
+            features_start = time.time()
+            produced = 0
+            idx = 0
+            for idx, (listing, nearest, closest_stores) in enumerate(page, 1):
+                try:
+                    feature = _listing_feature(listing, nearest, closest_stores)
+                except Exception as e:
+                    logger.error(f"[FEATURE_FAILED] Listing {listing.id} failed: {str(e)}")
+                    # Continue processing other listings
+                    continue
+                produced += 1
+                yield feature
                 
                 # Progress logging every 10 listings
                 if idx % 10 == 0:
-                    logger.info(f"[PROGRESS] Processed {idx}/{actual_count} listings")
-                    
-            except Exception as e:
-                logger.error(f"[FEATURE_FAILED] Listing {listing.id} failed: {str(e)}")
-                # Continue processing other listings
-                continue
-        
-        features_time = time.time() - features_start
-        
-        logger.info(
-            f"[FEATURES_PROCESSED] Processed {len(features)} features | "
-            f"Time: {features_time:.4f}s | "
-            f"Avg per feature: {features_time/len(features):.4f}s" if features else ""
-        )
-        
-        # Build response
-        response_data = {"type": "FeatureCollection", "features": features}
-        
-        # Get query statistics
-        if settings.DEBUG:
-            total_queries = len(connection.queries)
-            logger.debug(f"[DB_STATS] Total queries executed: {total_queries}")
+                    logger.info(f"[PROGRESS] Processed {idx} listings")
             
-            # Calculate total query time
-            total_query_time = sum(float(q.get("time", 0)) for q in connection.queries)
-            logger.debug(f"[DB_STATS] Total query time: {total_query_time:.4f}s")
-        
-        total_time = time.time() - request_start
-        
-        logger.info(
-            f"[API_COMPLETE] ✓ Success | "
-            f"Total time: {total_time:.4f}s | "
-            f"Features returned: {len(features)}/{actual_count} | "
-            f"Response size: ~{len(str(response_data))/1024:.2f}KB"
-        )
-        logger.info("=" * 80)
+            features_time = time.time() - features_start
+            logger.info(
+                f"[FEATURES_PROCESSED] Processed {produced} features | "
+                f"Time: {features_time:.4f}s | "
+                f"Avg per feature: {features_time/produced:.4f}s" if produced else ""
+            )
+            
+            # Get query statistics
+            if settings.DEBUG:
+                total_queries = len(connection.queries)
+                logger.debug(f"[DB_STATS] Total queries executed: {total_queries}")
+                
+                # Calculate total query time
+                total_query_time = sum(float(q.get("time", 0)) for q in connection.queries)
+                logger.debug(f"[DB_STATS] Total query time: {total_query_time:.4f}s")
+            
+            logger.info(
+                f"[API_COMPLETE] ✓ Success | "
+                f"Total time: {time.time() - request_start:.4f}s | "
+                f"Features returned: {produced}/{idx}"
+            )
+            logger.info("=" * 80)
         
-        return JsonResponse(response_data)
+        return streaming_feature_collection(features(), lambda: {"next_cursor": page.next_cursor})
         
     except Exception as e:
         total_time = time.time() - request_start
@@ -263,152 +329,43 @@ def simplified_map_view(request: HttpRequest) -> HttpResponse:
     return render(request, "listings/map_view_simplified.html", context)
 
 
-def _simplified_listing_feature(listing: Listing) -> Dict[str, Any]:
+def _simplified_nearby_item(hit: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": hit["id"],
+        "name": hit["name"],
+        "distance_m": hit["distance_m"],
+        "location": {"type": "Point", "coordinates": [hit["lng"], hit["lat"]]},
+    }
+
+
+# Layers of the simplified view: (feature property, model, neighbours per listing)
+SIMPLIFIED_LAYERS = (
+    ("closest_stations", MetroStation, NUM_CLOSEST_STATIONS),
+    ("closest_grocery_stores", Grocery, NUM_CLOSEST_GROCERY_STORES),
+    ("closest_clothing_stores", Clothing, NUM_CLOSEST_CLOTHING_STORES),
+)
+
+
+def _simplified_listing_feature(listing: Listing, nearby: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
     """
     Convert a Listing to GeoJSON feature with limited closest stations and stores.
-    Used for the simplified view.
+    Used for the simplified view. `nearby` holds the listing's KNN hits per
+    feature property and `listing.carousel_images` its prefetched images
+    (see generate_simplified_geojson).
     """
     try:
-        # Get closest metro stations (limited)
-        stations_start = time.time()
-        closest_stations = (
-            MetroStation.objects.annotate(distance=Distance("location", listing.location))
-            .order_by("distance")
-            .values("id", "name", "distance")[: NUM_CLOSEST_STATIONS]
-        )
-        stations_list = list(closest_stations)
-        stations_time = time.time() - stations_start
-        
-        logger.debug(
-            f"[SIMPLIFIED] Listing {listing.id}: "
-            f"Found {len(stations_list)} closest stations | Time: {stations_time:.4f}s"
-        )
-        
-        # Get closest grocery stores (limited)
-        grocery_start = time.time()
-        closest_groceries = (
-            Grocery.objects.annotate(distance=Distance("location", listing.location))
-            .order_by("distance")
-            .values("id", "name", "distance")[: NUM_CLOSEST_GROCERY_STORES]
-        )
-        groceries_list = list(closest_groceries)
-        grocery_time = time.time() - grocery_start
-        
-        logger.debug(
-            f"[SIMPLIFIED] Listing {listing.id}: "
-            f"Found {len(groceries_list)} closest grocery stores | Time: {grocery_time:.4f}s"
-        )
-        
-        # Get closest clothing stores (limited)
-        clothing_start = time.time()
-        closest_clothing = (
-            Clothing.objects.annotate(distance=Distance("location", listing.location))
-            .order_by("distance")
-            .values("id", "name", "distance")[: NUM_CLOSEST_CLOTHING_STORES]
-        )
-        clothing_list = list(closest_clothing)
-        clothing_time = time.time() - clothing_start
-        
-        logger.debug(
-            f"[SIMPLIFIED] Listing {listing.id}: "
-            f"Found {len(clothing_list)} closest clothing stores | Time: {clothing_time:.4f}s"
-        )
-        
-        # Convert distances from meters to the format needed
-        stations_data = [
-            {
-                "id": s["id"],
-                "name": s["name"],
-                "distance_m": float(s["distance"].m) if s["distance"] else None,
-                "location": {
-                    "type": "Point",
-                    "coordinates": [0, 0]  # Placeholder, will be fetched properly
-                }
-            }
-            for s in stations_list
-        ]
-        
-        # Fetch actual coordinates for stations
-        for idx, station_data in enumerate(stations_data):
-            try:
-                station = MetroStation.objects.get(id=station_data["id"])
-                station_data["location"] = {
-                    "type": "Point",
-                    "coordinates": [station.location.x, station.location.y]
-                }
-            except MetroStation.DoesNotExist:
-                pass
-        
-        groceries_data = [
-            {
-                "id": g["id"],
-                "name": g["name"],
-                "distance_m": float(g["distance"].m) if g["distance"] else None,
-                "location": {
-                    "type": "Point",
-                    "coordinates": [0, 0]  # Placeholder, will be fetched properly
-                }
-            }
-            for g in groceries_list
-        ]
-        
-        # Fetch actual coordinates for grocery stores
-        for idx, grocery_data in enumerate(groceries_data):
-            try:
-                grocery = Grocery.objects.get(id=grocery_data["id"])
-                grocery_data["location"] = {
-                    "type": "Point",
-                    "coordinates": [grocery.location.x, grocery.location.y]
-                }
-            except Grocery.DoesNotExist:
-                pass
-        
-        clothing_data = [
-            {
-                "id": c["id"],
-                "name": c["name"],
-                "distance_m": float(c["distance"].m) if c["distance"] else None,
-                "location": {
-                    "type": "Point",
-                    "coordinates": [0, 0]  # Placeholder, will be fetched properly
-                }
-            }
-            for c in clothing_list
-        ]
-        
-        # Fetch actual coordinates for clothing stores
-        for idx, clothing_item in enumerate(clothing_data):
-            try:
-                clothing = Clothing.objects.get(id=clothing_item["id"])
-                clothing_item["location"] = {
-                    "type": "Point",
-                    "coordinates": [clothing.location.x, clothing.location.y]
-                }
-            except Clothing.DoesNotExist:
-                pass
-        
         geom = listing.location
         
-        # Get up to 3 images for the carousel
-        images_start = time.time()
-        listing_images = list(
-            listing.images.order_by('order')[:3]
-        )
-        images_time = time.time() - images_start
-        
         # Build images array - include primary image and then listing images
         images = []
         if listing.image:
             images.append(listing.image.url)
-        for img in listing_images:
+        for img in listing.carousel_images:
             images.append(img.image.url)
         # Deduplicate and limit to 3
-        images = list(dict.fromkeys(images))[:3]
+        images = list(dict.fromkeys(images))[:LISTING_IMAGE_LIMIT]
         
-        logger.debug(
-            f"[SIMPLIFIED_IMAGES] Listing {listing.id}: "
-            f"Retrieved {len(images)} images | Time: {images_time:.4f}s"
-        )
+        logger.debug(f"[SIMPLIFIED_IMAGES] Listing {listing.id}: {len(images)} images")
         
         feature = {
             "type": "Feature",
@@ -423,9 +380,10 @@ def _simplified_listing_feature(listing: Listing) -> Dict[str, Any]:
                 "size_sqm": listing.size_sqm,
                 "image_url": listing.image.url if listing.image else None,
                 "images": images,
-                "closest_stations": stations_data,
-                "closest_grocery_stores": groceries_data,
-                "closest_clothing_stores": clothing_data,
+                **{
+                    key: [_simplified_nearby_item(hit) for hit in nearby.get(key, [])]
+                    for key, _, _ in SIMPLIFIED_LAYERS
+                },
             },
         }
         
@@ -453,10 +411,18 @@ def generate_simplified_geojson() -> Dict[str, Any]:
         f"Clothing: {NUM_CLOSEST_CLOTHING_STORES}"
     )
 
-    # Query limited listings
+    # Query limited listings with their carousel images (sliced prefetch) and
+    # the nearest items of every layer for all of them at once (one KNN
+    # statement per layer), so the query count does not depend on NUM_LISTINGS
     query_start = time.time()
-    listings = Listing.objects.all()[: NUM_LISTINGS]
-    listings_list = list(listings)  # Force evaluation
+    images_qs = ListingImage.objects.order_by("order")[:LISTING_IMAGE_LIMIT]
+    listings = Listing.objects.prefetch_related(Prefetch("images", queryset=images_qs, to_attr="carousel_images"))
+    listings_list = list(listings[: NUM_LISTINGS])  # Force evaluation
+    ids = [listing.id for listing in listings_list]
+    nearby: Dict[int, Dict[str, List[Dict[str, Any]]]] = {listing_id: {} for listing_id in ids}
+    for key, model, k in SIMPLIFIED_LAYERS:
+        for listing_id, hits in nearest_k_for_listings(model, ids, k, columns=("name",)).items():
+            nearby[listing_id][key] = hits
     query_time = time.time() - query_start
     actual_count = len(listings_list)
 
@@ -471,7 +437,7 @@ def generate_simplified_geojson() -> Dict[str, Any]:
 
     for idx, listing in enumerate(listings_list, 1):
         try:
-            feature = _simplified_listing_feature(listing)
+            feature = _simplified_listing_feature(listing, nearby[listing.id])
             features.append(feature)
             logger.info(f"[SIMPLIFIED_PROGRESS] Processed listing {idx}/{actual_count}")
 
@@ -552,7 +518,10 @@ def _extract_point_from_input(raw_input: str) -> Tuple[Point, str]:
     Try to obtain a Point from various user inputs:
     - Google Maps link containing coordinates
     - Plain "lat, lon" coordinates
-    - Free text address (geocoded via geopy)
+    - Name of a known place (offline gazetteer, see listings.gazetteer)
+    - Free text address (geocoded, see listings.geocoding)
+
+    Raises GeocoderUnavailable when the geocoder cannot be asked right now.
     """
     cleaned = raw_input.strip()
 
@@ -568,54 +537,20 @@ def _extract_point_from_input(raw_input: str) -> Tuple[Point, str]:
         lat, lon = match.groups()
         return Point(float(lon), float(lat), srid=4326), "coordinates"
 
-    # Fallback to geocoding
-    try:
-        from geopy.geocoders import Nominatim  # type: ignore
-    except ImportError as exc:  # pragma: no cover - defensive
-        raise ImportError("geopy is required for geocoding. Install via `pip install geopy`.") from exc
+    # Known place names (stations, malls, schools, districts) resolve locally
+    place = gazetteer.resolve(cleaned)
+    if place is not None:
+        return Point(place.location.x, place.location.y, srid=4326), "gazetteer"
 
-    geolocator = Nominatim(user_agent="proptech-geocoder")
-    location = geolocator.geocode(cleaned, timeout=10)
-    if not location:
+    # Fallback to geocoding (cached, rate limited, see listings.geocoding)
+    result = geocode(
+        cleaned,
+        timeout=settings.GEOCODE_REQUEST_TIMEOUT_S,
+        max_wait_s=settings.GEOCODE_REQUEST_MAX_WAIT_S,
+    )
+    if result is None:
         raise ValueError("Unable to geocode location input.")
-    return Point(float(location.longitude), float(location.latitude), srid=4326), "geocoded"
-
-
-def _serialize_nearby_queryset(model, point: Point, radius_m: float, max_results: int):
-    """
-    Annotate a queryset with distances and return serialized results.
-    Handles both geography=True and geometry fields by transforming to WebMercator when needed.
-    """
-    field = model._meta.get_field("location")
-    qs = model.objects.all()
-
-    if getattr(field, "geography", False):
-        qs = qs.annotate(distance=Distance("location", point))
-    else:
-        point_3857 = point.clone()
-        point_3857.transform(3857)
-        qs = qs.annotate(distance=Distance(Transform("location", 3857), point_3857))
-
-    qs = qs.filter(distance__lte=radius_m).order_by("distance")[: max_results]
-
-    serialized = []
-    for obj in qs:
-        distance_val = obj.distance
-        try:
-            distance_m = float(distance_val.m)  # type: ignore[attr-defined]
-        except Exception:
-            distance_m = float(distance_val)
-
-        serialized.append(
-            {
-                "id": obj.id,
-                "name": getattr(obj, "name", ""),
-                "distance_m": distance_m,
-                "lat": obj.location.y,
-                "lng": obj.location.x,
-            }
-        )
-    return serialized
+    return result.point, "geocoded"
 
 
 def _build_map_context(query: str, center_lat: float, center_lng: float, radius_m: int, amenities_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -677,6 +612,8 @@ def nearby_amenities(request: HttpRequest) -> JsonResponse:
 
     try:
         point, source = _extract_point_from_input(raw_input)
+    except GeocoderUnavailable as exc:
+        return JsonResponse({"error": str(exc)}, status=503)
     except ImportError as exc:
         return JsonResponse({"error": str(exc)}, status=500)
     except ValueError as exc:
@@ -691,29 +628,8 @@ def nearby_amenities(request: HttpRequest) -> JsonResponse:
     )
 
     # Fetch raw data (single query for both LLM summary and map)
-    raw_results: Dict[str, Any] = {}
-    if config.enable_metro:
-        raw_results["metro"] = _serialize_nearby_queryset(MetroStation, point, radius_m, max_results)
-    if config.enable_metrobus:
-        raw_results["metrobus"] = _serialize_nearby_queryset(MetrobusStation, point, radius_m, max_results)
-    if config.enable_bus:
-        raw_results["bus"] = _serialize_nearby_queryset(BusStop, point, radius_m, max_results)
-    if config.enable_taxi:
-        raw_results["taxi"] = _serialize_nearby_queryset(TaxiStand, point, radius_m, max_results)
-    if config.enable_minibus:
-        from tools.nearby_enrichment.minibus import nearby_minibus_segments
-        minibus_data = nearby_minibus_segments(lon=point.x, lat=point.y, radius_m=radius_m, limit=max_results)
-        raw_results["minibus"] = [{"id": item["id"], "name": item["name"], "geometry": item["geometry"]} for item in minibus_data]
-    if config.enable_grocery:
-        raw_results["grocery"] = _serialize_nearby_queryset(Grocery, point, radius_m, max_results)
-    if config.enable_clothing:
-        raw_results["clothing"] = _serialize_nearby_queryset(Clothing, point, radius_m, max_results)
-    if config.enable_malls:
-        raw_results["malls"] = _serialize_nearby_queryset(Mall, point, radius_m, max_results)
-    if config.enable_parks:
-        raw_results["parks"] = _serialize_nearby_queryset(Park, point, radius_m, max_results)
-    if config.enable_schools:
-        raw_results["schools"] = _serialize_nearby_queryset(School, point, radius_m, max_results)
+    nearby = nearby_amenities_for_point(config, point.x, point.y, radius_m, max_results)
+    raw_results: Dict[str, Any] = nearby.results
 
     map_context = _build_map_context(
         query=raw_input,
@@ -824,6 +740,7 @@ def nearby_amenities(request: HttpRequest) -> JsonResponse:
         "radius_m": radius_m,
         "summary": llm_summary,
         "map_static_url": map_file_url,
+        "timings_ms": nearby.timings_ms,
     }
 
     return JsonResponse(response_data)
@@ -862,6 +779,8 @@ def nearby_amenities_map(request: HttpRequest) -> HttpResponse:
 
     try:
         point, source = _extract_point_from_input(raw_input)
+    except GeocoderUnavailable as exc:
+        return HttpResponse(f"Error: {str(exc)}", status=503)
     except ImportError as exc:
         return HttpResponse(f"Error: {str(exc)}", status=500)
     except ValueError as exc:
@@ -876,29 +795,7 @@ def nearby_amenities_map(request: HttpRequest) -> HttpResponse:
     )
 
     # Collect all amenities
-    amenities_data = {}
-    if config.enable_metro:
-        amenities_data["metro"] = _serialize_nearby_queryset(MetroStation, point, radius_m, max_results)
-    if config.enable_metrobus:
-        amenities_data["metrobus"] = _serialize_nearby_queryset(MetrobusStation, point, radius_m, max_results)
-    if config.enable_bus:
-        amenities_data["bus"] = _serialize_nearby_queryset(BusStop, point, radius_m, max_results)
-    if config.enable_taxi:
-        amenities_data["taxi"] = _serialize_nearby_queryset(TaxiStand, point, radius_m, max_results)
-    if config.enable_minibus:
-        from tools.nearby_enrichment.minibus import nearby_minibus_segments
-        minibus_data = nearby_minibus_segments(lon=point.x, lat=point.y, radius_m=radius_m, limit=max_results)
-        amenities_data["minibus"] = [{"id": item["id"], "name": item["name"], "geometry": item["geometry"]} for item in minibus_data]
-    if config.enable_grocery:
-        amenities_data["grocery"] = _serialize_nearby_queryset(Grocery, point, radius_m, max_results)
-    if config.enable_clothing:
-        amenities_data["clothing"] = _serialize_nearby_queryset(Clothing, point, radius_m, max_results)
-    if config.enable_malls:
-        amenities_data["malls"] = _serialize_nearby_queryset(Mall, point, radius_m, max_results)
-    if config.enable_parks:
-        amenities_data["parks"] = _serialize_nearby_queryset(Park, point, radius_m, max_results)
-    if config.enable_schools:
-        amenities_data["schools"] = _serialize_nearby_queryset(School, point, radius_m, max_results)
+    amenities_data = nearby_amenities_for_point(config, point.x, point.y, radius_m, max_results).results
 
     context = _build_map_context(
         query=raw_input,
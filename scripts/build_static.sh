@@ -3,7 +3,7 @@ set -euo pipefail
 
 # Static build helper for IstanbulPropTech using django-distill
 # - Prompts for base path, media base, inline-data option, collectstatic, and output dir
-# - Exports static site with django-distill
+# - Exports static site incrementally with export_static (only changed pages are re-rendered)
 # - Optionally rewrites absolute URLs in generated HTML for subpath hosting
 
 ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")"/.. && pwd)"
@@ -50,7 +50,7 @@ INLINE_FLAG=0
 if [[ "$INLINE_ANS" =~ ^[Yy]$ ]]; then INLINE_FLAG=1; fi
 
 COLLECT_FLAG=""
-if [[ "$COLLECT_ANS" =~ ^[Yy]$ ]]; then COLLECT_FLAG="--collectstatic"; fi
+if [[ "$COLLECT_ANS" =~ ^[Yy]$ ]]; then COLLECT_FLAG="yes"; fi
 
 echo
 echo "--- Build configuration ---"
@@ -58,16 +58,17 @@ echo "Output dir:        $OUT_DIR"
 echo "Base path:         $BASE_PATH"
 echo "Media base:        $MEDIA_BASE/"
 echo "Inline simplified: $INLINE_FLAG"
-echo "Collect static:    ${COLLECT_FLAG:+yes}${COLLECT_FLAG:-(no)}"
+echo "Collect static:    ${COLLECT_FLAG:-(no)}"
 echo "---------------------------"
 
 mkdir -p "$OUT_DIR"
 
 export SIMPLIFIED_INLINE_DATA="$INLINE_FLAG"
 
-echo "[1/2] Exporting static site with django-distill..."
+echo "[1/2] Exporting static site..."
 set -x
-python manage.py distill-local $COLLECT_FLAG --force "$OUT_DIR"
+if [[ -n "$COLLECT_FLAG" ]]; then python manage.py collectstatic --noinput; fi
+python manage.py export_static --out-dir "$OUT_DIR"
 set +x
 
 echo "[2/2] Post-processing exported HTML for base/media paths..."
@@ -109,5 +110,5 @@ echo "Notes:"
 echo "- If hosting under a subpath, ensure your static host maps $BASE_PATH to $OUT_DIR."
 echo "- The simplified page can be data-inline if chosen; mobile map still fetches /api/*."
 echo "- Ensure media files are available at ${MEDIA_BASE}/ (upload your MEDIA_ROOT there)."
-echo "- Re-run with different answers anytime; previous output is overwritten."
+echo "- Re-run with different answers anytime; only pages whose data, code or settings changed are re-rendered."
 
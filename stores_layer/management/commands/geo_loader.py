@@ -18,6 +18,7 @@ except ImportError:
 
 # Assuming models are in stores_layer/models.py
 from stores_layer.models import Grocery, Clothing
+from listings.services import deferred_cache_invalidation
 
 class Command(BaseCommand):
     help = 'Fetches store data using Overpass API and either loads it or dumps it for review.'
@@ -117,7 +118,8 @@ class Command(BaseCommand):
         # LOAD: Process and save data to DB (Only runs if dump_file is NOT set)
         creations_count = 0
         try:
-            with transaction.atomic():
+            # Affected listing caches are recomputed once, after the commit
+            with deferred_cache_invalidation(), transaction.atomic():
                 for node in result.nodes:
                     store_name = node.tags.get('name', node.tags.get('brand', f"{TargetModel.__name__} (OSM ID: {node.id})"))
                     
@@ -18,6 +18,7 @@ except ImportError:
     overpy = MockOverpass
 
 from stores_layer.models import Grocery, Clothing
+from listings.services import deferred_cache_invalidation
 
 class Command(BaseCommand):
     help = 'Loads store data using criteria defined in a JSON configuration file via Overpass API.'
@@ -114,7 +115,8 @@ class Command(BaseCommand):
         creations_count = 0
         
         try:
-            with transaction.atomic():
+            # Affected listing caches are recomputed once, after the commit
+            with deferred_cache_invalidation(), transaction.atomic():
                 for node in result.nodes:
                     # Use a descriptive name, prioritizing 'name' tag
                     store_name = node.tags.get('name', node.tags.get('brand', f"{TargetModel.__name__} (OSM ID: {node.id})"))
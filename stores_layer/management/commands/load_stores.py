@@ -9,6 +9,7 @@ from django.db import transaction
 
 # Import the models
 from stores_layer.models import Clothing, Grocery
+from listings.services import deferred_cache_invalidation
 
 
 class Command(BaseCommand):
@@ -29,6 +30,13 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        # Store signals only record changes here; affected listing caches are
+        # recomputed once per store type when the import finishes (every cache
+        # after a --truncate, which replaces all stores).
+        with deferred_cache_invalidation(full_recompute=options['truncate']):
+            self._import(options)
+
+    def _import(self, options):
         self.stdout.write(self.style.NOTICE("Starting store data import..."))
 
         if options['truncate']:
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:20
+
+import django.contrib.gis.db.models.fields
+import django.contrib.gis.db.models.functions
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores_layer', '0002_mall_park'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grocery',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='clothing',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='mall',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='park',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddIndex(
+            model_name='grocery',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='grocery_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='clothing',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='clothing_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='mall',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='mall_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='park',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='park_location_tm_gist'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.gis.db import models as gis_models
 from django.db import models
 
+from listings.fields import metric_field, metric_index
+
 # 1. Define the Abstract Base Class
 # The Meta class abstract = True tells Django not to create a database
 # table for this model, but to use its fields for inheritance.
@@ -22,6 +24,8 @@ class Store(models.Model):
         geography=True,
         verbose_name="Geographic Location (Point)"
     )
+    # Same point in TM30 meters for planar distance/buffer queries
+    location_tm = metric_field()
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -44,6 +48,7 @@ class Grocery(Store):
     class Meta:
         verbose_name = "Grocery Store"
         verbose_name_plural = "Grocery Stores"
+        indexes = [metric_index("grocery_location_tm_gist")]
         # Since it inherits Meta ordering, it will also be ordered by name.
 
 # 3. Concrete Model: Clothing Stores
@@ -56,6 +61,7 @@ class Clothing(Store):
     class Meta:
         verbose_name = "Clothing Store"
         verbose_name_plural = "Clothing Stores"
+        indexes = [metric_index("clothing_location_tm_gist")]
 
 
 # 4. Concrete Model: Malls
@@ -63,6 +69,7 @@ class Mall(Store):
     class Meta:
         verbose_name = "Mall"
         verbose_name_plural = "Malls"
+        indexes = [metric_index("mall_location_tm_gist")]
 
 
 # 5. Concrete Model: Parks
@@ -70,3 +77,4 @@ class Park(Store):
     class Meta:
         verbose_name = "Park"
         verbose_name_plural = "Parks"
+        indexes = [metric_index("park_location_tm_gist")]
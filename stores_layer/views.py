@@ -1,43 +1,21 @@
-from typing import Any, Dict, List
-from django.http import JsonResponse, HttpRequest
+from django.db.models import F
+from django.http import HttpRequest, HttpResponse
+from listings.geojson import point_feature_rows, stream_point_layer, text
 from .models import Clothing, Grocery
 
+# Sources of the combined stores layer, in paging order
+STORE_SOURCES = ((Clothing, "clothing"), (Grocery, "grocery"))
 
-def stores_geojson(request: HttpRequest) -> JsonResponse:
+
+def stores_geojson(request: HttpRequest) -> HttpResponse:
     """
-    Returns all stores (Clothing and Grocery) as a GeoJSON FeatureCollection.
-    Each feature includes store name and type.
+    Streams stores (Clothing and Grocery) as a GeoJSON FeatureCollection.
+    Each feature includes store name and type; features are built by PostGIS.
+
+    Supports bbox / limit / cursor (see listings.geoapi); without them every store is returned.
     """
-    features: List[Dict[str, Any]] = []
-    
-    # Clothing stores
-    for store in Clothing.objects.all():
-        geom = store.location
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [geom.x, geom.y]},
-                "properties": {
-                    "id": store.id,
-                    "name": store.name,
-                    "store_type": "clothing",
-                },
-            }
-        )
-    
-    # Grocery stores
-    for store in Grocery.objects.all():
-        geom = store.location
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [geom.x, geom.y]},
-                "properties": {
-                    "id": store.id,
-                    "name": store.name,
-                    "store_type": "grocery",
-                },
-            }
-        )
-    
-    return JsonResponse({"type": "FeatureCollection", "features": features})
+    sources = [
+        point_feature_rows(model.objects.all(), name=F("name"), store_type=text(store_type))
+        for model, store_type in STORE_SOURCES
+    ]
+    return stream_point_layer(request, sources)
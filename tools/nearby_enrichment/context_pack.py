@@ -0,0 +1,134 @@
+"""Packed storage for per-listing context JSON.
+
+A pack is two append-only JSON Lines files in one directory:
+
+    contexts.jsonl       one compact JSON context per line
+    contexts.idx.jsonl   one ``[listing_id, offset, length]`` line per record
+
+Writers append a record and its index entry under an exclusive ``flock``, so
+several processes (``--workers``) and shards can write the same pack; memory
+stays constant however many listings are written. A rewritten listing is
+appended again and the last index entry wins, so a pack only grows until
+``compact`` drops the superseded records.
+
+Readers load the index once (a few dozen bytes per listing) and then fetch
+one listing's context with a single seek + read, without parsing the rest of
+the pack. The offsets are byte ranges, so the pack can also be served
+statically and read with HTTP ``Range`` requests.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+DATA_NAME = "contexts.jsonl"
+INDEX_NAME = "contexts.idx.jsonl"
+
+
+class ContextPack:
+    """One pack directory: append, look up and compact listing contexts."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.data_path = self.directory / DATA_NAME
+        self.index_path = self.directory / INDEX_NAME
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @contextmanager
+    def writer(self) -> Iterator["ContextPackWriter"]:
+        """Append records; the lock is held for the duration of the block."""
+        with self._locked(), open(self.data_path, "ab") as data, open(self.index_path, "ab") as index:
+            try:
+                yield ContextPackWriter(data, index)
+            finally:
+                # Records reach the file before the index entries that point at them
+                data.flush()
+        self._index = None
+
+    def index(self) -> Dict[str, Tuple[int, int]]:
+        """listing id -> (offset, length) of its latest record."""
+        if self._index is None:
+            index: Dict[str, Tuple[int, int]] = {}
+            try:
+                with open(self.index_path, "rb") as f:
+                    for line in f:
+                        listing_id, offset, length = json.loads(line)
+                        index[listing_id] = (offset, length)
+            except FileNotFoundError:
+                pass
+            self._index = index
+        return self._index
+
+    def get(self, listing_id: Any) -> Optional[Dict[str, Any]]:
+        """Context of one listing, read with one seek; None if it is not in the pack."""
+        entry = self.index().get(str(listing_id))
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.data_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(listing id, context) for every listing, in pack order, one record in memory at a time."""
+        entries = sorted(self.index().items(), key=lambda item: item[1][0])
+        with open(self.data_path, "rb") as f:
+            for listing_id, (offset, length) in entries:
+                f.seek(offset)
+                yield listing_id, json.loads(f.read(length))
+
+    def __len__(self) -> int:
+        return len(self.index())
+
+    def compact(self) -> int:
+        """
+        Rewrite the pack with only the latest record per listing; returns the bytes reclaimed.
+        Readers holding an index loaded before the compaction must reload it.
+        """
+        with self._locked():
+            self._index = None
+            if not self.data_path.exists():
+                return 0
+            before = self.data_path.stat().st_size
+            data_tmp = self.data_path.with_suffix(".jsonl.tmp")
+            index_tmp = self.index_path.with_suffix(".jsonl.tmp")
+            entries = sorted(self.index().items(), key=lambda item: item[1][0])
+            with open(self.data_path, "rb") as src, open(data_tmp, "wb") as data, open(index_tmp, "wb") as index:
+                writer = ContextPackWriter(data, index)
+                for listing_id, (offset, length) in entries:
+                    src.seek(offset)
+                    writer.append_raw(listing_id, src.read(length))
+            os.replace(data_tmp, self.data_path)
+            os.replace(index_tmp, self.index_path)
+            self._index = None
+            return before - self.data_path.stat().st_size
+
+
+class ContextPackWriter:
+    def __init__(self, data, index):
+        self._data = data
+        self._index = index
+        self._offset = data.seek(0, os.SEEK_END)
+
+    def append(self, listing_id: Any, context: Dict[str, Any]) -> None:
+        self.append_raw(str(listing_id), json.dumps(context, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def append_raw(self, listing_id: str, payload: bytes) -> None:
+        self._data.write(payload + b"\n")
+        self._index.write(json.dumps([listing_id, self._offset, len(payload)]).encode("utf-8") + b"\n")
+        self._offset += len(payload) + 1
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
+from django.db import ProgrammingError, connection, transaction
+
+# How long (seconds) a "layer has rows in PostGIS" answer is trusted
+ROUTE_PRESENCE_TTL_S = 60.0
+_route_presence: Dict[str, tuple] = {}
 
 
 def _serialize(item, dist_field: str = "distance") -> Dict[str, Any]:
@@ -127,3 +134,140 @@ def nearby_taxi_stands(*, lon: float, lat: float, radius_m: int, limit: int = 8)
         .order_by("distance")[:limit]
     )
     return [_serialize(o) for o in qs]
+
+
+# ---------------------------------------------------------------------------
+# Line layers (transit_layer.RouteSegment)
+# ---------------------------------------------------------------------------
+
+def has_route_lines(kind: str) -> bool:
+    """True when `kind` routes have been imported (see `import_route_lines`)."""
+    cached = _route_presence.get(kind)
+    if cached and time.monotonic() - cached[1] < ROUTE_PRESENCE_TTL_S:
+        return cached[0]
+    from transit_layer.models import RouteSegment
+
+    try:
+        # Savepoint: a missing table must not abort the caller's transaction
+        with transaction.atomic():
+            present = RouteSegment.objects.filter(kind=kind).exists()
+    except ProgrammingError:
+        # transit_layer migrations not applied yet
+        present = False
+    _route_presence[kind] = (present, time.monotonic())
+    return present
+
+
+# Search origin projected like RouteSegment.geom_tm (params: lon, lat, srid)
+_REF_TM = "WITH ref AS (SELECT ST_Transform(ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s) AS g)"
+
+
+def _segment_tables() -> tuple:
+    from transit_layer.models import RouteLine, RouteSegment
+
+    quote = connection.ops.quote_name
+    return quote(RouteSegment._meta.db_table), quote(RouteLine._meta.db_table)
+
+
+def nearby_route_lines(*, kind: str, lon: float, lat: float, radius_m: int, limit: int) -> List[Dict[str, Any]]:
+    """
+    Routes of `kind` within `radius_m`, clipped to the search circle, nearest first.
+    One statement: ST_DWithin on the planar (TM30) segment GiST index, then
+    per-route union + clip against a planar buffer.
+    """
+    from listings.fields import METRIC_SRID
+
+    seg_table, route_table = _segment_tables()
+    sql = f"""
+        {_REF_TM}
+        SELECT r.line_id, r.name,
+               ST_AsGeoJSON(ST_Transform(ST_Intersection(ST_Union(s.geom_tm), ST_Buffer(ref.g, %s)), 4326)),
+               MIN(ST_Distance(s.geom_tm, ref.g)) AS distance_m
+        FROM {seg_table} AS s
+        JOIN {route_table} AS r ON r.id = s.route_id
+        CROSS JOIN ref
+        WHERE s.kind = %s AND ST_DWithin(s.geom_tm, ref.g, %s)
+        GROUP BY r.id, r.line_id, r.name, ref.g
+        ORDER BY distance_m
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [lon, lat, METRIC_SRID, radius_m, kind, radius_m, limit or None])
+        rows = cursor.fetchall()
+
+    out: List[Dict[str, Any]] = []
+    for line_id, name, clipped, distance_m in rows:
+        if not clipped:
+            continue
+        out.append(
+            {
+                "id": line_id,
+                "name": name or line_id,
+                "geometry": json.loads(clipped),
+                "distance_m": float(distance_m),
+            }
+        )
+    return out
+
+
+def nearest_route_distance_m(*, kind: str, lon: float, lat: float, max_radius_m: Optional[int] = None) -> Optional[float]:
+    """Distance in meters to the closest `kind` segment (None if none within `max_radius_m`)."""
+    from listings.fields import METRIC_SRID
+
+    seg_table, _ = _segment_tables()
+    if max_radius_m:
+        sql = f"""
+            {_REF_TM}
+            SELECT MIN(ST_Distance(s.geom_tm, ref.g))
+            FROM {seg_table} AS s CROSS JOIN ref
+            WHERE s.kind = %s AND ST_DWithin(s.geom_tm, ref.g, %s)
+        """
+        params = [lon, lat, METRIC_SRID, kind, max_radius_m]
+    else:
+        # Planar KNN: `<->` on geometry is the exact distance, so the first row is the answer
+        sql = f"""
+            {_REF_TM}
+            SELECT s.geom_tm <-> ref.g
+            FROM {seg_table} AS s, ref
+            WHERE s.kind = %s
+            ORDER BY s.geom_tm <-> ref.g
+            LIMIT 1
+        """
+        params = [lon, lat, METRIC_SRID, kind]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return float(row[0]) if row and row[0] is not None else None
+
+
+def nearest_route_distances_m(
+    *, kind: str, points: Sequence[Tuple[float, float]], max_radius_m: Optional[int] = None
+) -> List[Optional[float]]:
+    """Bulk ``nearest_route_distance_m`` for many (lon, lat) points: one planar KNN statement for all of them."""
+    from listings.fields import METRIC_SRID
+
+    if not points:
+        return []
+    seg_table, _ = _segment_tables()
+    sql = f"""
+        WITH p AS (
+            SELECT t.i, ST_Transform(ST_SetSRID(ST_MakePoint(t.lon, t.lat), 4326), %s) AS g
+            FROM unnest(%s::float8[], %s::float8[]) WITH ORDINALITY AS t(lon, lat, i)
+        )
+        SELECT n.d
+        FROM p LEFT JOIN LATERAL (
+            SELECT s.geom_tm <-> p.g AS d
+            FROM {seg_table} AS s
+            WHERE s.kind = %s
+            ORDER BY s.geom_tm <-> p.g
+            LIMIT 1
+        ) AS n ON TRUE
+        ORDER BY p.i
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [METRIC_SRID, [lon for lon, _ in points], [lat for _, lat in points], kind])
+        rows = cursor.fetchall()
+    return [
+        float(d) if d is not None and not (max_radius_m and d > max_radius_m) else None
+        for (d,) in rows
+    ]
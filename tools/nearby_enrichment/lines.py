@@ -0,0 +1,217 @@
+"""Loaded-once, indexed line layers (minibus routes, bicycle roads).
+
+Features are parsed and projected to a metric CRS exactly once. Geometries are
+kept as WKB bytes (far smaller than the GeoJSON dicts they come from) and their
+envelopes are packed into an STR-tree, so a lookup only decodes and tests the
+handful of lines whose bounding boxes touch the search buffer.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import math
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.contrib.gis.gdal import CoordTransform, SpatialReference
+from django.contrib.gis.geos import GEOSGeometry, MultiPoint, Point
+
+from listings.fields import METRIC_SRID
+
+logger = logging.getLogger(__name__)
+
+Envelope = Tuple[float, float, float, float]  # (xmin, ymin, xmax, ymax)
+
+
+@lru_cache(maxsize=None)
+def _coord_transform(src_srid: int, dst_srid: int) -> CoordTransform:
+    # Building a CoordTransform is far more expensive than applying it; reuse them.
+    return CoordTransform(SpatialReference(src_srid), SpatialReference(dst_srid))
+
+
+def _project(geom: GEOSGeometry, srid: int) -> GEOSGeometry:
+    return geom.transform(_coord_transform(geom.srid, srid), clone=True)
+
+
+def _envelope_distance(env: Envelope, x: float, y: float) -> float:
+    dx = max(env[0] - x, 0.0, x - env[2])
+    dy = max(env[1] - y, 0.0, y - env[3])
+    return math.hypot(dx, dy)
+
+
+def _intersects(a: Envelope, b: Envelope) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _union(envs: Iterable[Envelope]) -> Envelope:
+    envs = list(envs)
+    return (
+        min(e[0] for e in envs),
+        min(e[1] for e in envs),
+        max(e[2] for e in envs),
+        max(e[3] for e in envs),
+    )
+
+
+class STRTree:
+    """Static R-tree over envelopes, bulk-loaded with Sort-Tile-Recursive packing.
+
+    Nodes are ``(envelope, children, item)`` tuples; leaves have ``item`` set.
+    """
+
+    def __init__(self, envelopes: Sequence[Envelope], node_capacity: int = 10):
+        level = [(env, None, i) for i, env in enumerate(envelopes)]
+        self.size = len(level)
+        while len(level) > node_capacity:
+            level = self._pack(level, node_capacity)
+        self.root = (_union(n[0] for n in level), level, None) if level else None
+
+    @staticmethod
+    def _pack(nodes: List[tuple], capacity: int) -> List[tuple]:
+        n_nodes = math.ceil(len(nodes) / capacity)
+        n_slices = math.ceil(math.sqrt(n_nodes))
+        slice_size = n_slices * capacity
+        by_x = sorted(nodes, key=lambda n: n[0][0] + n[0][2])
+        packed = []
+        for s in range(0, len(by_x), slice_size):
+            by_y = sorted(by_x[s:s + slice_size], key=lambda n: n[0][1] + n[0][3])
+            for g in range(0, len(by_y), capacity):
+                group = by_y[g:g + capacity]
+                packed.append((_union(n[0] for n in group), group, None))
+        return packed
+
+    def query(self, env: Envelope) -> List[int]:
+        """Items whose envelope intersects ``env``."""
+        if self.root is None:
+            return []
+        out: List[int] = []
+        stack = [self.root]
+        while stack:
+            node_env, children, item = stack.pop()
+            if not _intersects(node_env, env):
+                continue
+            if children is None:
+                out.append(item)
+            else:
+                stack.extend(children)
+        return out
+
+    def nearest_candidates(self, x: float, y: float) -> Iterable[Tuple[float, int]]:
+        """Yield ``(envelope_distance, item)`` in increasing envelope distance."""
+        if self.root is None:
+            return
+        counter = 0
+        heap = [(_envelope_distance(self.root[0], x, y), counter, self.root)]
+        while heap:
+            dist, _, (node_env, children, item) = heapq.heappop(heap)
+            if children is None:
+                yield dist, item
+                continue
+            for child in children:
+                counter += 1
+                heapq.heappush(heap, (_envelope_distance(child[0], x, y), counter, child))
+
+
+class LineIndex:
+    """Projected line geometries held as WKB under an STR-tree."""
+
+    def __init__(
+        self,
+        features: Iterable[Dict[str, Any]],
+        *,
+        id_getter: Callable[[Dict[str, Any]], Any],
+        name_getter: Callable[[Dict[str, Any]], str],
+        metric_srid: int = METRIC_SRID,
+    ):
+        self.metric_srid = metric_srid
+        self.ids: List[Any] = []
+        self.names: List[str] = []
+        self._wkb: List[bytes] = []  # metric CRS
+        envelopes: List[Envelope] = []
+
+        for feat in features:
+            geom = feat.get("geometry")
+            if not geom:
+                continue
+            try:
+                g = GEOSGeometry(json.dumps(geom))
+                g.srid = 4326
+                g_metric = _project(g, metric_srid)
+            except Exception:
+                continue
+            props = feat.get("properties", {})
+            self.ids.append(id_getter(props))
+            self.names.append(name_getter(props))
+            self._wkb.append(bytes(g_metric.wkb))
+            envelopes.append(g_metric.extent)
+
+        self.tree = STRTree(envelopes)
+        logger.info(f"[LINE_INDEX] Indexed {len(self._wkb)} line features")
+
+    def __len__(self) -> int:
+        return len(self._wkb)
+
+    def _metric(self, i: int) -> GEOSGeometry:
+        g = GEOSGeometry(memoryview(self._wkb[i]))
+        g.srid = self.metric_srid
+        return g
+
+    def _center(self, lon: float, lat: float) -> Point:
+        return _project(Point(lon, lat, srid=4326), self.metric_srid)
+
+    def segments_within(self, *, lon: float, lat: float, radius_m: float, limit: int) -> List[Dict[str, Any]]:
+        """Lines intersecting the buffer around the point, clipped to it (file order)."""
+        center = self._center(lon, lat)
+        buffer_geom = center.buffer(radius_m)
+        prepared = buffer_geom.prepared
+
+        results: List[Dict[str, Any]] = []
+        for i in sorted(self.tree.query(buffer_geom.extent)):
+            g = self._metric(i)
+            if not prepared.intersects(g):
+                continue
+            try:
+                clipped = _project(g.intersection(buffer_geom), 4326)
+                geom_geojson = json.loads(clipped.geojson)
+            except Exception:
+                # Fallback: include entire geometry if clipping fails
+                try:
+                    geom_geojson = json.loads(_project(g, 4326).geojson)
+                except Exception:
+                    continue
+            results.append({"id": self.ids[i], "name": self.names[i], "geometry": geom_geojson})
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def nearest_distance_m(self, *, lon: float, lat: float, max_radius_m: Optional[float] = None) -> Optional[float]:
+        """Distance from the point to the closest line, or None if none lies within ``max_radius_m``."""
+        return self._nearest(self._center(lon, lat), max_radius_m)
+
+    def nearest_distances_m(
+        self, points: Iterable[Tuple[float, float]], *, max_radius_m: Optional[float] = None
+    ) -> List[Optional[float]]:
+        """Bulk variant of ``nearest_distance_m`` for many (lon, lat) points."""
+        points = list(points)
+        if not points:
+            return []
+        # One coordinate transformation for all points instead of one per point
+        projected = _project(MultiPoint([Point(lon, lat) for lon, lat in points], srid=4326), self.metric_srid)
+        return [self._nearest(Point(x, y, srid=self.metric_srid), max_radius_m) for x, y in projected.coords]
+
+    def _nearest(self, center: Point, max_radius_m: Optional[float]) -> Optional[float]:
+        best: Optional[float] = None
+        for env_dist, i in self.tree.nearest_candidates(center.x, center.y):
+            # Envelope distance is a lower bound of the true distance
+            if best is not None and env_dist >= best:
+                break
+            if max_radius_m and env_dist > max_radius_m:
+                break
+            d = self._metric(i).distance(center)
+            if best is None or d < best:
+                best = d
+        if best is not None and max_radius_m and best > max_radius_m:
+            return None
+        return float(best) if best is not None else None
@@ -0,0 +1,259 @@
+"""In-process spatial index for the small point layers (transit, stores, education).
+
+Each gunicorn worker keeps one static k-d tree per layer, built from the
+layer's rows and queried for radius + top-k lookups without a DB round trip.
+
+Points are stored as 3-d vectors on a sphere of the WGS84 mean radius, so the
+euclidean (chord) distance inside the tree is monotonic in great-circle
+distance: the nearest neighbours found are the exact haversine neighbours.
+
+A layer is rebuilt in a background thread whenever its data version
+(row count + latest ``updated_at``) changes. Until a layer is built (or while
+it is being rebuilt) ``query`` returns ``None`` and callers use the DB path.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.db import connection
+
+from .spatial import haversine_distance_m
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8  # same radius as spatial.haversine_distance_m
+
+# Models served from the index, by "<app_label>.<ModelName>"
+LAYER_MODELS: Tuple[str, ...] = (
+    "transit_layer.MetroStation",
+    "transit_layer.MetrobusStation",
+    "transit_layer.BusStop",
+    "transit_layer.TaxiStand",
+    "stores_layer.Grocery",
+    "stores_layer.Clothing",
+    "stores_layer.Mall",
+    "stores_layer.Park",
+    "education_layer.School",
+)
+
+# How often (seconds) the layer versions are re-checked against the DB
+VERSION_TTL_S = float(os.environ.get("POI_INDEX_VERSION_TTL_S", "30"))
+
+
+def _to_xyz(lon: float, lat: float) -> Tuple[float, float, float]:
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (
+        EARTH_RADIUS_M * cos_phi * math.cos(lam),
+        EARTH_RADIUS_M * cos_phi * math.sin(lam),
+        EARTH_RADIUS_M * math.sin(phi),
+    )
+
+
+def _arc_to_chord(arc_m: float) -> float:
+    """Chord length for a great-circle distance (both in meters)."""
+    return 2.0 * EARTH_RADIUS_M * math.sin(min(arc_m, math.pi * EARTH_RADIUS_M) / (2.0 * EARTH_RADIUS_M))
+
+
+class KDTree:
+    """Static, implicit 3-d tree: the tree is the ``order`` array itself.
+
+    A node covering ``order[lo:hi]`` stores its splitting point at the middle
+    position and splits on axis ``depth % 3``.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float, float]]):
+        self._pts = list(points)
+        self._order = list(range(len(self._pts)))
+        self._build(0, len(self._order), 0)
+
+    def __len__(self) -> int:
+        return len(self._pts)
+
+    def _build(self, lo: int, hi: int, depth: int) -> None:
+        stack = [(lo, hi, depth)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo <= 1:
+                continue
+            axis = depth % 3
+            pts = self._pts
+            self._order[lo:hi] = sorted(self._order[lo:hi], key=lambda i: pts[i][axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+
+    def query(self, xyz: Tuple[float, float, float], max_dist: float, k: int) -> List[Tuple[float, int]]:
+        """Return up to ``k`` (distance, point_index) pairs within ``max_dist``, nearest first."""
+        if not self._pts or k <= 0:
+            return []
+        qx, qy, qz = xyz
+        pts = self._pts
+        order = self._order
+        best: List[Tuple[float, int]] = []  # max-heap via negated distances
+        bound = max_dist
+
+        # (lo, hi, depth, lower bound of the distance to anything in the range)
+        stack = [(0, len(order), 0, 0.0)]
+        while stack:
+            lo, hi, depth, min_d = stack.pop()
+            if lo >= hi or min_d > bound:
+                continue
+            mid = (lo + hi) // 2
+            idx = order[mid]
+            p = pts[idx]
+            d = math.sqrt((p[0] - qx) ** 2 + (p[1] - qy) ** 2 + (p[2] - qz) ** 2)
+            if d <= bound:
+                heapq.heappush(best, (-d, idx))
+                if len(best) > k:
+                    heapq.heappop(best)
+                if len(best) == k:
+                    bound = min(max_dist, -best[0][0])
+
+            diff = xyz[depth % 3] - p[depth % 3]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            # Push the far side first so the near side is explored first
+            stack.append((far[0], far[1], depth + 1, abs(diff)))
+            stack.append((near[0], near[1], depth + 1, min_d))
+
+        return sorted((-neg, idx) for neg, idx in best)
+
+
+class LayerIndex:
+    """Immutable snapshot of one point layer."""
+
+    def __init__(self, label: str, version: Tuple[Any, ...], rows: List[Tuple[int, str, float, float]]):
+        self.label = label
+        self.version = version
+        self.ids = [r[0] for r in rows]
+        self.names = [r[1] for r in rows]
+        self.lons = [r[2] for r in rows]
+        self.lats = [r[3] for r in rows]
+        self.tree = KDTree([_to_xyz(lon, lat) for lon, lat in zip(self.lons, self.lats)])
+
+    def query(self, *, lon: float, lat: float, radius_m: float, limit: int) -> List[Dict[str, Any]]:
+        hits = self.tree.query(_to_xyz(lon, lat), _arc_to_chord(radius_m), limit)
+        out: List[Dict[str, Any]] = []
+        for _chord, i in hits:
+            out.append(
+                {
+                    "id": self.ids[i],
+                    "name": self.names[i],
+                    "distance_m": haversine_distance_m(lon, lat, self.lons[i], self.lats[i]),
+                    "lat": self.lats[i],
+                    "lng": self.lons[i],
+                }
+            )
+        return out
+
+
+def _layer_version_sql(labels: Sequence[str]) -> str:
+    parts = []
+    for label in labels:
+        table = connection.ops.quote_name(apps.get_model(label)._meta.db_table)
+        parts.append(f"SELECT %s, COUNT(*), MAX(updated_at) FROM {table}")
+    return " UNION ALL ".join(parts)
+
+
+def fetch_layer_versions(labels: Sequence[str]) -> Dict[str, Tuple[Any, ...]]:
+    """Data version of every layer in a single statement."""
+    with connection.cursor() as cursor:
+        cursor.execute(_layer_version_sql(labels), list(labels))
+        return {label: (count, updated) for label, count, updated in cursor.fetchall()}
+
+
+def _load_rows(label: str) -> List[Tuple[int, str, float, float]]:
+    model = apps.get_model(label)
+    table = connection.ops.quote_name(model._meta.db_table)
+    sql = f"SELECT id, name, ST_X(location::geometry), ST_Y(location::geometry) FROM {table}"
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return [(r[0], r[1] or "", float(r[2]), float(r[3])) for r in cursor.fetchall()]
+
+
+class PoiIndex:
+    """Per-process registry of layer indexes with background rebuilds."""
+
+    def __init__(self, labels: Sequence[str] = LAYER_MODELS, version_ttl_s: float = VERSION_TTL_S):
+        self.labels = tuple(labels)
+        self.version_ttl_s = version_ttl_s
+        self._layers: Dict[str, LayerIndex] = {}
+        self._versions: Dict[str, Tuple[Any, ...]] = {}
+        self._checked_at = 0.0
+        self._building: set[str] = set()
+        self._lock = threading.Lock()
+
+    def query(self, model, *, lon: float, lat: float, radius_m: float, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Nearby rows of ``model`` from the index, or ``None`` if the layer is cold."""
+        label = model._meta.label
+        if label not in self.labels:
+            return None
+        self._refresh_versions()
+        layer = self._layers.get(label)
+        if layer is None or layer.version != self._versions.get(label):
+            self._schedule_build(label)
+            return None
+        return layer.query(lon=lon, lat=lat, radius_m=radius_m, limit=limit)
+
+    def warm(self) -> None:
+        """Build every layer synchronously (e.g. from a management command or at startup)."""
+        self._refresh_versions(force=True)
+        for label in self.labels:
+            self._build(label)
+
+    def _refresh_versions(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.version_ttl_s:
+            return
+        self._checked_at = now
+        try:
+            self._versions = fetch_layer_versions(self.labels)
+        except Exception as exc:
+            logger.warning("[POI_INDEX] Version check failed: %s", exc)
+
+    def _schedule_build(self, label: str) -> None:
+        with self._lock:
+            if label in self._building:
+                return
+            self._building.add(label)
+        threading.Thread(target=self._build_in_thread, args=(label,), daemon=True).start()
+
+    def _build_in_thread(self, label: str) -> None:
+        try:
+            self._build(label)
+        finally:
+            with self._lock:
+                self._building.discard(label)
+            # Background threads own their own DB connection
+            connection.close()
+
+    def _build(self, label: str) -> None:
+        start = time.time()
+        try:
+            version = fetch_layer_versions([label])[label]
+            layer = LayerIndex(label, version, _load_rows(label))
+        except Exception as exc:
+            logger.error("[POI_INDEX] Failed to build %s: %s", label, exc, exc_info=True)
+            return
+        self._layers[label] = layer
+        self._versions[label] = version
+        logger.info(f"[POI_INDEX] Built {label}: {len(layer.tree)} points | Time: {time.time() - start:.4f}s")
+
+
+_index: Optional[PoiIndex] = None
+
+
+def get_poi_index() -> PoiIndex:
+    global _index
+    if _index is None:
+        _index = PoiIndex()
+    return _index
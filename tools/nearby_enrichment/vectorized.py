@@ -0,0 +1,81 @@
+"""Vectorised nearest-distance computation for many listings at once.
+
+Listing and layer coordinates are loaded into NumPy arrays and mapped to 3-d
+vectors on a sphere of the WGS84 mean radius (as in ``poi_index``). A SciPy
+``cKDTree`` over a layer then answers the nearest neighbour of thousands of
+listings in one call; chord lengths are converted back to great-circle
+metres. NumPy and SciPy are optional and only needed for this batch path.
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.db import connection
+
+from .poi_index import EARTH_RADIUS_M
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _numpy_scipy() -> Tuple[Any, Any]:
+    try:
+        import numpy as np  # type: ignore
+        from scipy.spatial import cKDTree  # type: ignore
+    except ImportError as exc:
+        raise ImportError(
+            "numpy and scipy are required for batch distance computation. Install via `pip install numpy scipy`."
+        ) from exc
+    return np, cKDTree
+
+
+def to_xyz(lon, lat):
+    """(N, 3) sphere vectors in meters for lon/lat arrays in degrees."""
+    np, _ = _numpy_scipy()
+    phi = np.radians(np.asarray(lat, dtype=float))
+    lam = np.radians(np.asarray(lon, dtype=float))
+    cos_phi = np.cos(phi)
+    return EARTH_RADIUS_M * np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def load_layer_coords(label: str):
+    """(N, 2) lon/lat array of a point layer, in one query."""
+    np, _ = _numpy_scipy()
+    model = apps.get_model(label)
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT ST_X(location::geometry), ST_Y(location::geometry) FROM {table}")
+        rows = cursor.fetchall()
+    return np.asarray(rows, dtype=float).reshape(-1, 2)
+
+
+class LayerTree:
+    """k-d tree over one layer's points, queried for many origins per call."""
+
+    def __init__(self, coords):
+        _, cKDTree = _numpy_scipy()
+        self.size = len(coords)
+        self._tree = cKDTree(to_xyz(coords[:, 0], coords[:, 1])) if self.size else None
+
+    def nearest_distances_m(
+        self, points: Sequence[Tuple[float, float]], max_radius_m: Optional[float] = None
+    ) -> List[Optional[float]]:
+        """Great-circle distance to the nearest point for each (lon, lat); None beyond ``max_radius_m``."""
+        np, _ = _numpy_scipy()
+        if self._tree is None or not len(points):
+            return [None] * len(points)
+        origins = np.asarray(points, dtype=float).reshape(-1, 2)
+        bound = np.inf
+        if max_radius_m:
+            # Chord of the radius; a hair of slack so points exactly on the circle are kept
+            bound = 2.0 * EARTH_RADIUS_M * np.sin(min(max_radius_m, np.pi * EARTH_RADIUS_M) / (2.0 * EARTH_RADIUS_M))
+            bound = bound * (1 + 1e-9)
+        chord, _ = self._tree.query(to_xyz(origins[:, 0], origins[:, 1]), k=1, distance_upper_bound=bound)
+        # Misses come back as inf chords
+        found = np.isfinite(chord)
+        arc = 2.0 * EARTH_RADIUS_M * np.arcsin(np.clip(np.where(found, chord, 0.0) / (2.0 * EARTH_RADIUS_M), 0.0, 1.0))
+        return [float(d) if ok else None for d, ok in zip(arc, found)]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MetroStation, BusStop, MetrobusStation
+from .models import MetroStation, BusStop, MetrobusStation, RouteLine
 
 
 @admin.register(MetroStation)
@@ -18,3 +18,10 @@ class BusStopAdmin(admin.ModelAdmin):
 class MetrobusStationAdmin(admin.ModelAdmin):
     list_display = ("name",)
     search_fields = ("name",)
+
+
+@admin.register(RouteLine)
+class RouteLineAdmin(admin.ModelAdmin):
+    list_display = ("name", "kind", "line_id")
+    list_filter = ("kind",)
+    search_fields = ("name", "line_id")
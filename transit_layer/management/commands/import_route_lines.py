@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from django.contrib.gis.geos import GEOSGeometry, LineString, MultiLineString
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, transaction
+
+from transit_layer.models import RouteLine, RouteSegment
+from tools.nearby_enrichment import bicycle, minibus
+
+
+# Per-kind file loader and property accessors (shared with the file-backed layers)
+SOURCES = {
+    RouteLine.KIND_MINIBUS: (minibus._load_minibus_geojson, minibus._line_id, minibus._line_name),
+    RouteLine.KIND_BICYCLE: (bicycle._load_bicycle_geojson, bicycle._line_id, bicycle._line_name),
+}
+
+
+def _as_multilinestring(geom: Dict[str, Any]) -> MultiLineString | None:
+    try:
+        g = GEOSGeometry(json.dumps(geom))
+    except Exception:
+        return None
+    g.srid = 4326
+    if isinstance(g, LineString):
+        g = MultiLineString(g, srid=4326)
+    if not isinstance(g, MultiLineString) or g.empty:
+        return None
+    return g
+
+
+class Command(BaseCommand):
+    help = (
+        "Import minibus lines / bicycle roads from GeoJSON into transit_layer.RouteLine and "
+        "store ST_Subdivide'd segments in RouteSegment (geography, GiST-indexed)."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--kind", choices=["minibus", "bicycle", "all"], default="all", help="Which layer to import")
+        parser.add_argument("--path", help="GeoJSON path (defaults to the layer's usual file locations)")
+        parser.add_argument("--segment-length-m", type=int, default=250, help="Densify lines to this vertex spacing before subdividing")
+        parser.add_argument("--max-vertices", type=int, default=32, help="Max vertices per stored segment (ST_Subdivide)")
+
+    def handle(self, *args, **opts):
+        kinds = list(SOURCES) if opts["kind"] == "all" else [opts["kind"]]
+        if opts.get("path") and len(kinds) != 1:
+            self.stderr.write("--path requires a single --kind")
+            return
+
+        for kind in kinds:
+            loader, id_getter, name_getter = SOURCES[kind]
+            if opts.get("path"):
+                with Path(opts["path"]).open("r", encoding="utf-8", errors="ignore") as f:
+                    features = json.load(f).get("features", [])
+            else:
+                features = loader()
+
+            routes: List[RouteLine] = []
+            skipped = 0
+            for feat in features:
+                geom = _as_multilinestring(feat.get("geometry") or {})
+                if geom is None:
+                    skipped += 1
+                    continue
+                props = feat.get("properties", {})
+                line_id = id_getter(props)
+                routes.append(
+                    RouteLine(
+                        kind=kind,
+                        line_id=str(line_id) if line_id is not None else "",
+                        name=(name_getter(props) or "")[:255],
+                        geom=geom,
+                    )
+                )
+
+            with transaction.atomic():
+                # Segments go with their routes (CASCADE)
+                RouteLine.objects.filter(kind=kind).delete()
+                RouteLine.objects.bulk_create(routes, batch_size=500)
+                segments = self._subdivide(kind, opts["segment_length_m"], opts["max_vertices"])
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{kind}: imported {len(routes)} route(s) as {segments} segment(s); skipped {skipped}"
+                )
+            )
+
+    def _subdivide(self, kind: str, segment_length_m: int, max_vertices: int) -> int:
+        """Split every route of `kind` into small geography segments in a single statement."""
+        seg_table = connection.ops.quote_name(RouteSegment._meta.db_table)
+        route_table = connection.ops.quote_name(RouteLine._meta.db_table)
+        sql = f"""
+            INSERT INTO {seg_table} (route_id, kind, geom)
+            SELECT r.id, r.kind, ST_Multi(s.geom)::geography
+            FROM {route_table} AS r,
+            LATERAL ST_Subdivide(ST_Segmentize(r.geom::geography, %s)::geometry, %s) AS s(geom)
+            WHERE r.kind = %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [segment_length_m, max_vertices, kind])
+            inserted = cursor.rowcount
+            # Fresh statistics so the planner picks the GiST index right away
+            cursor.execute(f"ANALYZE {seg_table}")
+        return inserted
@@ -1,5 +1,4 @@
 import os
-import time
 from pathlib import Path
 from typing import Iterable, List, Optional
 
@@ -7,6 +6,7 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.contrib.gis.geos import Point
 
+from listings.geocoding import GeocoderUnavailable, geocode
 from transit_layer.models import MetrobusStation
 
 
@@ -80,7 +80,8 @@ class Command(BaseCommand):
         "Geocode 44 Metrobus station names and load into MetrobusStation.\n"
         "- Reads names from <BASE_DIR>/data/metrobus_stations.txt if present (one per line).\n"
         "- Otherwise uses the embedded list (verify to ensure the full official set).\n"
-        "- Uses Nominatim via geopy and respects 1 req/sec politeness."
+        "- Geocodes through listings.geocoding: cached results are reused and upstream\n"
+        "  calls share the global 1 req/sec rate limit."
     )
 
     def add_arguments(self, parser) -> None:
@@ -104,34 +105,28 @@ class Command(BaseCommand):
         names_file = data_dir / "metrobus_stations.txt"
         station_names = read_station_names_from_file(names_file) or DEFAULT_STATION_NAMES
 
-        try:
-            from geopy.geocoders import Nominatim  # type: ignore
-        except Exception as exc:  # pragma: no cover
-            self.stderr.write(
-                "geopy is not installed. Install it first, e.g., pip install geopy"
-            )
-            raise
-
-        geolocator = Nominatim(user_agent="istanbul_proptech_metrobus_loader")
-
         created = 0
         updated = 0
         for i, name in enumerate(station_names, start=1):
             query = f"{name}, Istanbul, Türkiye"
             self.stdout.write(f"[{i}/{len(station_names)}] Geocoding: {query}")
             try:
-                loc = geolocator.geocode(query, timeout=10)
-            except Exception as exc:  # pragma: no cover
+                # Pacing (1 req/sec) is enforced by the shared rate limiter
+                loc = geocode(query, timeout=10)
+            except ImportError:
+                self.stderr.write(
+                    "geopy is not installed. Install it first, e.g., pip install geopy"
+                )
+                raise
+            except GeocoderUnavailable as exc:  # pragma: no cover
                 self.stderr.write(f"  Geocoding failed: {exc}")
-                time.sleep(1)
                 continue
 
             if not loc:
                 self.stderr.write("  No result")
-                time.sleep(1)
                 continue
 
-            lon, lat = float(loc.longitude), float(loc.latitude)
+            lon, lat = loc.lon, loc.lat
             if dry:
                 self.stdout.write(f"  -> ({lat:.6f}, {lon:.6f})")
             else:
@@ -151,8 +146,5 @@ class Command(BaseCommand):
                 else:
                     updated += 1
 
-            # Nominatim usage policy: at most 1 req/sec
-            time.sleep(1)
-
         self.stdout.write(self.style.SUCCESS(f"Done. Created: {created}, Updated: {updated}"))
 
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:12
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transit_layer', '0004_taxistand'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('minibus', 'Minibus line'), ('bicycle', 'Bicycle road')], max_length=16)),
+                ('line_id', models.CharField(blank=True, max_length=64)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('geom', django.contrib.gis.db.models.fields.MultiLineStringField(srid=4326)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['kind', 'name'],
+                'indexes': [models.Index(fields=['kind', 'line_id'], name='transit_lay_kind_264b5f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RouteSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('minibus', 'Minibus line'), ('bicycle', 'Bicycle road')], max_length=16)),
+                ('geom', django.contrib.gis.db.models.fields.MultiLineStringField(geography=True, srid=4326)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='transit_layer.routeline')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind'], name='transit_lay_kind_a32253_idx')],
+            },
+        ),
+    ]
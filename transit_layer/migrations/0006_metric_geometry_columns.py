@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:20
+
+import django.contrib.gis.db.models.fields
+import django.contrib.gis.db.models.functions
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transit_layer', '0005_routeline_routesegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metrostation',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='busstop',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='metrobusstation',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='taxistand',
+            name='location_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.PointField(srid=5254)),
+        ),
+        migrations.AddField(
+            model_name='routesegment',
+            name='geom_tm',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(django.db.models.functions.comparison.Cast('geom', output_field=django.contrib.gis.db.models.fields.MultiLineStringField(srid=4326)), 5254), output_field=django.contrib.gis.db.models.fields.MultiLineStringField(srid=5254)),
+        ),
+        migrations.AddIndex(
+            model_name='metrostation',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='metro_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='busstop',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='busstop_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='metrobusstation',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='metrobus_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='taxistand',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location_tm'], name='taxistand_location_tm_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='routesegment',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['geom_tm'], name='routeseg_geom_tm_gist'),
+        ),
+    ]
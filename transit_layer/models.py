@@ -1,16 +1,20 @@
 from django.contrib.gis.db import models
 
+from listings.fields import metric_field, metric_index
+
 
 class MetroStation(models.Model):
     name = models.CharField(max_length=255, unique=True)
     # geography=True gives meter-based distances for Distance()
     location = models.PointField(srid=4326, geography=True)
+    location_tm = metric_field()
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [metric_index("metro_location_tm_gist")]
 
     def __str__(self) -> str:  # pragma: no cover
         return self.name
@@ -19,12 +23,14 @@ class MetroStation(models.Model):
 class BusStop(models.Model):
     name = models.CharField(max_length=255)
     location = models.PointField(srid=4326, geography=True)
+    location_tm = metric_field()
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [metric_index("busstop_location_tm_gist")]
 
     def __str__(self) -> str:  # pragma: no cover
         return self.name
@@ -33,12 +39,14 @@ class BusStop(models.Model):
 class MetrobusStation(models.Model):
     name = models.CharField(max_length=255, unique=True)
     location = models.PointField(srid=4326, geography=True)
+    location_tm = metric_field()
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [metric_index("metrobus_location_tm_gist")]
 
     def __str__(self) -> str:  # pragma: no cover
         return self.name
@@ -47,12 +55,64 @@ class MetrobusStation(models.Model):
 class TaxiStand(models.Model):
     name = models.CharField(max_length=255)
     location = models.PointField(srid=4326, geography=True)
+    location_tm = metric_field()
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [metric_index("taxistand_location_tm_gist")]
 
     def __str__(self) -> str:  # pragma: no cover
         return self.name
+
+
+class RouteLine(models.Model):
+    """A line-shaped transit layer feature (minibus line, bicycle road)."""
+
+    KIND_MINIBUS = "minibus"
+    KIND_BICYCLE = "bicycle"
+    KIND_CHOICES = [
+        (KIND_MINIBUS, "Minibus line"),
+        (KIND_BICYCLE, "Bicycle road"),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    line_id = models.CharField(max_length=64, blank=True)
+    name = models.CharField(max_length=255, blank=True)
+    geom = models.MultiLineStringField(srid=4326)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["kind", "name"]
+        indexes = [
+            models.Index(fields=["kind", "line_id"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.get_kind_display()}: {self.name or self.line_id}"
+
+
+class RouteSegment(models.Model):
+    """
+    ST_Subdivide'd piece of a RouteLine. Small segments keep GiST bounding
+    boxes tight, so ST_DWithin / KNN lookups only touch nearby pieces.
+    """
+
+    route = models.ForeignKey(RouteLine, on_delete=models.CASCADE, related_name="segments")
+    # Denormalized from the route so lookups filter without a join
+    kind = models.CharField(max_length=16, choices=RouteLine.KIND_CHOICES)
+    geom = models.MultiLineStringField(srid=4326, geography=True)
+    geom_tm = metric_field("geom", field_class=models.MultiLineStringField)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind"]),
+            metric_index("routeseg_geom_tm_gist", "geom_tm"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Segment {self.id} of route {self.route_id}"
@@ -1,42 +1,19 @@
-from typing import Any, Dict, List
-from django.http import JsonResponse, HttpRequest
+from django.db.models import F
+from django.http import HttpRequest, HttpResponse
+from listings.geojson import point_feature_rows, stream_point_layer, text
 from .models import MetroStation, BusStop
 
+# Sources of the combined transit layer, in paging order
+TRANSIT_SOURCES = ((MetroStation, "metro"), (BusStop, "bus"))
 
-def metro_stations_geojson(request: HttpRequest) -> JsonResponse:
-    features: List[Dict[str, Any]] = []
-    for st in MetroStation.objects.all():
-        geom = st.location
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [geom.x, geom.y]},
-                "properties": {"id": st.id, "name": st.name},
-            }
-        )
-    return JsonResponse({"type": "FeatureCollection", "features": features})
 
+def metro_stations_geojson(request: HttpRequest) -> HttpResponse:
+    return stream_point_layer(request, [point_feature_rows(MetroStation.objects.all(), name=F("name"))])
 
-def transit_geojson(request: HttpRequest) -> JsonResponse:
-    features: List[Dict[str, Any]] = []
-    # Metro
-    for st in MetroStation.objects.all():
-        geom = st.location
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [geom.x, geom.y]},
-                "properties": {"id": st.id, "name": st.name, "mode": "metro"},
-            }
-        )
-    # Bus
-    for bs in BusStop.objects.all():
-        geom = bs.location
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [geom.x, geom.y]},
-                "properties": {"id": bs.id, "name": bs.name, "mode": "bus"},
-            }
-        )
-    return JsonResponse({"type": "FeatureCollection", "features": features})
+
+def transit_geojson(request: HttpRequest) -> HttpResponse:
+    sources = [
+        point_feature_rows(model.objects.all(), name=F("name"), mode=text(mode))
+        for model, mode in TRANSIT_SOURCES
+    ]
+    return stream_point_layer(request, sources)